@@ -6,43 +6,72 @@ Routes are organized in separate blueprint modules in the routes package.
 """
 
 from flask import Flask
-from database import init_database, add_sample_data
+from flask.json.provider import DefaultJSONProvider
+from database import add_sample_data, close_memory_database, init_database, is_memory_database
+from records import Record
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+from services.search_cache import SEARCH_CACHE
 from routes import register_blueprints
+from monitoring import register_monitoring
 import argparse
 import os
+import sys
 
-def create_app(test_mode=False):
+class LibraryJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes database records as the objects they replace."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+def create_app(test_mode=False, db_path=None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        test_mode: Use a clean test database with sample data
+        db_path: Database to use instead of the default file; ":memory:" keeps
+            everything in memory for as long as the process runs
+    
     Returns:
         Flask: Configured Flask application instance
     """
 
     # Select database filename based on mode
     if test_mode:
-        db_path = "test_library.db"
+        db_path = db_path or "test_library.db"
         print("[TEST MODE] Using test database:", db_path)
 
         # Always start from a clean database in test mode
-        if os.path.exists(db_path):
+        if is_memory_database(db_path):
+            close_memory_database(db_path)
+        elif os.path.exists(db_path):
             os.remove(db_path)
+        CATALOG_SNAPSHOT.reset()
+        SEARCH_CACHE.clear()
     else:
-        db_path = "library.db"
+        db_path = db_path or "library.db"
 
     os.environ["LIBRARY_DB_PATH"] = db_path
-
     app = Flask(__name__)
     app.secret_key = "super secret key"
+    app.json = LibraryJSONProvider(app)
     
-    # Initialize the database
+    # Create or migrate the schema; a warm database only has its version checked
     init_database()
     
-    # Add sample data for testing and demonstration
-    add_sample_data()
+    # Test mode starts from an empty file and always gets the sample data;
+    # otherwise seeding is an explicit step (python app.py --seed)
+    if test_mode:
+        add_sample_data()
     
     # Register all route blueprints
     register_blueprints(app)
+
+    # Record request metrics for the /metrics endpoint
+    register_monitoring(app)
     
     return app
 
@@ -50,12 +79,37 @@ def create_app(test_mode=False):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--test", action="store_true", help="Run the app in test mode with test database.")
+    parser.add_argument("--db", help="Database file, or :memory: for an in-memory database (test mode is seeded).")
+    parser.add_argument("--seed", action="store_true", help="Add the sample books to an empty database and exit.")
+    parser.add_argument("--serve", action="store_true", help="Run the production multi-worker server instead of the debug server.")
+    parser.add_argument("--port", type=int, help="Port to listen on (default 5000, or 2812 in test mode).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes for --serve.")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per worker for --serve.")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen backlog for --serve.")
+    parser.add_argument("--keepalive", type=float, default=5.0, help="Idle keep-alive timeout in seconds for --serve.")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0, help="Seconds to let workers finish on shutdown.")
+    parser.add_argument("--catalog-snapshot", action="store_true", help="Answer searches from an in-memory catalog snapshot.")
     args = parser.parse_args()
 
-    if args.test:
+    if args.port:
+        targetPort = args.port
+    elif args.test:
         targetPort = 2812
     else:
         targetPort = 5000
 
-    app = create_app(test_mode=args.test)
-    app.run(debug=True, host='0.0.0.0', port=targetPort)
+    app = create_app(test_mode=args.test, db_path=args.db)
+    if args.catalog_snapshot:
+        CATALOG_SNAPSHOT.enable()
+
+    if args.seed:
+        if add_sample_data():
+            print("Added sample data to", os.environ["LIBRARY_DB_PATH"])
+        else:
+            print("Database already has books; nothing added")
+    elif args.serve:
+        from serving import serve
+        sys.exit(serve(app, host='0.0.0.0', port=targetPort, workers=args.workers, threads=args.threads,
+                       backlog=args.backlog, keepalive=args.keepalive, graceful_timeout=args.graceful_timeout))
+    else:
+        app.run(debug=True, host='0.0.0.0', port=targetPort)
@@ -0,0 +1,137 @@
+"""
+Catalog Snapshot Benchmark - Memory, refresh cost and search time
+
+Builds a services.catalog_snapshot.CatalogSnapshot over a generated catalog and
+reports the memory it holds, the time to build it and to refresh it after
+different kinds of change, the median search time compared with the
+database scan in search_books_in_catalog(), the median time to complete
+a prefix (top 10) for /api/suggest, and the time to build the fuzzy-search
+trigram indexes and to run fuzzy searches (top 20).
+
+Usage:
+    python -m benchmarks.catalog_snapshot
+    python -m benchmarks.catalog_snapshot --books 100000 --output snapshot.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from benchmarks.dataset import generate_dataset
+from services.catalog_snapshot import CatalogSnapshot
+from services.library_service import search_books_in_catalog
+
+SEARCHES = [('title', 'the'), ('title', 'zzzz'), ('author', 'smith'), ('all', 'smith')]
+SUGGESTIONS = [('title', 't'), ('title', 'the gr'), ('author', 'sm')]
+FUZZY_SEARCHES = [('title', 'the silnt garden'), ('author', 'smiht'), ('title', 'zzzz')]
+CHANGED_BOOKS = 100
+
+
+def _median_ms(function: Callable, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+def _timed_ms(function: Callable) -> float:
+    start = time.perf_counter()
+    function()
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def _change_books(path: str, sql: str):
+    conn = sqlite3.connect(path)
+    conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+def measure_snapshot(books: int = 100_000, repeat: int = 20, workdir: str = None) -> Dict:
+    """
+    Build a snapshot of `books` generated books and time refreshes and searches.
+
+    Returns:
+        dict: memory (bytes), refresh_ms (build and after each kind of change)
+            and search (median ms per query, snapshot and database)
+    """
+    previous_path = os.environ.get("LIBRARY_DB_PATH")
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        path = os.path.join(directory, "snapshot.db")
+        generate_dataset(path, books=books, loans=books // 10, seed=1)
+        os.environ["LIBRARY_DB_PATH"] = path
+        try:
+            # Memory is traced on a separate build, as tracing slows the build down
+            tracemalloc.start()
+            traced_snapshot = CatalogSnapshot()
+            traced_snapshot.refresh()
+            held, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del traced_snapshot
+
+            snapshot = CatalogSnapshot(max_age=float('inf'))
+            refresh_ms = {'build': _timed_ms(snapshot.refresh), 'unchanged': _median_ms(snapshot.refresh, repeat)}
+            _change_books(path, f'UPDATE books SET available_copies = available_copies - 1 '
+                                f'WHERE id IN (SELECT id FROM books WHERE available_copies > 0 LIMIT {CHANGED_BOOKS})')
+            refresh_ms[f'availability_{CHANGED_BOOKS}'] = _timed_ms(snapshot.refresh)
+            _change_books(path, f"UPDATE books SET title = title || ' (2nd ed.)' "
+                                f"WHERE id IN (SELECT id FROM books LIMIT {CHANGED_BOOKS})")
+            refresh_ms[f'renamed_{CHANGED_BOOKS}'] = _timed_ms(snapshot.refresh)
+
+            search = {}
+            for search_type, term in SEARCHES:
+                search[f'{search_type}:{term}'] = {
+                    'matches': snapshot.search([(search_type, term)])[1],
+                    'snapshot_ms': _median_ms(lambda: snapshot.search([(search_type, term)]), repeat),
+                    'database_ms': _median_ms(lambda: search_books_in_catalog(term, search_type), max(1, repeat // 10)),
+                }
+            suggest = {
+                f'{field}:{prefix}': _median_ms(lambda: snapshot.suggest(prefix, field, 10), repeat * 10)
+                for field, prefix in SUGGESTIONS
+            }
+            fuzzy = {'index_build': _timed_ms(lambda: snapshot.fuzzy_search([('title', '')], 20))}
+            for field, term in FUZZY_SEARCHES:
+                fuzzy[f'{field}:{term}'] = _median_ms(lambda: snapshot.fuzzy_search([(field, term)], 20), repeat)
+            memory = {'total': held, 'columns': snapshot.memory_usage()['total']}
+        finally:
+            if previous_path is None:
+                os.environ.pop("LIBRARY_DB_PATH", None)
+            else:
+                os.environ["LIBRARY_DB_PATH"] = previous_path
+
+    return {'books': books, 'memory': memory, 'refresh_ms': refresh_ms, 'search': search, 'suggest_ms': suggest,
+            'fuzzy_ms': fuzzy}
+
+def format_report(report: Dict) -> str:
+    memory = report['memory']
+    lines = [
+        f"books: {report['books']}",
+        f"memory: {memory['total'] / 1_000_000:.1f} MB held "
+        f"({memory['columns'] / 1_000_000:.1f} MB search columns, the rest book records and indexes)",
+        "refresh ms: " + ", ".join(f"{name} {ms:.1f}" for name, ms in report['refresh_ms'].items()),
+        f"{'search':<16} {'matches':>8} {'snapshot ms':>12} {'database ms':>12}",
+    ]
+    for name, stats in report['search'].items():
+        lines.append(f"{name:<16} {stats['matches']:>8} {stats['snapshot_ms']:>12.3f} {stats['database_ms']:>12.1f}")
+    lines.append("suggest ms: " + ", ".join(f"{name} {ms:.4f}" for name, ms in report['suggest_ms'].items()))
+    lines.append("fuzzy ms: " + ", ".join(f"{name} {ms:.2f}" for name, ms in report['fuzzy_ms'].items()))
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the in-memory catalog snapshot.")
+    parser.add_argument("--books", type=int, default=100_000, help="Books in the generated catalog.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per measurement.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    summary = measure_snapshot(args.books, args.repeat)
+    print(format_report(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
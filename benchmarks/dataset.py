@@ -0,0 +1,296 @@
+"""
+Synthetic Dataset Generator - Production-sized library databases for load testing
+
+Builds a database with the application schema and fills it with books and borrow
+records that look like a real library:
+
+- book popularity follows a Zipf distribution, so a few titles get most loans
+- popular titles have more copies, and some are fully checked out
+- a share of patrons sit at or near the 5-book borrowing limit
+- a configurable share of active loans is overdue
+
+The output depends only on the seed and the --as-of date. Rows are written with
+executemany inside large transactions, with journaling turned off while loading.
+
+Usage:
+    python -m benchmarks.dataset bench.db --scale 1        # 1M books, 20M borrow records
+    python -m benchmarks.dataset bench.db --books 10000 --loans 200000 --seed 7
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import database
+
+BOOKS_PER_SCALE = 1_000_000
+LOANS_PER_BOOK = 20
+MAX_PATRONS = 999_999
+BORROW_LIMIT = 5
+LOAN_DAYS = 14
+
+BATCH_SIZE = 100_000
+
+# Share of patrons with an active loan that hold 1, 2, 3, 4 or 5 books
+ACTIVE_LOANS_PER_PATRON_WEIGHTS = (0.35, 0.20, 0.15, 0.12, 0.18)
+
+_ADJECTIVES = (
+    "Silent", "Hidden", "Broken", "Golden", "Crimson", "Last", "Lost", "Burning", "Quiet", "Endless",
+    "Secret", "Wild", "Frozen", "Distant", "Bright", "Hollow", "Ancient", "Little", "Northern", "Restless",
+)
+_NOUNS = (
+    "River", "Garden", "Kingdom", "Mountain", "Letter", "Promise", "Island", "Machine", "Winter", "Sea",
+    "House", "Road", "Shadow", "Station", "Empire", "Forest", "Mirror", "Harbor", "Storm", "Orchard",
+)
+_PATTERNS = (
+    "The {adj} {noun}", "{adj} {noun}", "The {noun} of {noun2}", "A {noun} in the {noun2}",
+    "The {adj} {noun} of {noun2}", "{noun} and {noun2}",
+)
+_FIRST_NAMES = (
+    "Anna", "James", "Maria", "David", "Chen", "Fatima", "Liam", "Sofia", "Noah", "Aisha",
+    "Harper", "Mateo", "Yuki", "Olivia", "Omar", "Elena", "Ravi", "Grace", "Kwame", "Ingrid",
+)
+_LAST_NAMES = (
+    "Smith", "Garcia", "Nguyen", "Okafor", "Kowalski", "Tanaka", "Haddad", "Silva", "Murphy", "Larsen",
+    "Patel", "Rossi", "Kim", "Dubois", "Novak", "Mensah", "Ahmed", "Fischer", "Lopez", "Walsh",
+)
+
+
+def _title(rng: random.Random, number: int) -> str:
+    title = rng.choice(_PATTERNS).format(
+        adj=rng.choice(_ADJECTIVES), noun=rng.choice(_NOUNS), noun2=rng.choice(_NOUNS))
+    # Give long series distinct titles while keeping common words searchable
+    return title if number % 7 else f"{title}, Volume {number % 97 + 1}"
+
+def _author(rng: random.Random) -> str:
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+def _popularity_cum_weights(rng: random.Random, books: int, skew: float) -> Tuple[List[int], List[float]]:
+    """Return (book index by popularity rank, cumulative Zipf weights by rank)."""
+    order = list(range(books))
+    rng.shuffle(order)
+    cum_weights = list(accumulate(1.0 / (rank ** skew) for rank in range(1, books + 1)))
+    return order, cum_weights
+
+def _pick_books(rng: random.Random, order: List[int], cum_weights: List[float], count: int) -> List[int]:
+    total = cum_weights[-1]
+    hi = len(cum_weights) - 1
+    random_value = rng.random
+    return [order[bisect(cum_weights, random_value() * total, 0, hi)] for _ in range(count)]
+
+def _active_loan_counts(rng: random.Random, patrons: int, active_loans: int) -> List[Tuple[int, int]]:
+    """Spread active loans over patrons; returns (patron number, loans held) pairs."""
+    counts = []
+    remaining = min(active_loans, patrons * BORROW_LIMIT)
+    candidates = list(range(patrons))
+    rng.shuffle(candidates)
+    cum_weights = list(accumulate(ACTIVE_LOANS_PER_PATRON_WEIGHTS))
+    for patron in candidates:
+        if remaining <= 0:
+            break
+        held = min(remaining, bisect(cum_weights, rng.random() * cum_weights[-1]) + 1)
+        counts.append((patron, held))
+        remaining -= held
+    if remaining > 0:
+        # Not enough patrons for the requested loans: fill everyone up to the limit
+        counts = [(patron, BORROW_LIMIT) for patron in range(patrons)]
+    return counts
+
+def _open_bulk_connection(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+def _insert_batches(conn: sqlite3.Connection, sql: str, rows: Iterator[Tuple]):
+    conn.execute('BEGIN')
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        conn.executemany(sql, batch)
+    conn.execute('COMMIT')
+
+def generate_dataset(db_path: str, books: int, loans: int, patrons: Optional[int] = None, seed: int = 0,
+                     active_ratio: float = 0.05, overdue_ratio: float = 0.15, popularity_skew: float = 1.1,
+                     history_days: int = 3 * 365, as_of: Optional[datetime] = None) -> Dict:
+    """
+    Fill a library database with synthetic books and borrow records.
+
+    Rows are appended after any existing books, so the sample data or an earlier
+    run can stay in place.
+
+    Args:
+        db_path: SQLite file to create or extend
+        books: Number of books to add
+        loans: Number of borrow records to add (active plus returned)
+        patrons: Number of distinct patrons (default: one per 40 loans)
+        seed: Random seed; the same seed and as_of always give the same rows
+        active_ratio: Share of loans that are still out
+        overdue_ratio: Share of active loans past their due date
+        popularity_skew: Zipf exponent for book popularity
+        history_days: How far back returned loans go
+        as_of: Reference "now" for due dates (default: today at midnight)
+
+    Returns:
+        dict: Counts of what was generated
+    """
+    if books <= 0:
+        raise ValueError("books must be positive")
+    if patrons is None:
+        patrons = max(100, loans // 40)
+    patrons = min(patrons, MAX_PATRONS)
+    if as_of is None:
+        as_of = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rng = random.Random(seed)
+
+    previous_path = os.environ.get("LIBRARY_DB_PATH")
+    os.environ["LIBRARY_DB_PATH"] = db_path
+    try:
+        database.init_database()
+    finally:
+        if previous_path is None:
+            del os.environ["LIBRARY_DB_PATH"]
+        else:
+            os.environ["LIBRARY_DB_PATH"] = previous_path
+
+    conn = _open_bulk_connection(db_path)
+    first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM books').fetchone()[0] + 1
+
+    order, cum_weights = _popularity_cum_weights(rng, books, popularity_skew)
+    popularity_rank = [0] * books
+    for rank, book in enumerate(order):
+        popularity_rank[book] = rank
+
+    # Active loans first: they decide copies and availability
+    patron_counts = _active_loan_counts(rng, patrons, int(loans * active_ratio))
+    active_total = sum(held for _, held in patron_counts)
+    active_books = _pick_books(rng, order, cum_weights, active_total)
+    out_per_book = [0] * books
+    for book in active_books:
+        out_per_book[book] += 1
+
+    fully_borrowed = 0
+
+    def book_rows():
+        nonlocal fully_borrowed
+        for book in range(books):
+            # Popular titles are stocked deeper; heavily borrowed ones can be fully out
+            base_copies = rng.randint(1, 3) + (4 if popularity_rank[book] < books // 100 else 0)
+            total_copies = max(base_copies, out_per_book[book])
+            if total_copies == out_per_book[book]:
+                fully_borrowed += 1
+            yield (first_id + book, _title(rng, book), _author(rng), f"979{first_id + book:010d}",
+                   total_copies, total_copies - out_per_book[book])
+
+    _insert_batches(conn, '''
+        INSERT INTO books (id, title, author, isbn, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', book_rows())
+
+    overdue = 0
+
+    def active_rows():
+        nonlocal overdue
+        position = 0
+        for patron, held in patron_counts:
+            patron_id = f"{patron:06d}"
+            for _ in range(held):
+                book = active_books[position]
+                position += 1
+                if rng.random() < overdue_ratio:
+                    overdue += 1
+                    days_late = min(int(rng.expovariate(1 / 10)) + 1, 120)
+                    borrowed = as_of - timedelta(days=LOAN_DAYS + days_late, seconds=rng.randrange(86400))
+                else:
+                    borrowed = as_of - timedelta(days=rng.randrange(LOAN_DAYS), seconds=rng.randrange(86400))
+                due = borrowed + timedelta(days=LOAN_DAYS)
+                yield (patron_id, first_id + book, borrowed.isoformat(), due.isoformat(), None)
+
+    # Returned loans dominate the row count, so their timestamps are assembled
+    # from precomputed day and time-of-day strings instead of datetime arithmetic
+    day_strings = [(as_of - timedelta(days=day)).strftime('%Y-%m-%dT') for day in range(history_days + 1)]
+    time_strings = [f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}" for second in range(86400)]
+    patron_ids = [f"{patron:06d}" for patron in range(patrons)]
+
+    def returned_rows():
+        random_value = rng.random
+        oldest = history_days - LOAN_DAYS * 2
+        remaining = loans - active_total
+        while remaining > 0:
+            chunk = min(remaining, BATCH_SIZE)
+            for book in _pick_books(rng, order, cum_weights, chunk):
+                day = LOAN_DAYS * 2 + int(random_value() * oldest)
+                borrowed_time = time_strings[int(random_value() * 86400)]
+                returned_day = day - 1 - int(random_value() * LOAN_DAYS * 2)
+                yield (patron_ids[int(random_value() * patrons)], first_id + book,
+                       day_strings[day] + borrowed_time,
+                       day_strings[day - LOAN_DAYS] + borrowed_time,
+                       day_strings[returned_day] + time_strings[int(random_value() * 86400)])
+            remaining -= chunk
+
+    insert_loan = '''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    _insert_batches(conn, insert_loan, active_rows())
+    _insert_batches(conn, insert_loan, returned_rows())
+    conn.close()
+
+    return {
+        'books': books,
+        'loans': max(loans, active_total),
+        'active_loans': active_total,
+        'overdue_loans': overdue,
+        'patrons': patrons,
+        'patrons_at_limit': sum(1 for _, held in patron_counts if held == BORROW_LIMIT),
+        'fully_borrowed_books': fully_borrowed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic library database.")
+    parser.add_argument("path", help="SQLite file to create or extend.")
+    parser.add_argument("--scale", type=float, default=0.01,
+                        help=f"Scale factor: {BOOKS_PER_SCALE:,} books and {LOANS_PER_BOOK} loans per book at 1.0.")
+    parser.add_argument("--books", type=int, help="Number of books (overrides --scale).")
+    parser.add_argument("--loans", type=int, help="Number of borrow records (overrides --scale).")
+    parser.add_argument("--patrons", type=int, help="Number of distinct patrons.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--active-ratio", type=float, default=0.05, help="Share of loans still out.")
+    parser.add_argument("--overdue-ratio", type=float, default=0.15, help="Share of active loans that are overdue.")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for book popularity.")
+    parser.add_argument("--as-of", help="Reference date (YYYY-MM-DD) used as 'now'.")
+    parser.add_argument("--force", action="store_true", help="Replace the file instead of appending to it.")
+    args = parser.parse_args()
+
+    if args.force and os.path.exists(args.path):
+        os.remove(args.path)
+
+    book_count = args.books or int(BOOKS_PER_SCALE * args.scale)
+    started = time.perf_counter()
+    summary = generate_dataset(
+        args.path,
+        books=book_count,
+        loans=args.loans if args.loans is not None else book_count * LOANS_PER_BOOK,
+        patrons=args.patrons,
+        seed=args.seed,
+        active_ratio=args.active_ratio,
+        overdue_ratio=args.overdue_ratio,
+        popularity_skew=args.skew,
+        as_of=datetime.fromisoformat(args.as_of) if args.as_of else None,
+    )
+    elapsed = time.perf_counter() - started
+
+    for key, value in summary.items():
+        print(f"{key:>22}: {value:,}")
+    print(f"{'seconds':>22}: {elapsed:.1f}")
@@ -0,0 +1,270 @@
+"""
+HTTP Load Test - Mixed circulation workload against a multi-worker server
+
+Starts the app factory (test mode) on the production pre-fork server
+(serving.serve, as started by app.py --serve), then drives a weighted mix of
+catalog, search, borrow, return and late-fee traffic from many concurrent
+clients.
+Reports throughput, latency percentiles and error rate per route.
+
+Usage:
+    python -m benchmarks.loadtest --workers 4 --client-procs 4 --clients 16 --duration 15
+    python -m benchmarks.loadtest --books 20000 --loans 100000 --mix catalog=5,search=40,api_search=40,borrow=5,return=5,api_late_fee=5
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --duration 30     # an already running server
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_MIX = {
+    'catalog': 20,
+    'search': 20,
+    'api_search': 25,
+    'borrow': 10,
+    'return': 10,
+    'api_late_fee': 15,
+}
+
+SEARCH_TERMS = [("the", "title"), ("river", "title"), ("great", "title"), ("lee", "author"),
+                ("smith", "author"), ("9780743273565", "isbn")]
+
+# Form posts are sent without following the redirect
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Parse 'route=weight,...' into a weight mapping."""
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown route '{route.strip()}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[route.strip()] = int(weight)
+    return mix
+
+def build_request(route: str, rng: random.Random, max_book_id: int, patrons: int) -> Tuple[str, str, Optional[str], Dict]:
+    """Return (method, path, body, headers) for one request on the given route."""
+    patron_id = f"{rng.randrange(patrons):06d}"
+    book_id = rng.randint(1, max_book_id)
+
+    if route == 'catalog':
+        return 'GET', '/catalog', None, {}
+    if route == 'search':
+        term, search_type = rng.choice(SEARCH_TERMS)
+        return 'GET', '/search?' + urlencode({'q': term, 'type': search_type}), None, {}
+    if route == 'api_search':
+        term, search_type = rng.choice(SEARCH_TERMS)
+        return 'GET', '/api/search?' + urlencode({'q': term, 'type': search_type}), None, {}
+    if route == 'borrow':
+        return 'POST', '/borrow', urlencode({'patron_id': patron_id, 'book_id': book_id}), FORM_HEADERS
+    if route == 'return':
+        return 'POST', '/return', urlencode({'patron_id': patron_id, 'book_id': book_id}), FORM_HEADERS
+    if route == 'api_late_fee':
+        return 'GET', f'/api/late_fee/{patron_id}/{book_id}', None, {}
+    raise ValueError(route)
+
+
+def _client_process(base_url: str, mix: Dict[str, int], clients: int, deadline: float, seed: int,
+                    max_book_id: int, patrons: int, timeout: float, results):
+    """Run `clients` threads that issue requests until the deadline; put samples on the results queue."""
+    parts = urlsplit(base_url)
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    samples: List[Tuple[str, float, bool]] = []
+    lock = threading.Lock()
+
+    def client(client_seed):
+        rng = random.Random(client_seed)
+        local = []
+        conn = None
+        while time.time() < deadline:
+            route = rng.choices(routes, weights)[0]
+            method, path, body, headers = build_request(route, rng, max_book_id, patrons)
+            started = time.perf_counter()
+            ok = False
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 500
+                if response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    conn.close()
+                conn = None
+            local.append((route, (time.perf_counter() - started) * 1000, ok))
+        if conn is not None:
+            conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(seed * 1000 + i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(samples)
+
+
+def _free_port() -> int:
+    with socket.create_server(('127.0.0.1', 0)) as probe:
+        return probe.getsockname()[1]
+
+def start_server(workers: int, books: int = 0, loans: int = 0, seed: int = 0,
+                 threads: int = 8) -> Tuple[str, List, int, int]:
+    """
+    Create the app in test mode, optionally add synthetic data, and run it on
+    serving.serve() (the server behind app.py --serve) with `workers` worker
+    processes, from a forked master process.
+
+    Returns:
+        tuple: (base URL, server processes to terminate, highest book ID, number of patrons)
+    """
+    from app import create_app
+    from benchmarks.dataset import generate_dataset
+    from serving import serve
+
+    app = create_app(test_mode=True)
+    db_path = os.environ["LIBRARY_DB_PATH"]
+    patrons = 1000
+    if books:
+        patrons = max(100, loans // 40)
+        generate_dataset(db_path, books=books, loans=loans, patrons=patrons, seed=seed)
+
+    conn = sqlite3.connect(db_path)
+    max_book_id = conn.execute('SELECT MAX(id) FROM books').fetchone()[0]
+    conn.close()
+
+    port = _free_port()
+    context = multiprocessing.get_context('fork')
+    # The master handles SIGTERM from terminate() by shutting its workers down gracefully
+    master = context.Process(target=serve, args=(app,),
+                             kwargs={'host': '127.0.0.1', 'port': port, 'workers': workers, 'threads': threads})
+    master.start()
+
+    return f"http://127.0.0.1:{port}", [master], max_book_id, patrons
+
+def wait_until_ready(base_url: str, timeout: float = 10.0):
+    parts = urlsplit(base_url)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            conn.request('GET', '/catalog')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def summarize(samples: List[Tuple[str, float, bool]], elapsed: float) -> Dict:
+    """Aggregate (route, latency_ms, ok) samples into per-route and total statistics."""
+    by_route: Dict[str, List[Tuple[float, bool]]] = {}
+    for route, latency, ok in samples:
+        by_route.setdefault(route, []).append((latency, ok))
+
+    def stats(entries):
+        latencies = sorted(latency for latency, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        return {
+            'requests': len(entries),
+            'throughput_rps': round(len(entries) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(_percentile(latencies, 0.50), 2),
+            'p95_ms': round(_percentile(latencies, 0.95), 2),
+            'p99_ms': round(_percentile(latencies, 0.99), 2),
+            'errors': errors,
+            'error_rate': round(errors / len(entries), 4) if entries else 0.0,
+        }
+
+    report = {route: stats(entries) for route, entries in sorted(by_route.items())}
+    report['total'] = stats([(latency, ok) for _, latency, ok in samples])
+    return report
+
+def run_load(base_url: str, mix: Dict[str, int], client_procs: int, clients: int, duration: float,
+             max_book_id: int, patrons: int, seed: int = 0, timeout: float = 10.0) -> Dict:
+    """Drive the mixed workload against base_url and return the summary."""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    started = time.time()
+    deadline = started + duration
+    processes = [
+        context.Process(target=_client_process, args=(base_url, mix, clients, deadline, seed + i,
+                                                      max_book_id, patrons, timeout, results))
+        for i in range(client_procs)
+    ]
+    for process in processes:
+        process.start()
+    samples = []
+    for _ in processes:
+        samples.extend(results.get())
+    for process in processes:
+        process.join()
+    return summarize(samples, time.time() - started)
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'route':<14} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}"]
+    for route, stats in report.items():
+        lines.append(f"{route:<14} {stats['requests']:>9} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>8.1f} "
+                     f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate']:>7.2%}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the library app with a mixed workload.")
+    parser.add_argument("--url", help="Target an already running server instead of starting one.")
+    parser.add_argument("--workers", type=int, default=4, help="Server worker processes to start.")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per server worker.")
+    parser.add_argument("--client-procs", type=int, default=2, help="Load generator processes.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients per load generator process.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+    parser.add_argument("--mix", help="Route weights, e.g. catalog=20,search=20,api_search=25,borrow=10,return=10,api_late_fee=15")
+    parser.add_argument("--books", type=int, default=0, help="Synthetic books to add before the run.")
+    parser.add_argument("--loans", type=int, default=0, help="Synthetic borrow records to add before the run.")
+    parser.add_argument("--max-book-id", type=int, default=3, help="Highest book ID to target with --url.")
+    parser.add_argument("--patrons", type=int, default=1000, help="Number of patron IDs to use with --url.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    workload = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    workers = []
+    if args.url:
+        target, top_book_id, patron_count = args.url, args.max_book_id, args.patrons
+    else:
+        target, workers, top_book_id, patron_count = start_server(args.workers, args.books, args.loans, args.seed,
+                                                                  args.threads)
+
+    try:
+        wait_until_ready(target)
+        summary = run_load(target, workload, args.client_procs, args.clients, args.duration,
+                           top_book_id, patron_count, args.seed)
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+    print(format_report(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
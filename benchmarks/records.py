@@ -0,0 +1,99 @@
+"""
+Record Benchmark - Memory and load time of rows as dicts versus record classes
+
+Loads every row of books and borrow_records from a generated database twice:
+as dicts (sqlite3.Row converted with dict(), as the helpers used to return them)
+and as the __slots__ records from records.py. Reports the median load time and
+the memory the loaded list holds.
+
+Usage:
+    python -m benchmarks.records
+    python -m benchmarks.records --rows 100000 --output records.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.dataset import generate_dataset
+from records import Book, BorrowRecord
+
+TABLES = {'books': Book, 'borrow_records': BorrowRecord}
+
+
+def _load_dicts(conn: sqlite3.Connection, table: str, record_class) -> List:
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute(f'SELECT {record_class.columns()} FROM {table}')]
+
+def _load_records(conn: sqlite3.Connection, table: str, record_class) -> List:
+    conn.row_factory = record_class.from_row
+    return conn.execute(f'SELECT {record_class.columns()} FROM {table}').fetchall()
+
+def _measure(load: Callable, conn: sqlite3.Connection, table: str, record_class, repeat: int) -> Dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(conn, table, record_class)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    rows = load(conn, table, record_class)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'rows': len(rows),
+        'median_ms': round(statistics.median(samples) * 1000, 1),
+        'memory_mb': round(held / 1_000_000, 2),
+    }
+
+def measure_records(rows: int = 100_000, repeat: int = 5, workdir: str = None) -> Dict[str, Dict]:
+    """
+    Load `rows` books and `rows` borrow records as dicts and as records.
+
+    Returns:
+        dict: {table: {'dict': {...}, 'record': {...}}} with rows, median_ms and memory_mb
+    """
+    report = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        path = os.path.join(directory, "records.db")
+        generate_dataset(path, books=rows, loans=rows, seed=1)
+        conn = sqlite3.connect(path)
+        try:
+            for table, record_class in TABLES.items():
+                report[table] = {
+                    'dict': _measure(_load_dicts, conn, table, record_class, repeat),
+                    'record': _measure(_load_records, conn, table, record_class, repeat),
+                }
+        finally:
+            conn.close()
+    return report
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'table':<15} {'rows as':<7} {'rows':>8} {'median ms':>10} {'memory MB':>10}"]
+    for table, results in report.items():
+        for kind in ('dict', 'record'):
+            stats = results[kind]
+            lines.append(f"{table:<15} {kind:<7} {stats['rows']:>8} {stats['median_ms']:>10.1f} "
+                         f"{stats['memory_mb']:>10.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare dict rows with record classes.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Books and borrow records to load.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed loads per variant.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    summary = measure_records(args.rows, args.repeat)
+    print(format_report(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,327 @@
+"""
+Service Micro-benchmarks - Timing for every function in services/library_service.py
+
+Each benchmark runs against generated datasets of increasing size (see
+benchmarks.dataset) and reports ops/sec, p50/p99 latency and peak allocation per
+call. Results are written as JSON and compared against a stored baseline; the run
+exits non-zero when a benchmark got slower than the tolerance allows. The default
+baseline (benchmarks/results/baseline.json) is local and untracked, and the
+comparison is skipped when it does not exist; a baseline passed with --baseline
+must exist, so a CI gate cannot pass without one.
+
+Usage:
+    python -m benchmarks.services_bench --sizes 1000,10000,100000
+    python -m benchmarks.services_bench --save-baseline          # record the current numbers
+    python -m benchmarks.services_bench --only search_books_in_catalog --tolerance 0.1
+    python -m benchmarks.services_bench --baseline ci/baseline.json           # fail if it is missing
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.dataset import generate_dataset
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, calculate_late_fee_for_book, get_patron_status_report,
+    pay_late_fees, return_book_by_patron, search_books_in_catalog
+)
+from services.search_cache import SEARCH_CACHE
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_LOANS_PER_BOOK = 5
+DEFAULT_TOLERANCE = 0.25
+
+# Latency percentiles are noisier than throughput, so they get extra headroom
+P99_TOLERANCE_FACTOR = 2.0
+
+
+class StubPaymentGateway:
+    """Zero-latency stand-in for PaymentGateway, so pay_late_fees measures only our code."""
+
+    def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
+        return True, f"txn_{patron_id}_0", f"Payment of ${amount:.2f} processed successfully"
+
+    def refund_payment(self, transaction_id: str, amount: float) -> Tuple[bool, str]:
+        return True, f"Refund of ${amount:.2f} processed successfully."
+
+
+class BenchmarkContext:
+    """Loan and patron samples taken from the dataset before timing starts."""
+
+    def __init__(self, db_path: str, seed: int):
+        self.rng = random.Random(seed)
+        conn = sqlite3.connect(db_path)
+        self.book_ids = [row[0] for row in conn.execute('SELECT id FROM books')]
+        self.active_loans = conn.execute('''
+            SELECT patron_id, book_id FROM borrow_records WHERE return_date IS NULL
+        ''').fetchall()
+        self.overdue_loans = conn.execute('''
+            SELECT patron_id, book_id FROM borrow_records WHERE return_date IS NULL AND due_date < ?
+        ''', (datetime.now().isoformat(),)).fetchall()
+        self.patrons = [row[0] for row in conn.execute('SELECT DISTINCT patron_id FROM borrow_records LIMIT 10000')]
+        conn.close()
+        self.rng.shuffle(self.active_loans)
+        self.counter = 0
+
+    def next_number(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def _bench_add_book(ctx: BenchmarkContext) -> Callable:
+    def call():
+        number = ctx.next_number()
+        add_book_to_catalog(f"Benchmark Book {number}", "Bench Author", f"977{number:010d}", 2)
+    return call
+
+def _bench_borrow(ctx: BenchmarkContext) -> Callable:
+    def call():
+        number = ctx.next_number()
+        # Fresh patron every five borrows so the borrowing limit is not the common path
+        borrow_book_by_patron(f"{900000 + number // 5 % 99999:06d}", ctx.rng.choice(ctx.book_ids))
+    return call
+
+def _bench_return(ctx: BenchmarkContext) -> Callable:
+    loans = list(ctx.active_loans)
+
+    def call():
+        patron_id, book_id = loans.pop() if loans else (ctx.rng.choice(ctx.patrons), ctx.rng.choice(ctx.book_ids))
+        return_book_by_patron(patron_id, book_id)
+    return call
+
+def _bench_late_fee(ctx: BenchmarkContext) -> Callable:
+    def call():
+        patron_id, book_id = ctx.rng.choice(ctx.active_loans)
+        calculate_late_fee_for_book(patron_id, book_id)
+    return call
+
+SEARCH_QUERIES = [("river", "title"), ("the", "title"), ("smith", "author"), ("9790000000042", "isbn")]
+
+def _bench_search(ctx: BenchmarkContext) -> Callable:
+    def call():
+        # Only four distinct queries, so without this every call after the warmup is a cache hit
+        SEARCH_CACHE.clear()
+        term, search_type = SEARCH_QUERIES[ctx.next_number() % len(SEARCH_QUERIES)]
+        search_books_in_catalog(term, search_type)
+    return call
+
+def _bench_search_cached(ctx: BenchmarkContext) -> Callable:
+    # Repeated searches answered from SEARCH_CACHE, which the warmup calls fill
+    def call():
+        term, search_type = SEARCH_QUERIES[ctx.next_number() % len(SEARCH_QUERIES)]
+        search_books_in_catalog(term, search_type)
+    return call
+
+def _bench_status_report(ctx: BenchmarkContext) -> Callable:
+    def call():
+        get_patron_status_report(ctx.rng.choice(ctx.patrons))
+    return call
+
+def _bench_pay_late_fees(ctx: BenchmarkContext) -> Callable:
+    gateway = StubPaymentGateway()
+    loans = ctx.overdue_loans or ctx.active_loans
+
+    def call():
+        patron_id, book_id = ctx.rng.choice(loans)
+        pay_late_fees(patron_id, book_id, gateway)
+    return call
+
+# Read-only benchmarks first, so they see the dataset as generated
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], Callable]] = {
+    'search_books_in_catalog': _bench_search,
+    'search_books_in_catalog_cached': _bench_search_cached,
+    'calculate_late_fee_for_book': _bench_late_fee,
+    'get_patron_status_report': _bench_status_report,
+    'pay_late_fees': _bench_pay_late_fees,
+    'add_book_to_catalog': _bench_add_book,
+    'borrow_book_by_patron': _bench_borrow,
+    'return_book_by_patron': _bench_return,
+}
+
+
+def _percentile(sorted_values: List[int], fraction: float) -> int:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(call: Callable, min_time: float, max_iterations: int, warmup: int = 3,
+            alloc_iterations: int = 5) -> Dict:
+    """Time repeated calls of `call`, then measure peak allocation over a few more calls."""
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    clock = time.perf_counter_ns
+    started = clock()
+    deadline = started + int(min_time * 1e9)
+    while len(latencies) < max_iterations:
+        before = clock()
+        call()
+        after = clock()
+        latencies.append(after - before)
+        if after >= deadline:
+            break
+    total_ns = clock() - started
+
+    tracemalloc.start()
+    peak_bytes = 0
+    for _ in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_bytes = max(peak_bytes, peak - baseline)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': len(latencies),
+        'ops_per_sec': round(len(latencies) / (total_ns / 1e9), 2),
+        'p50_us': round(_percentile(latencies, 0.50) / 1000, 2),
+        'p99_us': round(_percentile(latencies, 0.99) / 1000, 2),
+        'peak_alloc_bytes': peak_bytes,
+    }
+
+def prepare_dataset(data_dir: str, books: int, loans: int, seed: int) -> str:
+    """Return a cached dataset file for this size, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"books{books}_loans{loans}_seed{seed}.db")
+    if not os.path.exists(path):
+        partial = path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate_dataset(partial, books=books, loans=loans, seed=seed)
+        os.replace(partial, path)
+    return path
+
+def run_suite(sizes, loans_per_book: int = DEFAULT_LOANS_PER_BOOK, only: Optional[List[str]] = None,
+              min_time: float = 1.0, max_iterations: int = 10000, seed: int = 0,
+              data_dir: str = ".bench_data") -> Dict:
+    """Run the selected benchmarks at each dataset size and return the results document."""
+    names = [name for name in BENCHMARKS if not only or name in only]
+    results = {}
+    previous_path = os.environ.get("LIBRARY_DB_PATH")
+
+    try:
+        for books in sizes:
+            source = prepare_dataset(data_dir, books, books * loans_per_book, seed)
+            results[str(books)] = {}
+            for name in names:
+                # Every benchmark starts from a pristine copy, so writes do not leak between them
+                working_copy = source + ".work"
+                shutil.copyfile(source, working_copy)
+                os.environ["LIBRARY_DB_PATH"] = working_copy
+                ctx = BenchmarkContext(working_copy, seed)
+                results[str(books)][name] = measure(BENCHMARKS[name](ctx), min_time, max_iterations)
+                os.remove(working_copy)
+    finally:
+        if previous_path is None:
+            os.environ.pop("LIBRARY_DB_PATH", None)
+        else:
+            os.environ["LIBRARY_DB_PATH"] = previous_path
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'loans_per_book': loans_per_book,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+def compare_to_baseline(current: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Return one message per regression: throughput down, or p50/p99 latency up,
+    by more than the tolerance. Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for size, benchmarks in current['results'].items():
+        for name, now in benchmarks.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            if now['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+                regressions.append(f"{name} @ {size} books: {now['ops_per_sec']:.0f} ops/s "
+                                   f"(baseline {before['ops_per_sec']:.0f})")
+            if now['p50_us'] > before['p50_us'] * (1 + tolerance):
+                regressions.append(f"{name} @ {size} books: p50 {now['p50_us']:.1f} us "
+                                   f"(baseline {before['p50_us']:.1f})")
+            if now['p99_us'] > before['p99_us'] * (1 + tolerance * P99_TOLERANCE_FACTOR):
+                regressions.append(f"{name} @ {size} books: p99 {now['p99_us']:.1f} us "
+                                   f"(baseline {before['p99_us']:.1f})")
+    return regressions
+
+def format_table(document: Dict) -> str:
+    lines = [f"{'benchmark':<30} {'books':>8} {'ops/s':>10} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>9}"]
+    for size, benchmarks in document['results'].items():
+        for name, result in benchmarks.items():
+            lines.append(f"{name:<30} {size:>8} {result['ops_per_sec']:>10.0f} {result['p50_us']:>10.1f} "
+                         f"{result['p99_us']:>10.1f} {result['peak_alloc_bytes'] / 1024:>9.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the library service functions.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated catalog sizes (number of books).")
+    parser.add_argument("--loans-per-book", type=int, default=DEFAULT_LOANS_PER_BOOK)
+    parser.add_argument("--only", help="Comma-separated benchmark names to run.")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to spend timing each benchmark.")
+    parser.add_argument("--max-iterations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=".bench_data", help="Where generated datasets are cached.")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", help=f"Baseline to compare against; must exist unless saving one "
+                                           f"(default {DEFAULT_BASELINE}, skipped if missing).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a benchmark counts as a regression.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    args = parser.parse_args()
+    if args.baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} does not exist")
+    baseline_path = args.baseline or DEFAULT_BASELINE
+
+    document = run_suite(
+        [int(size) for size in args.sizes.split(",")],
+        loans_per_book=args.loans_per_book,
+        only=args.only.split(",") if args.only else None,
+        min_time=args.min_time,
+        max_iterations=args.max_iterations,
+        seed=args.seed,
+        data_dir=args.data_dir,
+    )
+    print(format_table(document))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        shutil.copyfile(args.output, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+        sys.exit(0)
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+        sys.exit(0)
+
+    with open(baseline_path) as f:
+        found = compare_to_baseline(document, json.load(f), args.tolerance)
+    for regression in found:
+        print(f"REGRESSION: {regression}")
+    print("No regressions against baseline." if not found else f"{len(found)} regression(s).")
+    sys.exit(1 if found else 0)
@@ -0,0 +1,86 @@
+"""
+Startup Benchmark - Time to build the app on cold and warm databases
+
+A cold start creates the schema in a new database file; a warm start opens a
+database that is already at the current schema version, which should cost a
+single PRAGMA read. Each scenario calls create_app() repeatedly and reports the
+median and worst time in milliseconds.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 50 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import database
+from app import create_app
+
+
+def _summarize(samples: List[float]) -> Dict:
+    return {
+        'runs': len(samples),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3),
+    }
+
+def _time_create_app() -> float:
+    start = time.perf_counter()
+    create_app()
+    return time.perf_counter() - start
+
+def measure_startup(repeat: int = 20, workdir: str = None) -> Dict[str, Dict]:
+    """
+    Time create_app() against a fresh database file (cold) and an already
+    initialized one (warm).
+
+    Returns:
+        dict: {'cold': {...}, 'warm': {...}} with runs, median_ms and max_ms
+    """
+    previous_cwd = os.getcwd()
+    previous_path = os.environ.get("LIBRARY_DB_PATH")
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        # create_app() points LIBRARY_DB_PATH at library.db in the working directory
+        os.chdir(directory)
+        try:
+            cold = []
+            for _ in range(repeat):
+                if os.path.exists("library.db"):
+                    os.remove("library.db")
+                cold.append(_time_create_app())
+
+            warm = [_time_create_app() for _ in range(repeat)]
+        finally:
+            os.chdir(previous_cwd)
+            if previous_path is None:
+                os.environ.pop("LIBRARY_DB_PATH", None)
+            else:
+                os.environ["LIBRARY_DB_PATH"] = previous_path
+
+    return {'cold': _summarize(cold), 'warm': _summarize(warm), 'schema_version': database.SCHEMA_VERSION}
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'start':<6} {'runs':>6} {'median ms':>10} {'max ms':>10}"]
+    for name in ('cold', 'warm'):
+        stats = report[name]
+        lines.append(f"{name:<6} {stats['runs']:>6} {stats['median_ms']:>10.2f} {stats['max_ms']:>10.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time app startup on cold and warm databases.")
+    parser.add_argument("--repeat", type=int, default=20, help="create_app() calls per scenario.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    summary = measure_startup(args.repeat)
+    print(format_report(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
@@ -5,24 +5,107 @@ Handles all database operations and connections
 
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import os
+import threading
+import time
+
+from monitoring.sql_trace import record_statement
+from monitoring.tracing import CLIENT, traced
+from records import Book, BorrowRecord, BorrowedBook, CurrentLoan, LoanHistoryEntry
+
+class TimedConnection(sqlite3.Connection):
+    """
+    SQLite connection that records the execution time of every statement
+    (metrics, slow-query log and per-request query count).
+
+    Only the execute step is timed; rows fetched afterwards are not included.
+    """
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - start)
+
+# Span decorator for the helpers below
+traced_query = traced(kind=CLIENT, attributes={'db.system': 'sqlite'})
+
+# LIBRARY_DB_PATH=:memory: selects this named in-memory database, so every
+# connection in the process sees the same data instead of a fresh empty database.
+# It uses SQLite's memdb VFS rather than "mode=memory&cache=shared": shared-cache
+# table locks fail immediately with "database table is locked" instead of waiting,
+# while memdb uses normal locking and honours the busy timeout. Explicit
+# "file:...?mode=memory" or "vfs=memdb" URIs are kept alive the same way.
+MEMORY_DB = ":memory:"
+MEMORY_URI = "file:/library?vfs=memdb"
+
+# An in-memory database is dropped when its last connection closes, so one
+# keeper connection per database stays open until close_memory_database()
+_memory_keepers: Dict[str, sqlite3.Connection] = {}
+_memory_keepers_lock = threading.Lock()
 
 def get_db_path():
     return os.environ.get("LIBRARY_DB_PATH", "library.db")
 
+def is_memory_database(path: str = None) -> bool:
+    path = path or get_db_path()
+    return path == MEMORY_DB or (path.startswith("file:") and ("mode=memory" in path or "vfs=memdb" in path))
+
+def _connection_target(path: str) -> Tuple[str, bool]:
+    """Return (database, uri) arguments for sqlite3.connect()."""
+    if path == MEMORY_DB:
+        return MEMORY_URI, True
+    return path, path.startswith("file:")
+
+def _keep_memory_database(target: str):
+    if target in _memory_keepers:
+        return
+    with _memory_keepers_lock:
+        if target not in _memory_keepers:
+            _memory_keepers[target] = sqlite3.connect(target, uri=True, check_same_thread=False)
+
+def close_memory_database(path: str = None):
+    """Close the keeper connection, discarding the in-memory database's contents."""
+    target, _ = _connection_target(path or get_db_path())
+    with _memory_keepers_lock:
+        keeper = _memory_keepers.pop(target, None)
+    if keeper is not None:
+        keeper.close()
+
 def get_db_connection():
     """Get a database connection."""
-    conn = sqlite3.connect(get_db_path())
+    path = get_db_path()
+    target, uri = _connection_target(path)
+    if is_memory_database(path):
+        _keep_memory_database(target)
+    conn = sqlite3.connect(target, uri=uri, factory=TimedConnection)
     conn.row_factory = sqlite3.Row  # This enables column access by name
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
+def enable_wal():
+    """
+    Switch the database to write-ahead logging, so readers in other worker
+    processes are not blocked by a writer. The setting is stored in the file.
+    """
     conn = get_db_connection()
-    
-    # Create books table
-    conn.execute('''
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.close()
+
+# Schema migrations, applied in order. Migration N brings the database to
+# version N (stored in PRAGMA user_version). Append new migrations; never edit old ones.
+MIGRATIONS = [
+    # 1: books and borrow_records
+    [
+        '''
         CREATE TABLE IF NOT EXISTS books (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
@@ -31,10 +114,8 @@ def init_database():
             total_copies INTEGER NOT NULL,
             available_copies INTEGER NOT NULL
         )
-    ''')
-    
-    # Create borrow_records table
-    conn.execute('''
+        ''',
+        '''
         CREATE TABLE IF NOT EXISTS borrow_records (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             patron_id TEXT NOT NULL,
@@ -44,13 +125,127 @@ def init_database():
             return_date TEXT,
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
-    ''')
-    
-    conn.commit()
-    conn.close()
+        ''',
+    ],
+    # 2: catalog-wide version, bumped by triggers on every change to books
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        ''',
+        "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 1, strftime('%Y-%m-%dT%H:%M:%f', 'now'))",
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_insert_bumps_catalog_version AFTER INSERT ON books
+        BEGIN
+            UPDATE catalog_version SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_update_bumps_catalog_version AFTER UPDATE ON books
+        BEGIN
+            UPDATE catalog_version SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_delete_bumps_catalog_version AFTER DELETE ON books
+        BEGIN
+            UPDATE catalog_version SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now');
+        END
+        ''',
+    ],
+    # 3: change log for incremental catalog sync. Triggers keep one row per book,
+    # its latest change, so the table never outgrows the catalog.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_catalog_changes_book ON catalog_changes (book_id)',
+        # Existing books count as inserted, so a client syncing from 0 gets the full catalog
+        '''
+        INSERT OR IGNORE INTO catalog_changes (book_id, operation, changed_at)
+        SELECT id, 'insert', strftime('%Y-%m-%dT%H:%M:%f', 'now') FROM books ORDER BY id
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_insert_logs_change AFTER INSERT ON books
+        BEGIN
+            DELETE FROM catalog_changes WHERE book_id = NEW.id;
+            INSERT INTO catalog_changes (book_id, operation, changed_at)
+            VALUES (NEW.id, 'insert', strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_update_logs_change AFTER UPDATE ON books
+        BEGIN
+            DELETE FROM catalog_changes WHERE book_id = NEW.id;
+            INSERT INTO catalog_changes (book_id, operation, changed_at)
+            VALUES (NEW.id, 'update', strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS books_delete_logs_change AFTER DELETE ON books
+        BEGIN
+            DELETE FROM catalog_changes WHERE book_id = OLD.id;
+            INSERT INTO catalog_changes (book_id, operation, changed_at)
+            VALUES (OLD.id, 'delete', strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+        END
+        ''',
+    ],
+    # 4: borrow history lookups by patron and by date range
+    [
+        'CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_borrow_date ON borrow_records (patron_id, borrow_date)',
+        'CREATE INDEX IF NOT EXISTS idx_borrow_records_borrow_date ON borrow_records (borrow_date)',
+    ],
+]
 
-def add_sample_data():
-    """Add sample data to the database if it's empty."""
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+@traced_query
+def init_database() -> bool:
+    """
+    Bring the database schema up to SCHEMA_VERSION.
+
+    A warm database costs one PRAGMA read; DDL only runs for missing migrations.
+
+    Returns:
+        bool: True if any migration was applied
+    """
+    conn = get_db_connection()
+    try:
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            return False
+
+        # Take the write lock, then re-read: another process may have migrated meanwhile
+        conn.execute('BEGIN IMMEDIATE')
+        version = get_schema_version(conn)
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not take parameters; number is always an int
+            conn.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+        return version < SCHEMA_VERSION
+    finally:
+        conn.close()
+
+@traced_query
+def add_sample_data() -> bool:
+    """
+    Add sample data to the database if it's empty.
+
+    Returns:
+        bool: True if the sample books were added
+    """
     conn = get_db_connection()
     book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
     
@@ -82,35 +277,222 @@ def add_sample_data():
         conn.commit()
     
     conn.close()
+    return book_count == 0
 
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
+# Helpers return records (see records.py) built straight from the row tuples,
+# so the SELECT lists must follow the record's field order
+BOOK_COLUMNS = Book.columns()
+BORROW_RECORD_COLUMNS = BorrowRecord.columns()
+
+@traced_query
+def get_all_books() -> List[Book]:
     """Get all books from the database."""
     conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
+    conn.row_factory = Book.from_row
+    books = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title, id').fetchall()
     conn.close()
-    return [dict(book) for book in books]
+    return books
+
+# Rows fetched per round trip by the iter_* helpers
+ITER_BATCH_SIZE = 500
+
+def _iter_rows(conn, cursor, batch_size: int) -> Iterator:
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+@traced_query
+def iter_all_books(batch_size: int = ITER_BATCH_SIZE) -> Iterator[Book]:
+    """
+    Like get_all_books(), but rows are fetched in batches as the iterator is consumed.
+
+    The query runs immediately (so errors surface here); the connection closes
+    when the iterator is exhausted or closed.
+    """
+    conn = get_db_connection()
+    conn.row_factory = Book.from_row
+    cursor = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title, id')
+    return _iter_rows(conn, cursor, batch_size)
+
+@traced_query
+def iter_books_by_id(batch_size: int = ITER_BATCH_SIZE) -> Iterator[Book]:
+    """All books in ID order (no sort step), fetched in batches; see iter_all_books()."""
+    conn = get_db_connection()
+    conn.row_factory = Book.from_row
+    cursor = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books ORDER BY id')
+    return _iter_rows(conn, cursor, batch_size)
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
+@traced_query
+def iter_borrow_records(patron_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                        batch_size: int = ITER_BATCH_SIZE) -> Iterator[BorrowRecord]:
+    """
+    Borrow records ordered by borrow date, fetched in batches; see iter_all_books().
+
+    Args:
+        patron_id: Only this patron's records (uses the (patron_id, borrow_date) index)
+        since: Only records borrowed at or after this ISO date/time
+        until: Only records borrowed before this ISO date/time
+    """
+    conditions, parameters = [], []
+    if patron_id is not None:
+        conditions.append('patron_id = ?')
+        parameters.append(patron_id)
+    if since is not None:
+        conditions.append('borrow_date >= ?')
+        parameters.append(since)
+    if until is not None:
+        conditions.append('borrow_date < ?')
+        parameters.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_db_connection()
+    conn.row_factory = BorrowRecord.from_row
+    cursor = conn.execute(f'SELECT {BORROW_RECORD_COLUMNS} FROM borrow_records {where} ORDER BY borrow_date, id',
+                          parameters)
+    return _iter_rows(conn, cursor, batch_size)
+
+@traced_query
+def get_book_by_id(book_id: int) -> Optional[Book]:
     """Get a specific book by ID."""
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+    conn.row_factory = Book.from_row
+    book = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books WHERE id = ?', (book_id,)).fetchone()
     conn.close()
-    return dict(book) if book else None
+    return book
 
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
+@traced_query
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
     """Get a specific book by ISBN."""
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    conn.row_factory = Book.from_row
+    book = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?', (isbn,)).fetchone()
     conn.close()
-    return dict(book) if book else None
+    return book
+
+# ISBNs bound per IN (...) query; stays under SQLite's default 999-variable limit
+ISBN_LOOKUP_CHUNK_SIZE = 500
+
+@traced_query
+def get_books_by_isbns(isbns: List[str]) -> List[Book]:
+    """
+    Get the books with any of the given ISBNs, in no particular order.
+
+    Each chunk of ISBNs is one IN (...) query on the unique ISBN index, so
+    the cost grows with the number of ISBNs rather than the catalog size.
+    """
+    conn = get_db_connection()
+    conn.row_factory = Book.from_row
+    books = []
+    for start in range(0, len(isbns), ISBN_LOOKUP_CHUNK_SIZE):
+        chunk = isbns[start:start + ISBN_LOOKUP_CHUNK_SIZE]
+        books += conn.execute(f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn IN ({", ".join("?" * len(chunk))})',
+                              chunk).fetchall()
+    conn.close()
+    return books
+
+# Fields a search can name; "all" searches every one of them
+SEARCH_FIELDS = ('title', 'author', 'isbn')
+
+def _search_conditions(conn, criteria: List[Tuple[str, str]]) -> Tuple[str, str, Dict]:
+    """
+    WHERE clause, ORDER BY clause and parameters for a search.
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+    Every (field, term) criterion must match. Titles and authors match
+    case-insensitive substrings, ISBNs match exactly, and field "all" matches
+    any of the three. Within each criterion a book ranks by its best match:
+    ISBN, then exact title, title prefix, other title substring, then the same
+    three for the author. Books are ordered by the first criterion's rank, then
+    the next, then by title and ID. Terms must already be lowercased.
+    """
+    if all(term.isascii() for _, term in criteria):
+        lower = 'lower'
+    else:
+        # SQLite's lower() only folds ASCII letters
+        conn.create_function('py_lower', 1, str.lower, deterministic=True)
+        lower = 'py_lower'
+
+    where, order, parameters = [], [], {}
+    for n, (field, term) in enumerate(criteria):
+        parameters.update({f'term{n}': term, f'upper{n}': term.upper(), f'length{n}': len(term)})
+        matches, ranks = [], []
+        for name in SEARCH_FIELDS if field == 'all' else (field,):
+            if name == 'isbn':
+                # IN keeps the unique index usable; ISBNs only have digits and X
+                matches.append(f'isbn IN (:term{n}, :upper{n})')
+                ranks.append(matches[-1])
+            else:
+                text = f'{lower}({name})'
+                matches.append(f'instr({text}, :term{n}) > 0')
+                ranks += [f'{text} = :term{n}', f'substr({text}, 1, :length{n}) = :term{n}', matches[-1]]
+        where.append(' OR '.join(matches) if len(matches) == 1 else f"({' OR '.join(matches)})")
+        if len(ranks) > 1:
+            # The last alternative is all that is left when the others fail
+            cases = ' '.join(f'WHEN {rank} THEN {i}' for i, rank in enumerate(ranks[:-1]))
+            order.append(f'CASE {cases} ELSE {len(ranks) - 1} END')
+    return ' AND '.join(where), ', '.join(order + ['title', 'id']), parameters
+
+@traced_query
+def search_books(criteria: List[Tuple[str, str]], limit: Optional[int] = None, offset: int = 0) -> List[Book]:
+    """
+    Books matching every search criterion, best rank first, then in catalog
+    order; all fields are searched in this one statement.
+
+    SQLite keeps only the best limit + offset rows while sorting, so a page of
+    results never sorts the whole match set.
+
+    Args:
+        criteria: (field, term) pairs; field is "title", "author", "isbn" or
+            "all", and the term is lowercased and stripped
+        limit: Most books to return (None for all)
+        offset: Number of best matches to skip
+    """
+    conn = get_db_connection()
+    where, order, parameters = _search_conditions(conn, criteria)
+    conn.row_factory = Book.from_row
+    books = conn.execute(f'''
+        SELECT {BOOK_COLUMNS} FROM books
+        WHERE {where}
+        ORDER BY {order}
+        LIMIT :limit OFFSET :offset
+    ''', {**parameters, 'limit': -1 if limit is None else limit, 'offset': offset}).fetchall()
+    conn.close()
+    return books
+
+@traced_query
+def count_search_matches(criteria: List[Tuple[str, str]],
+                         sample_size: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    Count the books matching a search (see search_books()) among the first
+    `sample_size` books in ID order, or among all books.
+
+    Returns:
+        tuple: (matches, books examined, books in the catalog)
+    """
+    conn = get_db_connection()
+    where, _, parameters = _search_conditions(conn, criteria)
+    total = conn.execute('SELECT COUNT(*) AS count FROM books').fetchone()['count']
+    examined = total if sample_size is None else min(sample_size, total)
+    matches = conn.execute(f'''
+        SELECT COUNT(*) AS count FROM (SELECT * FROM books ORDER BY id LIMIT :sample)
+        WHERE {where}
+    ''', {**parameters, 'sample': examined}).fetchone()['count']
+    conn.close()
+    return matches, examined, total
+
+@traced_query
+def get_patron_borrowed_books(patron_id: str) -> List[BorrowedBook]:
     """Get currently borrowed books for a patron."""
     conn = get_db_connection()
+    conn.row_factory = None
     records = conn.execute('''
-        SELECT br.*, b.title, b.author 
+        SELECT br.book_id, b.title, b.author, br.borrow_date, br.due_date
         FROM borrow_records br 
         JOIN books b ON br.book_id = b.id 
         WHERE br.patron_id = ? AND br.return_date IS NULL
@@ -118,19 +500,76 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     ''', (patron_id,)).fetchall()
     conn.close()
     
+    now = datetime.now()
     borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
+    for book_id, title, author, borrow_date, due_date in records:
+        due_date = datetime.fromisoformat(due_date)
+        borrowed_books.append(BorrowedBook(book_id, title, author, datetime.fromisoformat(borrow_date),
+                                           due_date, now > due_date))
     
     return borrowed_books
 
+@traced_query
+def get_catalog_version() -> Tuple[int, datetime]:
+    """
+    Get the catalog-wide version and the time (UTC) it last changed.
+
+    The version is bumped by triggers whenever a book is inserted, updated
+    (including availability) or deleted, by any process.
+    """
+    conn = get_db_connection()
+    row = conn.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    conn.close()
+    return row['version'], datetime.fromisoformat(row['updated_at'])
+
+@traced_query
+def get_catalog_changes(since: int, limit: int) -> List[Dict]:
+    """
+    Get books changed after change sequence number `since`, oldest change first.
+
+    insert_book and update_book_availability (like any write to books) log the
+    change through triggers; each book appears once, at its latest change.
+    Deleted books have 'book' set to None.
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT c.seq, c.book_id, c.operation, c.changed_at,
+               b.title, b.author, b.isbn, b.total_copies, b.available_copies
+        FROM catalog_changes c
+        LEFT JOIN books b ON b.id = c.book_id
+        WHERE c.seq > ?
+        ORDER BY c.seq
+        LIMIT ?
+    ''', (since, limit)).fetchall()
+    conn.close()
+
+    return [
+        {
+            'seq': row['seq'],
+            'operation': row['operation'],
+            'changed_at': row['changed_at'],
+            'book_id': row['book_id'],
+            'book': None if row['operation'] == 'delete' else {
+                'id': row['book_id'],
+                'title': row['title'],
+                'author': row['author'],
+                'isbn': row['isbn'],
+                'total_copies': row['total_copies'],
+                'available_copies': row['available_copies'],
+            },
+        }
+        for row in rows
+    ]
+
+@traced_query
+def get_catalog_change_seq() -> int:
+    """Get the sequence number of the latest catalog change (0 if there are none)."""
+    conn = get_db_connection()
+    seq = conn.execute('SELECT COALESCE(MAX(seq), 0) AS seq FROM catalog_changes').fetchone()['seq']
+    conn.close()
+    return seq
+
+@traced_query
 def get_patron_borrow_count(patron_id: str) -> int:
     """Get the number of books currently borrowed by a patron."""
     conn = get_db_connection()
@@ -141,6 +580,7 @@ def get_patron_borrow_count(patron_id: str) -> int:
     conn.close()
     return count
 
+@traced_query
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
     conn = get_db_connection()
@@ -156,6 +596,7 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
         conn.close()
         return False
 
+@traced_query
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
     conn = get_db_connection()
@@ -171,6 +612,7 @@ def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, du
         conn.close()
         return False
 
+@traced_query
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
     conn = get_db_connection()
@@ -185,6 +627,7 @@ def update_book_availability(book_id: int, change: int) -> bool:
         conn.close()
         return False
 
+@traced_query
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
     conn = get_db_connection()
@@ -202,8 +645,10 @@ def update_borrow_record_return_date(patron_id: str, book_id: int, return_date:
         return False
 
 
+@traced_query
 def get_patron_borrowing_info(patron_id: str) -> Dict:
     conn = get_db_connection()
+    conn.row_factory = None
 
     # Query for currently borrowed books
     current_borrowed_books = conn.execute('''
@@ -224,28 +669,18 @@ def get_patron_borrowing_info(patron_id: str) -> Dict:
 
     conn.close()
 
-    # Format the results to dictionaries for easy handling
+    # Format the results as records with parsed dates
     current_borrowed_books = [
-        {
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'due_date': datetime.fromisoformat(record['due_date']) if record['due_date'] else None
-        }
-        for record in current_borrowed_books
+        CurrentLoan(book_id, title, author, datetime.fromisoformat(due_date) if due_date else None)
+        for book_id, title, author, due_date in current_borrowed_books
     ]
     
     borrowing_history = [
-        {
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'isbn': record['isbn'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'return_date': datetime.fromisoformat(record['return_date']) if record['return_date'] else None
-        }
-        for record in borrowing_history
+        LoanHistoryEntry(book_id, title, author, isbn,
+                         datetime.fromisoformat(borrow_date),
+                         datetime.fromisoformat(due_date),
+                         datetime.fromisoformat(return_date) if return_date else None)
+        for book_id, title, author, isbn, borrow_date, due_date, return_date in borrowing_history
     ]
     
     return {
@@ -0,0 +1,40 @@
+"""
+Monitoring Package - Request instrumentation for the Flask app
+"""
+
+import time
+
+from flask import g, request
+
+from .metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+from .profiling import configure_profiling
+from .sql_trace import configure_sql_trace
+from .tracing import configure_tracing
+
+def register_monitoring(app):
+    """Install the request hooks for metrics, the SQL trace, profiling and span tracing."""
+    configure_profiling(app)
+    configure_tracing(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def remember_response_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        started = g.pop('request_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        status = str(g.pop('response_status', 500))
+        labels = {'method': request.method, 'endpoint': request.endpoint or 'unmatched', 'status': status}
+        HTTP_REQUESTS.inc(**labels)
+        HTTP_REQUEST_DURATION.observe(duration, **labels)
+
+    # Registered last so its after_request hook runs before the status is recorded
+    configure_sql_trace(app)
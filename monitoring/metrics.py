@@ -0,0 +1,363 @@
+"""
+Metrics Module - In-process metrics registry
+Counters and histograms rendered in the Prometheus text exposition format.
+
+Recording is a dictionary lookup, a bisect and a few additions under a per-metric
+lock, so the metrics below are cheap enough to leave on in production.
+
+Under the pre-fork server every worker has its own registry. Workers publish
+theirs to a shared directory (share_metrics()), and expose_metrics() sums the
+files of every worker, past and present, so whichever worker answers a scrape
+reports the same monotonic totals.
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds; tuned for web requests, SQLite statements and the payment gateway
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    """Base class for a named metric family with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """Sample lines in the exposition format, without HELP and TYPE."""
+
+    @abstractmethod
+    def reset(self):
+        """Forget every recorded value."""
+
+    def state(self) -> list:
+        """Recorded values as JSON-compatible data, for merge() in another process."""
+        return []
+
+    def merge(self, state: list):
+        """Add values recorded by another process (see state())."""
+
+    def empty_copy(self, registry: "Registry", copies: Dict[str, "Metric"]) -> "Metric":
+        """The same metric family, with no values, in another registry."""
+        return type(self)(self.name, self.documentation, self.labelnames, registry=registry)
+
+    def expose(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self.collect()
+
+
+class Counter(Metric):
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def state(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, state: list):
+        for key, value in state:
+            self.inc(value, **dict(zip(self.labelnames, key)))
+
+
+class Histogram(Metric):
+    """Bucketed observations per label set, exported as cumulative buckets plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager that observes the wall-clock duration of its body."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def state(self) -> list:
+        with self._lock:
+            return [[list(key), [*counts], total, count] for key, (counts, total, count) in self._values.items()]
+
+    def merge(self, state: list):
+        with self._lock:
+            for key, counts, total, count in state:
+                current = self._values.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                if len(counts) != len(current[0]):
+                    continue  # recorded with other buckets
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+    def empty_copy(self, registry: "Registry", copies: Dict[str, Metric]) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, registry=registry, buckets=self.buckets)
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class CacheRatio(Metric):
+    """Hit ratio per cache, derived from the cache request counter at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, requests: Counter, registry=None):
+        super().__init__(name, documentation, ('cache',), registry)
+        self.requests = requests
+
+    def collect(self) -> List[str]:
+        totals: Dict[str, List[float]] = {}
+        with self.requests._lock:
+            for (cache, result), value in self.requests._values.items():
+                hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+                if result == 'hit':
+                    hits_and_total[0] += value
+                hits_and_total[1] += value
+        return [
+            f"{self.name}{_format_labels(self.labelnames, (cache,))} {_format_value(hits / total if total else 0.0)}"
+            for cache, (hits, total) in sorted(totals.items())
+        ]
+
+    def reset(self):
+        pass
+
+    def empty_copy(self, registry: "Registry", copies: Dict[str, Metric]) -> "CacheRatio":
+        return CacheRatio(self.name, self.documentation, copies[self.requests.name], registry)
+
+
+class Registry:
+    """Ordered collection of metric families."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Clear every recorded value (used by tests and after forking a worker)."""
+        for metric in list(self._metrics):
+            metric.reset()
+
+    def snapshot(self) -> Dict[str, list]:
+        """Every metric's state(), by metric name."""
+        return {metric.name: metric.state() for metric in list(self._metrics)}
+
+    def merged(self, snapshots: Iterable[Dict[str, list]]) -> "Registry":
+        """A new registry with the same metrics, holding the sum of the given snapshots."""
+        registry = Registry()
+        copies: Dict[str, Metric] = {}
+        for metric in list(self._metrics):
+            copies[metric.name] = metric.empty_copy(registry, copies)
+        for snapshot in snapshots:
+            for name, state in snapshot.items():
+                if name in copies:
+                    copies[name].merge(state)
+        return registry
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter(
+    "library_http_requests_total", "HTTP requests handled, by endpoint and status.",
+    ('method', 'endpoint', 'status'))
+HTTP_REQUEST_DURATION = Histogram(
+    "library_http_request_duration_seconds", "Time spent handling HTTP requests, by endpoint and status.",
+    ('method', 'endpoint', 'status'))
+
+SQLITE_QUERY_DURATION = Histogram(
+    "library_sqlite_query_duration_seconds", "Time spent executing SQLite statements, by statement type.",
+    ('operation',))
+
+CACHE_REQUESTS = Counter(
+    "library_cache_requests_total", "Cache lookups, by cache and result (hit or miss).",
+    ('cache', 'result'))
+CACHE_HIT_RATIO = CacheRatio(
+    "library_cache_hit_ratio", "Fraction of cache lookups that were hits.", CACHE_REQUESTS)
+
+PAYMENT_GATEWAY_DURATION = Histogram(
+    "library_payment_gateway_duration_seconds", "Time spent waiting on the payment gateway, by operation.",
+    ('operation',))
+
+EVENT_SUBSCRIBERS_DROPPED = Counter(
+    "library_event_subscribers_dropped_total", "Event stream subscribers dropped for falling behind, by stream.",
+    ('stream',))
+
+
+def record_query(sql: str, duration: float):
+    """Record one executed SQLite statement."""
+    operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "UNKNOWN"
+    SQLITE_QUERY_DURATION.observe(duration, operation=operation)
+
+def record_cache_access(cache: str, hit: bool):
+    """Record a lookup in one of the application's caches."""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+# Seconds between writes of a worker's metrics to the shared directory
+SHARE_INTERVAL = 1.0
+
+_shared_path: Optional[str] = None
+
+
+def share_metrics(directory: str, interval: float = SHARE_INTERVAL):
+    """
+    Publish this process's metrics to `directory` every `interval` seconds, and
+    make expose_metrics() report the sum over every process publishing there.
+
+    Each process writes its own file, named by PID and start time so that a
+    restarted worker never overwrites the totals of the one it replaces.
+    """
+    global _shared_path
+    _shared_path = os.path.join(directory, f"metrics-{os.getpid()}-{time.time_ns()}.json")
+    publish_metrics()
+
+    def publish_forever():
+        while True:
+            time.sleep(interval)
+            publish_metrics()
+
+    threading.Thread(target=publish_forever, name="metrics-share", daemon=True).start()
+
+def publish_metrics():
+    """Write this process's metrics to its file in the shared directory, if share_metrics() was called."""
+    if _shared_path is None:
+        return
+    partial = f"{_shared_path}.tmp"
+    with open(partial, "w") as file:
+        json.dump(REGISTRY.snapshot(), file)
+    os.replace(partial, _shared_path)
+
+def expose_metrics() -> str:
+    """
+    The /metrics page: this process's metrics, or with share_metrics() the sum
+    over all processes (up to SHARE_INTERVAL seconds old for the others).
+    """
+    if _shared_path is None:
+        return REGISTRY.expose()
+
+    publish_metrics()
+    directory = os.path.dirname(_shared_path)
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.startswith("metrics-") and name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue  # removed or replaced while reading
+    return REGISTRY.merged(snapshots).expose()
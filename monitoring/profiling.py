@@ -0,0 +1,111 @@
+"""
+Profiling Module - On-demand cProfile capture for individual requests
+A request is profiled when it carries the admin X-Profile header or is picked by the
+sampling rate. Each profile is written as a pstats file named after the endpoint and
+the request duration, e.g. ``1760000000000-search.search_books-412.7ms.pstats``.
+
+Inspect a profile with ``python -m pstats <file>``.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from flask import current_app, g, request
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SUFFIX = ".pstats"
+
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.]")
+_PROFILE_NAME = re.compile(r"^(\d+)-(.+)-(\d+(?:\.\d+)?)ms\.pstats$")
+
+
+def profile_token_matches(value: Optional[str]) -> bool:
+    """Check a header value against the configured admin token."""
+    token = current_app.config['PROFILE_TOKEN']
+    return bool(token and value and hmac.compare_digest(value, token))
+
+def should_profile() -> bool:
+    if request.blueprint == 'monitoring':
+        return False
+    if profile_token_matches(request.headers.get(PROFILE_HEADER)):
+        return True
+    rate = current_app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+def list_profiles(profile_dir: str, limit: int = 50) -> List[Dict]:
+    """Return metadata for the most recent profiles, newest first."""
+    if not os.path.isdir(profile_dir):
+        return []
+
+    profiles = []
+    for name in os.listdir(profile_dir):
+        match = _PROFILE_NAME.match(name)
+        if not match:
+            continue
+        created_ms, endpoint, duration_ms = match.groups()
+        profiles.append({
+            'file': name,
+            'endpoint': endpoint,
+            'duration_ms': float(duration_ms),
+            'created': int(created_ms) / 1000,
+            'size': os.path.getsize(os.path.join(profile_dir, name))
+        })
+
+    profiles.sort(key=lambda profile: profile['created'], reverse=True)
+    return profiles[:limit]
+
+def prune_profiles(profile_dir: str, keep: int):
+    """Delete the oldest profiles so at most `keep` remain."""
+    for profile in list_profiles(profile_dir, limit=10 ** 9)[keep:]:
+        try:
+            os.remove(os.path.join(profile_dir, profile['file']))
+        except FileNotFoundError:
+            pass
+
+def configure_profiling(app):
+    """
+    Read profiling settings from the app config and install the request hooks.
+
+    Config keys:
+        PROFILE_DIR: where pstats files are written (env LIBRARY_PROFILE_DIR)
+        PROFILE_TOKEN: admin token accepted in the X-Profile header (env LIBRARY_PROFILE_TOKEN)
+        PROFILE_SAMPLE_RATE: fraction of requests profiled without the header (env LIBRARY_PROFILE_SAMPLE_RATE)
+        PROFILE_KEEP: number of profiles kept on disk
+    """
+    app.config.setdefault('PROFILE_DIR', os.environ.get("LIBRARY_PROFILE_DIR", "profiles"))
+    app.config.setdefault('PROFILE_TOKEN', os.environ.get("LIBRARY_PROFILE_TOKEN"))
+    app.config.setdefault('PROFILE_SAMPLE_RATE', float(os.environ.get("LIBRARY_PROFILE_SAMPLE_RATE", "0")))
+    app.config.setdefault('PROFILE_KEEP', 200)
+
+    @app.before_request
+    def start_profiler():
+        if not should_profile():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this process
+            return
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+
+        profile_dir = current_app.config['PROFILE_DIR']
+        os.makedirs(profile_dir, exist_ok=True)
+        endpoint = _UNSAFE_CHARACTERS.sub("_", request.endpoint or "unmatched")
+        name = f"{int(time.time() * 1000)}-{endpoint}-{duration_ms:.1f}ms{PROFILE_SUFFIX}"
+        profiler.dump_stats(os.path.join(profile_dir, name))
+        prune_profiles(profile_dir, current_app.config['PROFILE_KEEP'])
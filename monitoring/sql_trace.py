@@ -0,0 +1,105 @@
+"""
+SQL Trace Module - Per-statement accounting for SQLite queries
+Every statement executed through database.get_db_connection() is timed, normalized
+and attached to the current Flask request, so slow statements can be logged and
+requests that issue too many queries (N+1 patterns) can be caught in development.
+"""
+
+import logging
+import os
+import re
+from collections import Counter as Tally
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from flask import current_app, g, has_request_context, request
+
+from .metrics import record_query
+
+logger = logging.getLogger("library.sql")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Defaults for code running outside an app (scripts, unit tests)
+slow_query_seconds = float(os.environ.get("LIBRARY_SLOW_QUERY_MS", "100")) / 1000
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in development when a request issues more SQL statements than its budget."""
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """
+    Reduce a statement to its shape: literals become ?, placeholder lists collapse
+    to (?+) and whitespace is squeezed, so identical queries group together.
+    """
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+def record_statement(sql: str, duration: float):
+    """Account for one executed statement in metrics, the slow-query log and the current request."""
+    record_query(sql, duration)
+
+    if duration >= slow_query_seconds:
+        logger.warning("Slow query (%.1f ms): %s", duration * 1000, normalize_sql(sql))
+
+    if has_request_context():
+        statements = g.get('sql_statements')
+        if statements is None:
+            statements = g.sql_statements = []
+        statements.append((sql, duration))
+
+def request_statements() -> List[Tuple[str, float]]:
+    """Return the (sql, duration) pairs recorded so far for the current request."""
+    return g.get('sql_statements') or []
+
+def request_query_summary() -> Tuple[int, float]:
+    """Return (query count, total query seconds) for the current request."""
+    statements = request_statements()
+    return len(statements), sum(duration for _, duration in statements)
+
+def most_repeated_statements(limit: int = 3) -> List[Tuple[str, int]]:
+    """Return the normalized statements issued most often in the current request."""
+    tally = Tally(normalize_sql(sql) for sql, _ in request_statements())
+    return tally.most_common(limit)
+
+def configure_sql_trace(app):
+    """
+    Read SQL trace settings from the app config and install the per-request checks.
+
+    Config keys:
+        SQL_SLOW_QUERY_MS: statements slower than this are logged (env LIBRARY_SLOW_QUERY_MS)
+        SQL_QUERY_BUDGET: maximum statements per request (env LIBRARY_QUERY_BUDGET)
+        SQL_ENFORCE_QUERY_BUDGET: fail requests over budget; defaults to on in debug mode
+    """
+    global slow_query_seconds
+
+    app.config.setdefault('SQL_SLOW_QUERY_MS', float(os.environ.get("LIBRARY_SLOW_QUERY_MS", "100")))
+    app.config.setdefault('SQL_QUERY_BUDGET', int(os.environ.get("LIBRARY_QUERY_BUDGET", "20")))
+    app.config.setdefault('SQL_ENFORCE_QUERY_BUDGET', None)
+    slow_query_seconds = app.config['SQL_SLOW_QUERY_MS'] / 1000
+
+    @app.after_request
+    def check_query_budget(response):
+        count, seconds = request_query_summary()
+        enforce = current_app.config['SQL_ENFORCE_QUERY_BUDGET']
+        if enforce is None:
+            enforce = current_app.debug
+
+        if enforce:
+            response.headers['X-Query-Count'] = str(count)
+            response.headers['X-Query-Time-Ms'] = f"{seconds * 1000:.2f}"
+            budget: Optional[int] = current_app.config['SQL_QUERY_BUDGET']
+            if budget is not None and count > budget:
+                repeated = ", ".join(f"{times}x {sql}" for sql, times in most_repeated_statements())
+                raise QueryBudgetExceeded(
+                    f"{request.method} {request.path} issued {count} SQL statements (budget {budget}). Most repeated: {repeated}"
+                )
+
+        return response
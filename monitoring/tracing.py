@@ -0,0 +1,224 @@
+"""
+Tracing Module - Lightweight in-process span tracing
+Spans are propagated through a context variable, so a route handler, the service
+functions it calls and the database helpers they use end up in one trace. When the
+root span ends, the whole trace is handed to the exporter.
+
+Tracing is off unless an exporter is configured (TRACE_FILE / env LIBRARY_TRACE_FILE);
+while off, a traced function costs one extra global lookup per call.
+
+Exported traces are written one per line in the OTLP/JSON shape
+({"resourceSpans": [{"scopeSpans": [{"spans": [...]}]}]}).
+"""
+
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+# OpenTelemetry span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+SERVICE_NAME = "library-management"
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('library_current_span', default=None)
+_exporter = None
+_NO_SPAN = nullcontext()
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_span_id', 'name', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'status_code', 'status_message', 'trace_spans', '_token')
+
+    def __init__(self, name: str, kind: int = INTERNAL, attributes: Optional[Dict] = None,
+                 parent: Optional['Span'] = None):
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.span_id = secrets.token_hex(8)
+        if parent is None:
+            self.trace_id = secrets.token_hex(16)
+            self.parent_span_id = ""
+            self.trace_spans: List['Span'] = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_span_id = parent.span_id
+            self.trace_spans = parent.trace_spans
+        self.status_code = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace_spans.append(self)
+        if not self.parent_span_id and _exporter is not None:
+            _exporter.export(self.trace_spans)
+
+    def to_otlp(self) -> Dict:
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': self.status_code, 'message': self.status_message},
+        }
+
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class JsonlSpanExporter:
+    """Append each finished trace to a file as one OTLP/JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        line = json.dumps({
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', SERVICE_NAME)]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.to_otlp() for span in spans],
+                }],
+            }]
+        }) + "\n"
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+
+class InMemorySpanExporter:
+    """Keep finished traces in a list (used by tests)."""
+
+    def __init__(self):
+        self.traces: List[List[Span]] = []
+
+    def export(self, spans: List[Span]):
+        self.traces.append(list(spans))
+
+
+def set_exporter(exporter):
+    """Turn tracing on with the given exporter, or off with None."""
+    global _exporter
+    _exporter = exporter
+
+def tracing_enabled() -> bool:
+    return _exporter is not None
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def start_span(name: str, kind: int = INTERNAL, attributes: Optional[Dict] = None):
+    """
+    Start a span as a child of the current one, for use in a ``with`` block.
+    Returns a no-op context manager when tracing is off.
+    """
+    if _exporter is None:
+        return _NO_SPAN
+    return Span(name, kind, attributes, _current_span.get())
+
+def traced(name: Optional[str] = None, kind: int = INTERNAL, attributes: Optional[Dict] = None):
+    """Decorator that wraps every call of a function in a span."""
+
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with Span(span_name, kind, attributes, _current_span.get()):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+def configure_tracing(app):
+    """
+    Read tracing settings from the app config and install the request span hooks.
+
+    Config keys:
+        TRACE_FILE: JSONL file that finished traces are appended to (env LIBRARY_TRACE_FILE)
+    """
+    app.config.setdefault('TRACE_FILE', os.environ.get("LIBRARY_TRACE_FILE"))
+    if app.config['TRACE_FILE']:
+        set_exporter(JsonlSpanExporter(app.config['TRACE_FILE']))
+
+    @app.before_request
+    def start_request_span():
+        if _exporter is None:
+            return
+        span = Span(f"{request.method} {request.endpoint or 'unmatched'}", SERVER, {
+            'http.method': request.method,
+            'http.target': request.full_path.rstrip('?'),
+            'http.route': request.url_rule.rule if request.url_rule else '',
+        })
+        g.trace_span = span
+        g.trace_token = _current_span.set(span)
+
+    @app.after_request
+    def record_response_status(response):
+        span = g.get('trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status_code = STATUS_ERROR
+        return response
+
+    @app.teardown_request
+    def end_request_span(exc):
+        span = g.pop('trace_span', None)
+        if span is None:
+            return
+        if exc is not None:
+            span.record_error(exc)
+        _current_span.reset(g.pop('trace_token'))
+        span.end()
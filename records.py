@@ -0,0 +1,132 @@
+"""
+Record types for rows read from the database
+
+Each record is a small __slots__ class instead of a dict: a row costs a fixed
+set of attribute slots rather than a hash table, which roughly halves the memory
+of large result sets and is quicker to build. Records still read like the dicts
+they replace (record['title'], record.get('isbn'), dict(record)), so services,
+templates and tests use them unchanged, and they serialize to the same JSON
+objects (see to_dict()).
+"""
+
+from typing import Any, Dict, Tuple
+
+
+class Record:
+    """Base class; subclasses list their columns in _fields (and __slots__)."""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> 'Record':
+        """sqlite3 row_factory; the query must select the columns in _fields order."""
+        return cls(*row)
+
+    @classmethod
+    def columns(cls, prefix: str = "") -> str:
+        """The column list for a SELECT, e.g. "b.id, b.title, ..." with prefix "b."."""
+        return ", ".join(prefix + field for field in cls._fields)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    # Records compare equal to dicts, which are unhashable
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class Book(Record):
+    """A row of the books table."""
+
+    __slots__ = _fields = ('id', 'title', 'author', 'isbn', 'total_copies', 'available_copies')
+
+    def __init__(self, id, title, author, isbn, total_copies, available_copies):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+
+
+class BorrowRecord(Record):
+    """A row of the borrow_records table; dates are kept as stored (ISO strings)."""
+
+    __slots__ = _fields = ('id', 'patron_id', 'book_id', 'borrow_date', 'due_date', 'return_date')
+
+    def __init__(self, id, patron_id, book_id, borrow_date, due_date, return_date):
+        self.id = id
+        self.patron_id = patron_id
+        self.book_id = book_id
+        self.borrow_date = borrow_date
+        self.due_date = due_date
+        self.return_date = return_date
+
+
+class BorrowedBook(Record):
+    """A book a patron has out, with parsed dates."""
+
+    __slots__ = _fields = ('book_id', 'title', 'author', 'borrow_date', 'due_date', 'is_overdue')
+
+    def __init__(self, book_id, title, author, borrow_date, due_date, is_overdue):
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self.borrow_date = borrow_date
+        self.due_date = due_date
+        self.is_overdue = is_overdue
+
+
+class CurrentLoan(Record):
+    """A book a patron has out, as listed in their status report."""
+
+    __slots__ = _fields = ('book_id', 'title', 'author', 'due_date')
+
+    def __init__(self, book_id, title, author, due_date):
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self.due_date = due_date
+
+
+class LoanHistoryEntry(Record):
+    """One of a patron's past or current loans, as listed in their status report."""
+
+    __slots__ = _fields = ('book_id', 'title', 'author', 'isbn', 'borrow_date', 'due_date', 'return_date')
+
+    def __init__(self, book_id, title, author, isbn, borrow_date, due_date, return_date):
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.borrow_date = borrow_date
+        self.due_date = due_date
+        self.return_date = return_date
@@ -2,11 +2,34 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+import hmac
+import json
+import os
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from database import get_catalog_changes
+from services.library_service import (MAX_SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, calculate_late_fee_for_book,
+                                      lookup_books_by_isbn, search_catalog_page, suggest_completions)
+from services.events import AVAILABILITY_EVENTS
+from services.export_service import EXPORT_FORMATS, export_table, validate_export_request
+from routes.conditional import catalog_conditional
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+
+LOOKUP_MAX_ISBNS = 1000
+
+# Seconds between keep-alive comments on an idle event stream (SSE_HEARTBEAT_SECONDS)
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+# Open event streams per worker (SSE_MAX_STREAMS); each holds a request thread
+DEFAULT_MAX_STREAMS = 4
+STREAM_RETRY_AFTER_SECONDS = 5
+
 @api_bp.route('/late_fee/<patron_id>/<int:book_id>')
 def get_late_fee(patron_id, book_id):
     """
@@ -17,6 +40,7 @@ def get_late_fee(patron_id, book_id):
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
 @api_bp.route('/search')
+@catalog_conditional
 def search_books_api():
     """
     Search for books via API endpoint.
@@ -24,16 +48,182 @@ def search_books_api():
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    mode = request.args.get('mode', 'substring')
     
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
+
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+
+    if offset < 0 or not 1 <= limit <= MAX_SEARCH_PAGE_SIZE:
+        return jsonify({'error': f'offset must be >= 0 and limit between 1 and {MAX_SEARCH_PAGE_SIZE}'}), 400
     
-    # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    # Use business logic function; results are ranked, best first
+    page = search_catalog_page(search_term, search_type, mode, limit, offset)
+    books = page['books']
     
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
+        'mode': mode,
         'results': books,
-        'count': len(books)
+        'count': len(books),
+        'limit': limit,
+        'offset': offset,
+        'total': page['total'],
+        'total_is_estimate': page['total_is_estimate']
+    })
+
+@api_bp.route('/suggest')
+@catalog_conditional
+def suggest_api():
+    """
+    Type-ahead completions for the search box: distinct titles or authors
+    starting with q, from an in-memory prefix index (no catalog scan).
+    """
+    prefix = request.args.get('q', '')
+    suggest_type = request.args.get('type', 'title')
+
+    if not prefix.strip():
+        return jsonify({'error': 'Search term is required'}), 400
+
+    if suggest_type not in ('title', 'author'):
+        return jsonify({'error': 'type must be title or author'}), 400
+
+    try:
+        limit = int(request.args.get('limit', SUGGEST_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {SUGGEST_MAX_LIMIT}'}), 400
+
+    return jsonify({
+        'query': prefix,
+        'type': suggest_type,
+        'suggestions': suggest_completions(prefix, suggest_type, limit)
+    })
+
+@api_bp.route('/books/lookup', methods=['POST'])
+def lookup_books_api():
+    """
+    Look up a batch of ISBNs in one request.
+
+    Expects {"isbns": [...]} with up to LOOKUP_MAX_ISBNS strings; ISBN-10s,
+    hyphens and spaces are accepted. Returns the found books keyed by
+    normalized ISBN-13, the missing ISBNs, and the entries that are not ISBNs.
+    """
+    body = request.get_json(silent=True)
+    isbns = body.get('isbns') if isinstance(body, dict) else None
+    if not isinstance(isbns, list) or not all(isinstance(isbn, str) for isbn in isbns):
+        return jsonify({'error': 'Expected a JSON body like {"isbns": ["9780743273565", ...]}'}), 400
+    if len(isbns) > LOOKUP_MAX_ISBNS:
+        return jsonify({'error': f'At most {LOOKUP_MAX_ISBNS} ISBNs per request'}), 400
+
+    return jsonify(lookup_books_by_isbn(isbns))
+
+@api_bp.route('/catalog/changes')
+def catalog_changes_api():
+    """
+    Books changed since a change sequence number, for incremental catalog sync.
+
+    Start with since=0 (the full catalog), then pass the returned next_since on
+    the next call; keep paging while has_more is true. Each book appears once,
+    with its current state, so the work depends on what changed, not catalog size.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', CHANGES_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+
+    if since < 0 or not 1 <= limit <= CHANGES_MAX_PAGE_SIZE:
+        return jsonify({'error': f'since must be >= 0 and limit between 1 and {CHANGES_MAX_PAGE_SIZE}'}), 400
+
+    # One extra row tells whether another page follows
+    changes = get_catalog_changes(since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return jsonify({
+        'changes': changes,
+        'next_since': changes[-1]['seq'] if changes else since,
+        'has_more': has_more
     })
+
+@api_bp.route('/stream/availability')
+def availability_stream():
+    """
+    Server-Sent Events stream of availability changes from borrows and returns.
+
+    Each change is an "availability" event with book_id, available_copies and
+    total_copies. An idle stream gets a comment line every SSE_HEARTBEAT_SECONDS
+    so proxies keep it open and disconnected clients are noticed. A client that
+    falls behind receives a "dropped" event and should reload and reconnect.
+
+    Every open stream holds one of the worker's request threads, so at most
+    SSE_MAX_STREAMS are served at once; further clients get 503 with
+    Retry-After.
+    """
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+    if not AVAILABILITY_EVENTS.open_stream(current_app.config.get('SSE_MAX_STREAMS', DEFAULT_MAX_STREAMS)):
+        return jsonify({'error': 'Too many open event streams; try again later'}), 503, \
+            {'Retry-After': str(STREAM_RETRY_AFTER_SECONDS)}
+
+    def events():
+        # Subscribed only once the body is read, so a HEAD request or a client
+        # gone before the first chunk leaves no subscription behind
+        subscription = AVAILABILITY_EVENTS.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                if subscription.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"event: availability\ndata: {json.dumps(event)}\n\n"
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            AVAILABILITY_EVENTS.unsubscribe(subscription)
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, whether or not the body was read
+    response.call_on_close(AVAILABILITY_EVENTS.close_stream)
+    return response
+
+@api_bp.route('/export/<table>')
+def export_api(table):
+    """
+    Stream a full dump of books or borrow_records.
+
+    Query parameters: format (ndjson or csv), gzip=1, and for borrow_records
+    patron_id, since and until (ISO dates on borrow_date; until is exclusive).
+    The rows include patron IDs, so the export is refused unless EXPORT_TOKEN
+    (env LIBRARY_EXPORT_TOKEN) is configured and sent in the X-Export-Token header.
+    """
+    token = current_app.config.get('EXPORT_TOKEN', os.environ.get("LIBRARY_EXPORT_TOKEN"))
+    if not token or not hmac.compare_digest(request.headers.get('X-Export-Token', ''), token):
+        abort(403)
+
+    fmt = request.args.get('format', 'ndjson')
+    compress = request.args.get('gzip', '0') not in ('', '0', 'false')
+    patron_id = request.args.get('patron_id') or None
+    since = request.args.get('since') or None
+    until = request.args.get('until') or None
+
+    error = validate_export_request(table, fmt, patron_id, since, until)
+    if error:
+        return jsonify({'error': error}), 400
+
+    filename = f"{table}.{fmt}" + (".gz" if compress else "")
+    return Response(export_table(table, fmt, compress, patron_id, since, until),
+                    mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
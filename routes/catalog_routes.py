@@ -3,8 +3,10 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
+from database import iter_all_books
 from services.library_service import add_book_to_catalog
+from routes.conditional import catalog_conditional
+from routes.streaming import render_streamed
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -14,13 +16,14 @@ def index():
     return redirect(url_for('catalog.catalog'))
 
 @catalog_bp.route('/catalog')
+@catalog_conditional
 def catalog():
     """
     Display all books in the catalog.
     Implements R2: Book Catalog Display
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    # Rows are rendered as they are fetched, so large catalogs start arriving at once
+    return render_streamed('catalog.html', books=iter_all_books())
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
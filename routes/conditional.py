@@ -0,0 +1,69 @@
+"""
+Conditional GET - ETag and Last-Modified validation for pages built from the catalog
+"""
+
+import time
+import zlib
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, make_response, request, session
+
+from database import get_catalog_version
+from monitoring.metrics import record_cache_access
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+
+def catalog_etag(version: int) -> str:
+    """Strong ETag for the current URL at a catalog version (same URL + version = same bytes)."""
+    return f"catalog-{version}-{zlib.crc32(request.full_path.encode()):08x}"
+
+def catalog_conditional(view):
+    """
+    Answer GET requests with 304 Not Modified when the client's copy is current.
+
+    Responses get a strong ETag from the catalog version and the URL, plus
+    Last-Modified from the time of that version. Last-Modified has whole
+    seconds, so another change later in the same second would not move it; it is
+    only sent, and If-Modified-Since only honoured, once that second is over.
+    When the client's validator
+    matches, the view is not called, so neither the catalog query nor the
+    rendering runs. Requests with pending flash messages are always rendered
+    and get no validators, since the page differs from the cached one.
+
+    Searches and suggestions may be answered from the catalog snapshot, which
+    can lag the database; it is brought up to date before the view runs, so a
+    page is never labelled with a newer version than it was built from.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        version, updated_at = get_catalog_version()
+        etag = catalog_etag(version)
+        last_modified = updated_at.replace(microsecond=0, tzinfo=timezone.utc)
+        settled = time.time() >= last_modified.timestamp() + 1
+
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(etag)
+        else:
+            fresh = settled and request.if_modified_since is not None and last_modified <= request.if_modified_since
+        record_cache_access('http_conditional', fresh)
+
+        if fresh:
+            response = Response(status=304)
+        else:
+            CATALOG_SNAPSHOT.catch_up()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if settled:
+            response.last_modified = last_modified
+        # Caches may keep the page but must revalidate before reusing it
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
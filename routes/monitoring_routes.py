@@ -0,0 +1,39 @@
+"""
+Monitoring Routes - Operational endpoints
+"""
+
+import os
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, send_from_directory
+from monitoring.metrics import CONTENT_TYPE, expose_metrics
+from monitoring.profiling import PROFILE_HEADER, list_profiles, profile_token_matches
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+@monitoring_bp.route('/metrics')
+def metrics():
+    """
+    Export all recorded metrics in the Prometheus text exposition format; under
+    the pre-fork server, the totals of all workers.
+    """
+    return Response(expose_metrics(), content_type=CONTENT_TYPE)
+
+@monitoring_bp.route('/debug/profiles')
+def profiles():
+    """
+    List the most recent request profiles, newest first.
+    Requires the admin token in the X-Profile header.
+    """
+    if not profile_token_matches(request.headers.get(PROFILE_HEADER)):
+        abort(404)
+
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'profiles': list_profiles(current_app.config['PROFILE_DIR'], limit)})
+
+@monitoring_bp.route('/debug/profiles/<name>')
+def download_profile(name):
+    """Download one pstats file. Requires the admin token in the X-Profile header."""
+    if not profile_token_matches(request.headers.get(PROFILE_HEADER)):
+        abort(404)
+
+    return send_from_directory(os.path.abspath(current_app.config['PROFILE_DIR']), name, as_attachment=True)
@@ -2,12 +2,15 @@
 Search Routes - Book search functionality
 """
 
-from flask import Blueprint, render_template, request, flash
-from services.library_service import search_books_in_catalog
+from flask import Blueprint, render_template, request
+from services.library_service import MAX_SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, search_catalog_page
+from routes.conditional import catalog_conditional
+from routes.streaming import render_streamed
 
 search_bp = Blueprint('search', __name__)
 
 @search_bp.route('/search')
+@catalog_conditional
 def search_books():
     """
     Search for books in the catalog.
@@ -15,14 +18,19 @@ def search_books():
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    mode = request.args.get('mode', 'substring')
+    # Out-of-range paging falls back to the first page
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if not 1 <= limit <= MAX_SEARCH_PAGE_SIZE or offset < 0:
+        limit, offset = SEARCH_PAGE_SIZE, 0
     
     if not search_term:
-        return render_template('search.html', books=[], search_term='', search_type=search_type)
+        return render_template('search.html', books=[], search_term='', search_type=search_type, mode=mode)
     
-    # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    # Use business logic function; results are ranked, best first
+    page = search_catalog_page(search_term, search_type, mode, limit, offset)
     
-    if not books:
-        flash('Search functionality is not yet implemented.', 'error')
-    
-    return render_template('search.html', books=books, search_term=search_term, search_type=search_type)
+    return render_streamed('search.html', books=page['books'], search_term=search_term, search_type=search_type,
+                           mode=mode, limit=limit, offset=offset, total=page['total'],
+                           total_is_estimate=page['total_is_estimate'])
@@ -0,0 +1,43 @@
+"""
+Streaming Pages - Send HTML while the template is still rendering
+"""
+
+from typing import Iterable, Iterator
+
+from flask import Response, get_flashed_messages, stream_template
+
+# Jinja yields many small fragments; they are sent in blocks of about this many characters
+STREAM_BUFFER_SIZE = 16384
+
+def _buffered(fragments: Iterable[str], size: int) -> Iterator[str]:
+    buffer, length = [], 0
+    try:
+        for fragment in fragments:
+            buffer.append(fragment)
+            length += len(fragment)
+            if length >= size:
+                yield "".join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Closing the template stream also releases any database cursor it reads from
+        close = getattr(fragments, 'close', None)
+        if close is not None:
+            close()
+
+def render_streamed(template_name: str, **context) -> Response:
+    """
+    Render a template as a streamed response.
+
+    Pass iterators (e.g. database.iter_all_books()) in the context so rows are
+    rendered as they are fetched; the first bytes go out before the last row
+    is read. Templates must not test an iterator for emptiness with {% if %};
+    use {% for %}...{% else %} instead.
+    """
+    # The session is saved before the body is sent, so pending flash messages
+    # are taken now; the template's get_flashed_messages() returns this cached list.
+    get_flashed_messages(with_categories=True)
+
+    return Response(_buffered(stream_template(template_name, **context), STREAM_BUFFER_SIZE),
+                    mimetype='text/html')
@@ -0,0 +1,454 @@
+"""
+Catalog Snapshot - Columnar in-memory copy of the catalog for search
+
+Optional (python app.py --catalog-snapshot). The snapshot loads every book
+once, then stays current by reading only the catalog change feed after the
+last sequence number it applied (see database.get_catalog_changes). Searches
+run without the database:
+
+- titles and authors are each one pre-lowercased string with the rows joined
+  by a separator, plus an array of row start offsets; a substring search is a
+  str.find() loop over that string, mapped back to rows by bisecting the offsets
+- rows are kept in catalog order (title, then id); a match's rank (exact,
+  prefix or elsewhere in the text) follows from where str.find() found it, and
+  the best offset + limit (rank, row) pairs are picked with a bounded heap
+- an ID array maps rows to books and a dict maps book IDs back to rows; ISBN
+  lookups use a dict from lowercased ISBN to book ID
+- a search over all fields, or with several field:term criteria, runs each
+  field's search once and combines the matched rows' ranks per row
+- for autocomplete, the distinct titles and authors are kept as sorted lists of
+  normalized (casefolded, single-spaced) keys; completing a prefix is a bisect
+  plus a slice of at most `limit` keys
+- for fuzzy search, title and author words have trigram indexes (see
+  services/fuzzy_match.py), built on the first fuzzy search
+
+The columns are built on the first search. Suggestions only need the sorted
+keys, so they work (and keep the catalog loaded) whether or not searches are
+answered from the snapshot.
+
+Book records are kept by ID, so a change that only touches availability just
+replaces the record. New, deleted or renamed books update the sort order and
+the suggestion keys in place and then rejoin the columns from the cached lowercase text, which reads
+nothing from the database but is linear in the catalog size. Writes made in
+this process invalidate the snapshot straight away; changes made by other
+worker processes are picked up within max_age seconds.
+"""
+
+import heapq
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import get_catalog_change_seq, get_catalog_changes, get_db_path, iter_books_by_id
+from records import Book
+from services.fuzzy_match import TrigramIndex
+
+# Joins the rows of a column; never part of a search term, so matches cannot span rows
+SEPARATOR = "\x00"
+DEFAULT_MAX_AGE = 1.0
+REFRESH_PAGE_SIZE = 5000
+
+
+def _find_rows(column: str, starts: array, term: str) -> List[Tuple[int, int]]:
+    """
+    Rows of a joined column containing `term`, in row order, each once, as
+    (rank, row): 0 if the row is the term, 1 if it starts with it, 2 otherwise.
+    """
+    rows = []
+    last = len(starts) - 1
+    length = len(term)
+    position = column.find(term) if starts else -1
+    while position != -1:
+        row = bisect_right(starts, position) - 1
+        if position != starts[row]:
+            rows.append((2, row))
+        else:
+            end = starts[row + 1] - 1 if row < last else len(column)
+            rows.append((0 if end - position == length else 1, row))
+        if row == last:
+            break
+        position = column.find(term, starts[row + 1])
+    return rows
+
+def normalize_text(value: str) -> str:
+    """Casefold and collapse whitespace; suggestions are matched on this form."""
+    return " ".join(value.casefold().split())
+
+def _join(values: List[str]) -> Tuple[str, array]:
+    # Each row takes its length plus one separator
+    starts = array('q', accumulate(map((1).__add__, map(len, values)), initial=0))
+    starts.pop()
+    return SEPARATOR.join(values), starts
+
+
+class _Columns:
+    """One immutable build of the search columns; row i is the book with ID ids[i]."""
+
+    __slots__ = ('ids', 'rows', 'titles', 'title_starts', 'authors', 'author_starts')
+
+    def __init__(self, ids: List[int], titles: List[str], authors: List[str]):
+        self.ids = array('q', ids)
+        self.rows: Dict[int, int] = {book_id: row for row, book_id in enumerate(ids)}
+        self.titles, self.title_starts = _join(titles)
+        self.authors, self.author_starts = _join(authors)
+
+
+class _PrefixIndex:
+    """Distinct normalized values of one field, sorted for prefix lookups."""
+
+    __slots__ = ('keys', 'values', 'counts')
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: Dict[str, str] = {}  # key -> value as first seen, for display
+        self.counts: Dict[str, int] = {}  # key -> number of books with it
+        for value in values:
+            key = normalize_text(value)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.values.setdefault(key, value)
+        self.keys = sorted(self.counts)
+
+    def add(self, value: str):
+        key = normalize_text(value)
+        if key in self.counts:
+            self.counts[key] += 1
+            return
+        self.counts[key] = 1
+        self.values[key] = value
+        insort(self.keys, key)
+
+    def discard(self, value: str):
+        key = normalize_text(value)
+        count = self.counts.get(key, 0)
+        if count > 1:
+            self.counts[key] = count - 1
+        elif count == 1:
+            del self.counts[key]
+            del self.values[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def complete(self, prefix: str, limit: int) -> List[str]:
+        start = bisect_left(self.keys, prefix)
+        completions = []
+        for key in self.keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            completions.append(self.values[key])
+        return completions
+
+
+class CatalogSnapshot:
+    """In-memory search columns for the catalog of the current database."""
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE):
+        self.enabled = False
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db_path = None
+        self._clear()
+
+    def _clear(self):
+        self._books: Dict[int, Book] = {}
+        self._titles: Dict[int, str] = {}  # lowercased, by book ID
+        self._authors: Dict[int, str] = {}
+        self._isbns: Dict[str, int] = {}
+        self._order: List[Tuple[str, int]] = []  # (title, id), sorted
+        self._prefixes = {'title': _PrefixIndex(), 'author': _PrefixIndex()}
+        self._fuzzy: Optional[Dict[str, TrigramIndex]] = None
+        self._columns: Optional[_Columns] = None
+        self._columns_dirty = True
+        self._loaded = False
+        self._since = 0
+        self._checked = 0.0
+        self._stale = True
+
+    def enable(self, max_age: float = None):
+        if max_age is not None:
+            self.max_age = max_age
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Forget the snapshot, e.g. after the database was replaced; the next search reloads it."""
+        with self._lock:
+            self._clear()
+            self._db_path = None
+
+    def invalidate(self):
+        """Make the next search read the change feed first (call after writing to books)."""
+        self._stale = True
+
+    @property
+    def since(self) -> int:
+        """Sequence number of the last change applied."""
+        return self._since
+
+    def version(self) -> int:
+        """
+        Sequence number of the last change applied, after refreshing the
+        snapshot if a search would; searches answered from the snapshot only
+        change when it does.
+        """
+        if self._needs_refresh():
+            with self._lock:
+                if self._needs_refresh():
+                    self._refresh_locked()
+        return self._since
+
+    def catch_up(self):
+        """
+        Apply every change already in the database, if the snapshot is loaded.
+
+        For callers that have just read the catalog version and label a response
+        with it (see routes/conditional.py): afterwards nothing older than that
+        version is served, whatever max_age allows.
+        """
+        if self._loaded:
+            with self._lock:
+                if self._loaded:
+                    self._refresh_locked()
+
+    def refresh(self) -> int:
+        """
+        Load the catalog, or apply the changes made since the last refresh,
+        and rebuild the search columns if needed.
+
+        Returns:
+            int: Number of books loaded or changes applied
+        """
+        with self._lock:
+            applied = self._refresh_locked()
+            self._build_columns()
+            return applied
+
+    def _refresh_locked(self) -> int:
+        if self._db_path != get_db_path():
+            self._clear()
+            self._db_path = get_db_path()
+
+        # Cleared first, so a write made while the database is read is seen next time
+        self._stale = False
+        self._checked = time.monotonic()
+
+        if not self._loaded:
+            self._columns_dirty = True
+            return self._load()
+
+        applied = 0
+        while True:
+            changes = get_catalog_changes(self._since, REFRESH_PAGE_SIZE)
+            for change in changes:
+                if self._apply(change):
+                    self._columns_dirty = True
+            applied += len(changes)
+            if changes:
+                self._since = changes[-1]['seq']
+            if len(changes) < REFRESH_PAGE_SIZE:
+                return applied
+
+    def _load(self) -> int:
+        # Changes made while the books are read are applied again by the next
+        # refresh, which is harmless: each change carries the whole book
+        since = get_catalog_change_seq()
+        for book in iter_books_by_id():
+            self._books[book.id] = book
+            self._titles[book.id] = book.title.lower()
+            self._authors[book.id] = book.author.lower()
+            self._isbns[book.isbn.lower()] = book.id
+        books = self._books.values()
+        self._order = sorted((book.title, book.id) for book in books)
+        self._prefixes = {'title': _PrefixIndex(book.title for book in books),
+                          'author': _PrefixIndex(book.author for book in books)}
+        self._since = since
+        self._loaded = True
+        return len(self._books)
+
+    def _remove(self, book: Book):
+        del self._order[bisect_left(self._order, (book.title, book.id))]
+        del self._titles[book.id]
+        del self._authors[book.id]
+        self._prefixes['title'].discard(book.title)
+        self._prefixes['author'].discard(book.author)
+        if self._fuzzy is not None:
+            self._fuzzy['title'].remove(book.id, book.title)
+            self._fuzzy['author'].remove(book.id, book.author)
+        if self._isbns.get(book.isbn.lower()) == book.id:
+            del self._isbns[book.isbn.lower()]
+
+    def _apply(self, change: Dict) -> bool:
+        """Apply one change; returns True if the columns must be rebuilt."""
+        book_id = change['book_id']
+        old = self._books.get(book_id)
+        if change['book'] is None:
+            if old is None:
+                return False
+            self._remove(old)
+            del self._books[book_id]
+            return True
+
+        book = Book(**change['book'])
+        self._books[book_id] = book
+        if old is not None:
+            if (old.title, old.author, old.isbn) == (book.title, book.author, book.isbn):
+                return False
+            self._remove(old)
+        insort(self._order, (book.title, book_id))
+        self._titles[book_id] = book.title.lower()
+        self._authors[book_id] = book.author.lower()
+        self._prefixes['title'].add(book.title)
+        self._prefixes['author'].add(book.author)
+        if self._fuzzy is not None:
+            self._fuzzy['title'].add(book_id, book.title)
+            self._fuzzy['author'].add(book_id, book.author)
+        self._isbns[book.isbn.lower()] = book_id
+        return True
+
+    def _needs_refresh(self) -> bool:
+        return (self._stale or not self._loaded or self._db_path != get_db_path()
+                or time.monotonic() - self._checked >= self.max_age)
+
+    def _current(self) -> _Columns:
+        if self._needs_refresh() or self._columns_dirty:
+            with self._lock:
+                # Another thread may have refreshed while this one waited
+                if self._needs_refresh():
+                    self._refresh_locked()
+                self._build_columns()
+        return self._columns
+
+    def _build_columns(self):
+        if self._columns_dirty:
+            ids = list(map(itemgetter(1), self._order))
+            self._columns = _Columns(ids, list(map(self._titles.__getitem__, ids)),
+                                     list(map(self._authors.__getitem__, ids)))
+            self._columns_dirty = False
+
+    def _match(self, columns: _Columns, field: str, term: str) -> List[Tuple[int, int]]:
+        """(rank, row) for each row matching one search criterion, ranked as in database.search_books()."""
+        if SEPARATOR in term:
+            return []
+        if field == "title":
+            return _find_rows(columns.titles, columns.title_starts, term)
+        if field == "author":
+            return _find_rows(columns.authors, columns.author_starts, term)
+
+        isbn_rows = []
+        # None if the book was added after these columns were built
+        row = columns.rows.get(self._isbns.get(term))
+        if row is not None:
+            isbn_rows.append((0, row))
+        if field == "isbn":
+            return isbn_rows
+        # "all": each row's best match; ISBN (0), then title (1-3), then author (4-6)
+        best = {}
+        for base, matches in ((4, self._match(columns, "author", term)),
+                              (1, self._match(columns, "title", term)), (0, isbn_rows)):
+            for rank, row in matches:
+                best[row] = base + rank
+        return [(rank, row) for row, rank in best.items()]
+
+    def search(self, criteria: List[Tuple[str, str]], limit: Optional[int] = None,
+               offset: int = 0) -> Tuple[List[Book], int]:
+        """
+        Same results as database.search_books(), in the same order.
+
+        Terms must already be lowercased and stripped.
+
+        Returns:
+            tuple: The books, and the number of matching books
+        """
+        columns = self._current()
+        matches = self._match(columns, *criteria[0])
+        if len(criteria) > 1:
+            # Rows matching every criterion, keyed by their rank under each in turn
+            ranks = {row: (rank,) for rank, row in matches}
+            for field, term in criteria[1:]:
+                ranks = {row: ranks[row] + (rank,) for rank, row in self._match(columns, field, term) if row in ranks}
+            matches = [(key, row) for row, key in ranks.items()]
+        total = len(matches)
+        best = sorted(matches) if limit is None else heapq.nsmallest(offset + limit, matches)
+        book_ids = [columns.ids[row] for _, row in best[offset:]]
+
+        # A book deleted by a refresh running alongside this search is skipped
+        books = self._books
+        return [book for book in map(books.get, book_ids) if book is not None], total
+
+    def suggest(self, prefix: str, field: str, limit: int) -> List[str]:
+        """
+        Up to `limit` distinct titles or authors (`field`) starting with `prefix`,
+        in alphabetical order, compared after normalize_text().
+        """
+        key = normalize_text(prefix)
+        if key and prefix[-1:].isspace():
+            # "the " should not complete to "theory"
+            key += " "
+        with self._lock:
+            if self._needs_refresh():
+                self._refresh_locked()
+            return self._prefixes[field].complete(key, limit)
+
+    def _fuzzy_scores(self, field: str, term: str) -> Dict[int, float]:
+        """Similarity by book ID for one criterion; ISBNs only match exactly, "all" takes the best field."""
+        if field in self._fuzzy:
+            return self._fuzzy[field].scores(term)
+        isbn = {self._isbns[term]: 1.0} if term in self._isbns else {}
+        if field == "isbn":
+            return isbn
+        scores = self._fuzzy['author'].scores(term)
+        for book_id, score in self._fuzzy['title'].scores(term).items():
+            scores[book_id] = max(score, scores.get(book_id, 0.0))
+        scores.update(isbn)
+        return scores
+
+    def fuzzy_search(self, criteria: List[Tuple[str, str]], limit: int, offset: int = 0) -> Tuple[List[Book], int]:
+        """
+        The `limit` books (after skipping `offset`) best matching every
+        (field, term) criterion, allowing typos in titles and authors; best
+        total similarity first, then shorter (closer) text in the first
+        criterion's field (titles for "all" and ISBN), then catalog order.
+
+        Returns:
+            tuple: The books, and the number of matching books
+        """
+        with self._lock:
+            if self._needs_refresh():
+                self._refresh_locked()
+            if self._fuzzy is None:
+                self._fuzzy = {'title': TrigramIndex(), 'author': TrigramIndex()}
+                for book in self._books.values():
+                    self._fuzzy['title'].add(book.id, book.title)
+                    self._fuzzy['author'].add(book.id, book.author)
+
+            scores = self._fuzzy_scores(*criteria[0])
+            for field, term in criteria[1:]:
+                found = self._fuzzy_scores(field, term)
+                scores = {book_id: score + found[book_id] for book_id, score in scores.items() if book_id in found}
+
+            books = self._books
+            field = criteria[0][0] if criteria[0][0] in self._fuzzy else 'title'
+            top = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (
+                -item[1], len(books[item[0]][field]), books[item[0]].title, item[0]))
+            return [books[book_id] for book_id, _ in top[offset:]], len(scores)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by the search columns, not counting the book records or the ISBN dict."""
+        columns = self._current()
+        sizes = {
+            'titles': sys.getsizeof(columns.titles) + sys.getsizeof(columns.title_starts),
+            'authors': sys.getsizeof(columns.authors) + sys.getsizeof(columns.author_starts),
+            'ids': sys.getsizeof(columns.ids) + sys.getsizeof(columns.rows),
+        }
+        sizes['total'] = sum(sizes.values())
+        return sizes
+
+
+# Shared by the search and suggestion functions in library_service; searches
+# only use it once enabled
+CATALOG_SNAPSHOT = CatalogSnapshot()
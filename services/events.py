@@ -0,0 +1,128 @@
+"""
+Events Module - In-process publish/subscribe for live updates
+
+Publishers hand an event to every current subscriber without blocking. Each
+subscriber has a bounded queue; one that falls behind (its queue is full) is
+dropped and its queued events are freed, so a slow client cannot hold memory or
+slow down the publisher. Subscribers only exist within one process.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from monitoring.metrics import EVENT_SUBSCRIBERS_DROPPED
+
+DEFAULT_MAX_PENDING = 100
+
+
+class Subscription:
+    """One subscriber's queue of pending events."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.dropped = False
+        self._events = deque()
+        self._ready = threading.Condition()
+
+    def offer(self, event: Dict) -> bool:
+        """Queue an event; returns False (and drops the subscriber) if the queue is full."""
+        with self._ready:
+            if self.dropped:
+                return False
+            if len(self._events) >= self.max_pending:
+                # The condition's lock is re-entrant
+                self.close()
+                return False
+            self._events.append(event)
+            self._ready.notify_all()
+            return True
+
+    def close(self):
+        """Mark the subscriber dropped and wake it."""
+        with self._ready:
+            self.dropped = True
+            self._events.clear()
+            self._ready.notify_all()
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """
+        Wait up to `timeout` seconds for the next event.
+
+        Returns:
+            dict: The event, or None on timeout or once the subscriber was dropped
+        """
+        with self._ready:
+            if not self._events and not self.dropped:
+                self._ready.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+
+class EventBroker:
+    """Fan-out of events to all current subscribers."""
+
+    def __init__(self, name: str, max_pending: int = DEFAULT_MAX_PENDING):
+        self.name = name
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._streams = 0
+        self._lock = threading.Lock()
+
+    def open_stream(self, limit: int) -> bool:
+        """
+        Reserve one of `limit` streams for a client, or return False when all
+        are open; every reservation must be ended with close_stream().
+        """
+        with self._lock:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def disconnect_all(self):
+        """Drop every subscriber, e.g. so open streams end when a worker shuts down."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, event: Dict) -> int:
+        """
+        Deliver an event to every subscriber without waiting on any of them.
+
+        Returns:
+            int: Number of subscribers the event was queued for
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        delivered = 0
+        for subscription in subscribers:
+            if subscription.offer(event):
+                delivered += 1
+            else:
+                self.unsubscribe(subscription)
+                EVENT_SUBSCRIBERS_DROPPED.inc(stream=self.name)
+        return delivered
+
+
+# Book availability changes, published by borrow and return after they commit
+AVAILABILITY_EVENTS = EventBroker('availability')
@@ -0,0 +1,155 @@
+"""
+Export Service Module - Streaming dumps of the catalog and borrow history
+Writes books or borrow_records as NDJSON or CSV, optionally gzip-compressed,
+while reading the rows from a database cursor in batches, so memory use does not
+grow with the size of the table.
+
+Usage:
+    python -m services.export_service books --format csv -o books.csv
+    python -m services.export_service borrow_records --since 2025-01-01 --until 2025-07-01 --gzip -o h1.ndjson.gz
+    python -m services.export_service borrow_records --patron 123456
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from database import ITER_BATCH_SIZE, iter_books_by_id, iter_borrow_records
+
+EXPORT_TABLES = {
+    'books': ('id', 'title', 'author', 'isbn', 'total_copies', 'available_copies'),
+    'borrow_records': ('id', 'patron_id', 'book_id', 'borrow_date', 'due_date', 'return_date'),
+}
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def validate_export_request(table: str, fmt: str, patron_id: Optional[str] = None,
+                            since: Optional[str] = None, until: Optional[str] = None) -> Optional[str]:
+    """
+    Check an export request before any rows are read.
+
+    Returns:
+        str: Error message if the request is invalid, otherwise None
+    """
+    if table not in EXPORT_TABLES:
+        return f"Unknown table. Choose from: {', '.join(EXPORT_TABLES)}."
+
+    if fmt not in EXPORT_FORMATS:
+        return f"Unknown format. Choose from: {', '.join(EXPORT_FORMATS)}."
+
+    if table == 'books' and (patron_id or since or until):
+        return "Patron and date filters only apply to borrow_records."
+
+    if patron_id is not None and (not patron_id.isdigit() or len(patron_id) != 6):
+        return "Invalid patron ID. Must be exactly 6 digits."
+
+    for value in (since, until):
+        if value is not None:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                return "Dates must be in ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)."
+
+    return None
+
+def iter_export_rows(table: str, patron_id: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict]:
+    """Rows of `table` straight from the database cursor (call validate_export_request first)."""
+    if table == 'books':
+        return iter_books_by_id(batch_size)
+    return iter_borrow_records(patron_id, since, until, batch_size)
+
+def _encode_ndjson(rows: Iterable[Dict], columns: Tuple[str, ...], batch_size: int) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: row[column] for column in columns}))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+def _encode_csv(rows: Iterable[Dict], columns: Tuple[str, ...], batch_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_table(table: str, fmt: str, compress: bool = False, patron_id: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None,
+                 batch_size: int = ITER_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Encode a table as NDJSON or CSV, one block of `batch_size` rows at a time.
+
+    The query runs when this is called; rows are read as the blocks are consumed.
+
+    Returns:
+        iterator of bytes: The export, gzip-compressed if `compress` is set
+    """
+    rows = iter_export_rows(table, patron_id, since, until, batch_size)
+    encode = _encode_ndjson if fmt == 'ndjson' else _encode_csv
+    chunks = encode(rows, EXPORT_TABLES[table], batch_size)
+    return _gzip(chunks) if compress else chunks
+
+def write_export(out, table: str, fmt: str, compress: bool = False, patron_id: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Write an export to a binary file object.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    error = validate_export_request(table, fmt, patron_id, since, until)
+    if error:
+        return False, error
+
+    written = 0
+    for chunk in export_table(table, fmt, compress, patron_id, since, until):
+        out.write(chunk)
+        written += len(chunk)
+    return True, f"Exported {table} ({written} bytes)."
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export books or borrow records as NDJSON or CSV.")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", default="ndjson", choices=sorted(EXPORT_FORMATS))
+    parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+    parser.add_argument("--patron", help="Only this patron's borrow records.")
+    parser.add_argument("--since", help="Only borrow records from this ISO date on.")
+    parser.add_argument("--until", help="Only borrow records before this ISO date.")
+    parser.add_argument("-o", "--output", help="Output file (default: standard output).")
+    args = parser.parse_args()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        ok, message = write_export(out, args.table, args.format, args.gzip, args.patron, args.since, args.until)
+    finally:
+        if args.output:
+            out.close()
+    print(message, file=sys.stderr)
+    sys.exit(0 if ok else 1)
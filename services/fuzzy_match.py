@@ -0,0 +1,146 @@
+"""
+Fuzzy Match Module - Typo-tolerant word matching for search
+
+Text is split into casefolded words. A TrigramIndex keeps, for one field, the
+distinct words (the vocabulary) with the books containing each, and an inverted
+index from each word's trigrams to the words. A query word is matched by
+counting shared trigrams to pick a few candidate words, checking those with a
+bounded edit distance, and scoring the survivors by similarity. Only the words
+and books reached through the query's trigrams are looked at, never the whole
+catalog.
+"""
+
+import heapq
+import re
+from typing import Dict, List, Set, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Candidate words checked with edit distance, per query word (best trigram overlap first)
+MAX_CANDIDATES = 50
+# Share of trigrams (Dice coefficient) a candidate must have in common with the query word
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.casefold())
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrams of a word padded like pg_trgm ("  w", " wo", "wor", ..., "rd "), so short words have some."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_typos(word: str) -> int:
+    """Edits allowed for a query word: none up to 2 letters, then one per 4 letters (at least one)."""
+    return 0 if len(word) <= 2 else max(1, len(word) // 4)
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edits (insert, delete, substitute, or swap two adjacent letters) to turn a
+    into b, or limit + 1 as soon as it must exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j - 1] + (char_a != char_b), previous[j] + 1, current[j - 1] + 1)
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Vocabulary of one text field with trigram and book postings, updated book by book."""
+
+    def __init__(self):
+        self._books: Dict[str, Set[int]] = {}     # word -> IDs of books containing it
+        self._trigrams: Dict[str, Set[str]] = {}  # trigram -> words containing it
+
+    def add(self, book_id: int, text: str):
+        for word in set(words(text)):
+            books = self._books.get(word)
+            if books is None:
+                books = self._books[word] = set()
+                for trigram in trigrams(word):
+                    self._trigrams.setdefault(trigram, set()).add(word)
+            books.add(book_id)
+
+    def remove(self, book_id: int, text: str):
+        for word in set(words(text)):
+            books = self._books.get(word)
+            if books is None:
+                continue
+            books.discard(book_id)
+            if not books:
+                del self._books[word]
+                for trigram in trigrams(word):
+                    postings = self._trigrams[trigram]
+                    postings.discard(word)
+                    if not postings:
+                        del self._trigrams[trigram]
+
+    def match_word(self, query_word: str) -> List[Tuple[str, float]]:
+        """
+        Vocabulary words within max_typos(query_word) edits of it.
+
+        Returns:
+            list: (word, similarity) pairs; similarity is 1.0 for the word itself
+                and lower the more edits a word needs
+        """
+        limit = max_typos(query_word)
+        if limit == 0:
+            return [(query_word, 1.0)] if query_word in self._books else []
+
+        query_trigrams = trigrams(query_word)
+        shared: Dict[str, int] = {}
+        for trigram in query_trigrams:
+            for word in self._trigrams.get(trigram, ()):
+                shared[word] = shared.get(word, 0) + 1
+
+        def dice(word: str) -> float:
+            return 2 * shared[word] / (len(query_trigrams) + len(word) + 1)  # a word has len + 1 trigrams
+
+        candidates = heapq.nlargest(MAX_CANDIDATES, shared, key=dice)
+        matches = []
+        for word in candidates:
+            if dice(word) < MIN_TRIGRAM_SIMILARITY:
+                break
+            distance = edit_distance(query_word, word, limit)
+            if distance <= limit:
+                matches.append((word, 1 - distance / max(len(query_word), len(word))))
+        return matches
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """
+        Books whose text matches every word of the query, allowing typos, by
+        ID; a book scores the mean similarity of its best match for each word.
+        """
+        query_words = words(query)
+        if not query_words:
+            return {}
+
+        scores: Dict[int, float] = {}
+        for position, query_word in enumerate(query_words):
+            best: Dict[int, float] = {}
+            for word, similarity in self.match_word(query_word):
+                for book_id in self._books[word]:
+                    if similarity > best.get(book_id, 0.0):
+                        best[book_id] = similarity
+            if position == 0:
+                scores = best
+            else:
+                scores = {book_id: score + best[book_id] for book_id, score in scores.items() if book_id in best}
+            if not scores:
+                return {}
+
+        count = len(query_words)
+        return {book_id: score / count for book_id, score in scores.items()}
+
+    def __len__(self) -> int:
+        return len(self._books)
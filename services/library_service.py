@@ -3,15 +3,26 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
+import math
+import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from database import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count, get_patron_borrowed_books,
     insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_patron_borrowing_info
+    update_borrow_record_return_date, get_patron_borrowing_info, search_books, count_search_matches,
+    get_catalog_version, get_books_by_isbns
 )
-from services.payment_service import PaymentGateway
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+from services.search_cache import SEARCH_CACHE
+from services.events import AVAILABILITY_EVENTS
+from monitoring.metrics import PAYMENT_GATEWAY_DURATION
+from monitoring.tracing import CLIENT, start_span, traced
 
+if TYPE_CHECKING:
+    from services.payment_service import PaymentGateway
+
+@traced()
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
     Add a new book to the catalog.
@@ -53,10 +64,30 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     # Insert new book
     success = insert_book(title.strip(), author.strip(), isbn, total_copies, total_copies)
     if success:
+        CATALOG_SNAPSHOT.invalidate()
         return True, f'Book "{title.strip()}" has been successfully added to the catalog.'
     else:
         return False, "Database error occurred while adding the book."
 
+def publish_availability(book_id: int):
+    """
+    Tell live subscribers (see /api/stream/availability) and the catalog
+    snapshot a book's availability changed.
+    Call after the change is committed; does nothing when no one is listening.
+    """
+    CATALOG_SNAPSHOT.invalidate()
+    if not AVAILABILITY_EVENTS.has_subscribers():
+        return
+
+    book = get_book_by_id(book_id)
+    if book:
+        AVAILABILITY_EVENTS.publish({
+            'book_id': book['id'],
+            'available_copies': book['available_copies'],
+            'total_copies': book['total_copies']
+        })
+
+@traced()
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -100,8 +131,11 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not availability_success:
         return False, "Database error occurred while updating book availability."
     
+    publish_availability(book_id)
+    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
+@traced()
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron.
@@ -143,9 +177,12 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not success:
         return False, "Failed to update book availability."
     
+    publish_availability(book_id)
+    
     # Success message with late fee (if any)
     return True, f"Book returned successfully.{late_fee_msg}"
 
+@traced()
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
     Calculate late fees for a specific book.
@@ -195,40 +232,167 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
         'status': 'Late fee calculation successful'
     }    
 
-def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
+# Search types, in the order their criteria are ranked; "all" searches every field
+SEARCH_TYPES = ("all", "title", "author", "isbn")
+# Search modes: "substring" (R6) and "fuzzy" (typo-tolerant; title and author only)
+SEARCH_MODES = ("substring", "fuzzy")
+# author:lee, title:"to kill" - a field-qualified part of a search
+FIELD_QUALIFIER = re.compile(r'(?<!\S)(title|author|isbn):(?:"([^"]*)"|(\S*))', re.IGNORECASE)
+# Results of a fuzzy search when no limit is given, best match first
+FUZZY_RESULT_LIMIT = 20
+# Catalogs up to this size get an exact match count; larger ones count a sample
+EXACT_COUNT_MAX_BOOKS = 20000
+# Results per page for the search page and API
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 200
+
+def parse_search_query(search_term: str, search_type: str) -> List[Tuple[str, str]]:
+    """
+    Split a search into the (field, term) criteria a book must all match.
+
+    field:term and field:"several words" (field being title, author or isbn)
+    search that field; the rest of the text searches search_type. Terms are
+    lowercased and stripped, and criteria are ordered as in SEARCH_TYPES, so
+    "author:lee title:mock" ranks by title first.
+
+    Returns:
+        list: e.g. [('title', 'mock'), ('author', 'lee')]
+    """
+    criteria = []
+    for field, quoted, word in FIELD_QUALIFIER.findall(search_term):
+        term = (quoted or word).lower().strip()
+        if term:
+            criteria.append((field.lower(), term))
+    rest = " ".join(FIELD_QUALIFIER.sub(" ", search_term).split()) if criteria else search_term
+    if rest.strip() or not criteria:
+        criteria.append((search_type, rest.lower().strip()))
+    criteria.sort(key=lambda criterion: SEARCH_TYPES.index(criterion[0]))
+    return criteria
+
+@traced()
+def search_catalog_page(search_term: str, search_type: str, mode: str = "substring",
+                        limit: Optional[int] = None, offset: int = 0) -> Dict:
+    """
+    One page of ranked search results, and how many books match in total.
+
+    search_type "all" matches titles, authors and ISBNs at once, and
+    field-qualified terms narrow a search (see parse_search_query()). Substring
+    searches rank an ISBN match first, then exact matches, prefixes and other
+    substrings, titles before authors, in catalog order within each; fuzzy
+    searches rank by similarity. Only the best offset + limit matches are kept
+    while ranking. An unknown search type or mode matches nothing.
+
+    The total is exact when it comes for free (the last page was reached, the
+    snapshot or fuzzy index enumerated the matches) or the catalog has at most
+    EXACT_COUNT_MAX_BOOKS books; otherwise it is estimated from the first
+    EXACT_COUNT_MAX_BOOKS books and total_is_estimate is set.
+
+    Pages are cached until the catalog changes, and identical searches
+    running at the same time share one computation (see SEARCH_CACHE).
+
+    Returns:
+        dict: books (list), total (int) and total_is_estimate (bool)
+    """
+    if search_type not in SEARCH_TYPES or mode not in SEARCH_MODES:
+        return {'books': [], 'total': 0, 'total_is_estimate': False}
+
+    criteria = parse_search_query(search_term, search_type)
+    from_snapshot = CATALOG_SNAPSHOT.enabled or (mode == "fuzzy" and any(field != "isbn" for field, _ in criteria))
+    # The snapshot may lag the database by up to its max_age, so its results follow its own version
+    version = ('snapshot', CATALOG_SNAPSHOT.version()) if from_snapshot else get_catalog_version()
+    return SEARCH_CACHE.get_or_compute((tuple(criteria), mode, limit, offset), version,
+                                       lambda: _search_page(criteria, mode, limit, offset))
+
+def _search_page(criteria: List[Tuple[str, str]], mode: str, limit: Optional[int], offset: int) -> Dict:
+    page = {'books': [], 'total': 0, 'total_is_estimate': False}
+    if mode == "fuzzy" and any(field != "isbn" for field, _ in criteria):
+        books, total = CATALOG_SNAPSHOT.fuzzy_search(criteria, limit or FUZZY_RESULT_LIMIT, offset)
+        return {**page, 'books': books, 'total': total}
+    if CATALOG_SNAPSHOT.enabled:
+        books, total = CATALOG_SNAPSHOT.search(criteria, limit, offset)
+        return {**page, 'books': books, 'total': total}
+
+    books = search_books(criteria, limit, offset)
+    last_page = limit is None or len(books) < limit
+    if last_page and (books or offset == 0):
+        return {**page, 'books': books, 'total': offset + len(books)}
+
+    matches, examined, catalog_size = count_search_matches(criteria, EXACT_COUNT_MAX_BOOKS)
+    if examined == catalog_size:
+        return {**page, 'books': books, 'total': matches}
+    estimate = round(matches * catalog_size / examined) if examined else 0
+    return {'books': books, 'total': max(estimate, offset + len(books)), 'total_is_estimate': True}
+
+@traced()
+def search_books_in_catalog(search_term: str, search_type: str, mode: str = "substring") -> List[Dict]:
     """
     Search for books in the catalog.
     
     TODO: Implement R6 as per requirements
+
+    Returns every match, most relevant first (see search_catalog_page()).
+    mode="fuzzy" tolerates typos in title and author searches ("Orwel",
+    "Gatsbby") and returns the FUZZY_RESULT_LIMIT best matches; ISBN searches
+    are always exact.
     """
-    
-    search_term = search_term.lower().strip()
+    return search_catalog_page(search_term, search_type, mode)['books']
 
-    books = get_all_books()
+def suggest_completions(prefix: str, suggest_type: str, limit: int = 10) -> List[str]:
+    """
+    Complete a partly typed title or author for the search box.
 
-    matches = []
+    Args:
+        prefix: What has been typed so far (case and extra spaces are ignored)
+        suggest_type: "title" or "author"; anything else has no suggestions
+        limit: Most completions to return
 
-    field_value = ""
+    Returns:
+        list: Distinct titles or authors starting with the prefix, alphabetically
+    """
+    if suggest_type not in ("title", "author") or not prefix.strip():
+        return []
+    return CATALOG_SNAPSHOT.suggest(prefix, suggest_type, limit)
 
-    for book in books:
-        if search_type == "title":
-            field_value = book.get("title", "").lower()
-        elif search_type == "author":
-            field_value = book.get("author", "").lower()
-        elif search_type == "isbn":
-            field_value = book.get("isbn", "").lower()
-        else:
-            return []
-        
-        if search_type == "isbn":
-            if field_value == search_term:
-                matches.append(book)
+def normalize_isbn(isbn: str) -> Optional[str]:
+    """
+    The 13-digit form of an ISBN, ignoring spaces and hyphens; ISBN-10s are
+    converted to ISBN-13 (978 prefix). None if it is neither.
+    """
+    isbn = isbn.replace("-", "").replace(" ", "").upper()
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == "X"):
+        digits = "978" + isbn[:9]
+        check = (10 - sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits)) % 10) % 10
+        return digits + str(check)
+    return isbn if len(isbn) == 13 and isbn.isdigit() else None
+
+@traced()
+def lookup_books_by_isbn(isbns: List[str]) -> Dict:
+    """
+    Check a batch of ISBNs against the catalog, e.g. for duplicates before
+    ordering, with a few indexed queries instead of a search per ISBN.
+
+    Returns:
+        dict: found (book by normalized ISBN), missing (normalized ISBNs not
+            in the catalog) and invalid (inputs that are not ISBNs), each in
+            the order first given and without repeats
+    """
+    normalized, invalid = [], []
+    for isbn in isbns:
+        value = normalize_isbn(isbn)
+        if value is None:
+            invalid.append(isbn)
         else:
-            if search_term in field_value:
-                matches.append(book)
+            normalized.append(value)
+    normalized = list(dict.fromkeys(normalized))
 
-    return matches
+    books = {book.isbn: book for book in get_books_by_isbns(normalized)}
+    return {
+        'found': {isbn: books[isbn] for isbn in normalized if isbn in books},
+        'missing': [isbn for isbn in normalized if isbn not in books],
+        'invalid': list(dict.fromkeys(invalid))
+    }
 
+@traced()
 def get_patron_status_report(patron_id: str) -> Dict:
     """
     Get status report for a patron.
@@ -265,7 +429,18 @@ def get_patron_status_report(patron_id: str) -> Dict:
 
 # Assignment 3 Methods
 
-def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
+def get_payment_gateway() -> 'PaymentGateway':
+    """
+    Create the default payment gateway.
+
+    The payment stack (and the HTTP client it depends on) is imported on first
+    use, so workers that only serve catalog and search pages never load it.
+    """
+    from services.payment_service import PaymentGateway
+    return PaymentGateway()
+
+@traced()
+def pay_late_fees(patron_id: str, book_id: int, payment_gateway: 'PaymentGateway' = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
     
@@ -309,16 +484,18 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
     
     # Use provided gateway or create new one
     if payment_gateway is None:
-        payment_gateway = PaymentGateway()
+        payment_gateway = get_payment_gateway()
     
     # Process payment through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN THEIR TESTS!
     try:
-        success, transaction_id, message = payment_gateway.process_payment(
-            patron_id=patron_id,
-            amount=fee_amount,
-            description=f"Late fees for '{book['title']}'"
-        )
+        with PAYMENT_GATEWAY_DURATION.time(operation='process_payment'), \
+                start_span("payment_gateway.process_payment", CLIENT, {'peer.service': 'payment-gateway'}):
+            success, transaction_id, message = payment_gateway.process_payment(
+                patron_id=patron_id,
+                amount=fee_amount,
+                description=f"Late fees for '{book['title']}'"
+            )
         
         if success:
             return True, f"Payment successful! {message}", transaction_id
@@ -329,7 +506,29 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         # Handle payment gateway errors
         return False, f"Payment processing error: {str(e)}", None
 
-def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
+def validate_refund_request(transaction_id: str, amount: float) -> Optional[str]:
+    """
+    Check a refund request without contacting the payment gateway.
+
+    Returns:
+        str: Error message if the request is invalid, otherwise None
+    """
+    if not transaction_id or not isinstance(transaction_id, str) or not transaction_id.startswith("txn_"):
+        return "Invalid transaction ID."
+
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+        return "Refund amount must be a number."
+
+    if amount <= 0:
+        return "Refund amount must be greater than 0."
+
+    if amount > 15.00:  # Maximum late fee per book
+        return "Refund amount exceeds maximum late fee."
+
+    return None
+
+@traced()
+def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: 'PaymentGateway' = None) -> Tuple[bool, str]:
     """
     Refund a late fee payment (e.g., if book was returned on time but fees were charged in error).
     
@@ -344,23 +543,20 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
         tuple: (success: bool, message: str)
     """
     # Validate inputs
-    if not transaction_id or not transaction_id.startswith("txn_"):
-        return False, "Invalid transaction ID."
-    
-    if amount <= 0:
-        return False, "Refund amount must be greater than 0."
-    
-    if amount > 15.00:  # Maximum late fee per book
-        return False, "Refund amount exceeds maximum late fee."
-    
+    error = validate_refund_request(transaction_id, amount)
+    if error:
+        return False, error
+
     # Use provided gateway or create new one
     if payment_gateway is None:
-        payment_gateway = PaymentGateway()
+        payment_gateway = get_payment_gateway()
     
     # Process refund through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN YOUR TESTS!
     try:
-        success, message = payment_gateway.refund_payment(transaction_id, amount)
+        with PAYMENT_GATEWAY_DURATION.time(operation='refund_payment'), \
+                start_span("payment_gateway.refund_payment", CLIENT, {'peer.service': 'payment-gateway'}):
+            success, message = payment_gateway.refund_payment(transaction_id, amount)
         
         if success:
             return True, message
@@ -0,0 +1,261 @@
+"""
+Refund Service Module - Batch refund processing
+Runs many late fee refunds against the payment gateway with bounded concurrency.
+
+Each refund is journaled (JSONL, fsynced) as "started" before the gateway is
+called and again with its outcome afterwards, so an interrupted batch can be
+started again with the same journal and only the outstanding items are sent.
+An item whose last entry is "started" may or may not have been refunded when
+the run died; it is never resent automatically but reported as "unreconciled".
+Once it has been checked with the gateway, append its real outcome to the
+journal, e.g. {"transaction_id": "txn_1", "amount": 5.0, "status": "refunded"}
+(or "failed" to have the next run retry it).
+
+Usage:
+    python -m services.refund_service refunds.csv --concurrency 8 --journal refunds.journal
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from services.library_service import get_payment_gateway, refund_late_fee_payment, validate_refund_request
+
+if TYPE_CHECKING:
+    from services.payment_service import PaymentGateway
+
+DEFAULT_CONCURRENCY = 8
+
+def load_refund_items(path: str) -> List[Tuple[str, float]]:
+    """
+    Read (transaction_id, amount) pairs from a CSV or JSON file.
+
+    CSV files have two columns with an optional header row. JSON files hold a list
+    of [transaction_id, amount] pairs or {"transaction_id": ..., "amount": ...} objects.
+    Amounts that cannot be parsed, or are not finite ("nan", "inf"), are kept as
+    strings so validation can report them.
+    """
+    items = []
+
+    if path.endswith('.json'):
+        with open(path) as f:
+            # NaN and Infinity literals stay strings
+            for entry in json.load(f, parse_constant=str):
+                if isinstance(entry, dict):
+                    items.append((entry.get('transaction_id'), entry.get('amount')))
+                else:
+                    items.append((entry[0], entry[1]))
+        return items
+
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if row[0].strip().lower() == 'transaction_id':
+                continue
+            amount = row[1].strip() if len(row) > 1 else ''
+            try:
+                if math.isfinite(float(amount)):
+                    amount = float(amount)
+            except ValueError:
+                pass
+            items.append((row[0].strip(), amount))
+
+    return items
+
+def validate_refund_items(items: Iterable[Tuple[str, float]]) -> List[Dict]:
+    """
+    Validate a whole batch before any refund is sent.
+
+    Returns:
+        list: One {index, transaction_id, message} entry per invalid item
+    """
+    errors = []
+    seen = set()
+
+    for index, (transaction_id, amount) in enumerate(items):
+        error = validate_refund_request(transaction_id, amount)
+        if not error and transaction_id in seen:
+            error = "Duplicate transaction ID in batch."
+        if error:
+            errors.append({'index': index, 'transaction_id': transaction_id, 'message': error})
+        seen.add(transaction_id)
+
+    return errors
+
+def validate_against_journal(items: Iterable[Tuple[str, float]], journal_entries: Dict[str, Dict]) -> List[Dict]:
+    """
+    Check that items already in the journal are resumed with the same amount.
+
+    Returns:
+        list: One {index, transaction_id, message} entry per mismatching item
+    """
+    errors = []
+    for index, (transaction_id, amount) in enumerate(items):
+        previous = journal_entries.get(transaction_id)
+        if previous is not None and 'amount' in previous and previous['amount'] != amount:
+            errors.append({'index': index, 'transaction_id': transaction_id,
+                           'message': f"Amount differs from the journal entry ({previous['amount']}) "
+                                      f"of a previous run."})
+    return errors
+
+def load_refund_journal(journal_path: str) -> Dict[str, Dict]:
+    """Read the latest journal entry for each transaction ID."""
+    entries = {}
+    if not journal_path or not os.path.exists(journal_path):
+        return entries
+
+    with open(journal_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted run
+                continue
+            entries[entry['transaction_id']] = entry
+
+    return entries
+
+class RefundJournal:
+    """Append-only JSONL record of refund starts and outcomes, safe to share between worker threads."""
+
+    def __init__(self, journal_path: Optional[str]):
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+        self._file = open(journal_path, 'a') if journal_path else None
+
+    def record(self, result: Dict):
+        if not self._file:
+            return
+        line = json.dumps(result) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+def process_refund_batch(items: List[Tuple[str, float]], payment_gateway: 'PaymentGateway' = None,
+                         concurrency: int = DEFAULT_CONCURRENCY,
+                         journal_path: Optional[str] = None) -> Tuple[bool, str, List[Dict]]:
+    """
+    Refund a batch of late fee payments.
+
+    The batch is validated up front and nothing is sent to the gateway if any item
+    is invalid, including an item whose amount differs from its journal entry.
+    Items already marked refunded in the journal are skipped, and items started
+    but never finished in an earlier run are reported as unreconciled rather
+    than sent again.
+
+    Args:
+        items: (transaction_id, amount) pairs
+        payment_gateway: Payment gateway instance shared by all workers (injectable for testing)
+        concurrency: Maximum number of refunds in flight at once
+        journal_path: JSONL file used to record outcomes and resume interrupted runs
+
+    Returns:
+        tuple: (success: bool, message: str, results: list of per-item outcomes in input order)
+    """
+    if concurrency < 1:
+        return False, "Concurrency must be at least 1.", []
+
+    journal_entries = load_refund_journal(journal_path)
+    errors = validate_refund_items(items) or validate_against_journal(items, journal_entries)
+    if errors:
+        results = [
+            {'transaction_id': error['transaction_id'], 'amount': items[error['index']][1],
+             'status': 'invalid', 'message': error['message']}
+            for error in errors
+        ]
+        return False, f"Batch rejected: {len(errors)} of {len(items)} items are invalid.", results
+
+    if payment_gateway is None:
+        payment_gateway = get_payment_gateway()
+
+    results: List[Optional[Dict]] = [None] * len(items)
+    pending = []
+    for index, (transaction_id, amount) in enumerate(items):
+        previous = journal_entries.get(transaction_id)
+        if previous and previous.get('status') == 'refunded':
+            results[index] = {'transaction_id': transaction_id, 'amount': amount,
+                              'status': 'skipped', 'message': "Already refunded in a previous run."}
+        elif previous and previous.get('status') == 'started':
+            results[index] = {'transaction_id': transaction_id, 'amount': amount, 'status': 'unreconciled',
+                              'message': "Sent to the gateway by an interrupted run with no recorded outcome; "
+                                         "check it with the gateway and record the outcome in the journal."}
+        else:
+            pending.append(index)
+
+    journal = RefundJournal(journal_path)
+
+    def refund_one(index):
+        transaction_id, amount = items[index]
+        # Durable before the gateway sees the refund, so a crash cannot lead to a second one
+        journal.record({'transaction_id': transaction_id, 'amount': amount, 'status': 'started',
+                        'started_at': datetime.now().isoformat()})
+        success, message = refund_late_fee_payment(transaction_id, amount, payment_gateway)
+        return {
+            'transaction_id': transaction_id,
+            'amount': amount,
+            'status': 'refunded' if success else 'failed',
+            'message': message,
+            'finished_at': datetime.now().isoformat()
+        }
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(refund_one, index): index for index in pending}
+            for future in as_completed(futures):
+                result = future.result()
+                journal.record(result)
+                results[futures[future]] = result
+    finally:
+        journal.close()
+
+    refunded = sum(1 for result in results if result['status'] == 'refunded')
+    skipped = sum(1 for result in results if result['status'] == 'skipped')
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    unreconciled = sum(1 for result in results if result['status'] == 'unreconciled')
+
+    message = f"{refunded} refunded, {skipped} skipped, {failed} failed."
+    if unreconciled:
+        message += f" {unreconciled} need manual reconciliation."
+    return failed == 0 and unreconciled == 0, message, results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refund a batch of late fee payments.")
+    parser.add_argument("path", help="CSV or JSON file of (transaction_id, amount) pairs.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum refunds in flight at once.")
+    parser.add_argument("--journal", help="Journal file used to record outcomes and resume (default: <path>.journal).")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the batch without sending any refunds.")
+    args = parser.parse_args()
+
+    refund_items = load_refund_items(args.path)
+
+    if args.dry_run:
+        validation_errors = validate_refund_items(refund_items)
+        for validation_error in validation_errors:
+            print(f"invalid\t{validation_error['transaction_id']}\t{validation_error['message']}")
+        print(f"{len(refund_items) - len(validation_errors)} of {len(refund_items)} items are valid.")
+        sys.exit(1 if validation_errors else 0)
+
+    ok, summary, outcomes = process_refund_batch(
+        refund_items,
+        concurrency=args.concurrency,
+        journal_path=args.journal or args.path + '.journal'
+    )
+    for outcome in outcomes:
+        print(f"{outcome['status']}\t{outcome['transaction_id']}\t{outcome['amount']}\t{outcome['message']}")
+    print(summary)
+    sys.exit(0 if ok else 1)
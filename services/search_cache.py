@@ -0,0 +1,115 @@
+"""
+Search Cache - Shared results for repeated and concurrent identical searches
+
+Pages of search results are cached by the normalized search (criteria, mode,
+limit and offset), the database and a catalog version supplied by the caller,
+so a write to the books table makes older entries unreachable rather than
+stale; they then age out in least-recently-used order, or after `ttl` seconds.
+
+Identical searches that arrive while the first one is still running do not
+run it again: they wait for it and share its result (single flight), so a
+burst of the same popular query costs one catalog scan per worker process.
+The cache lives in each process; pre-fork workers do not share it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from database import get_db_path
+from monitoring.metrics import record_cache_access
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 60.0
+# Larger result sets (unpaged searches of common terms) are shared but not kept
+MAX_CACHED_BOOKS = 1000
+
+
+class _Flight:
+    """A search being computed; waiters block on `done`."""
+
+    __slots__ = ('done', 'page', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.page: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+
+
+def _copy(page: Dict) -> Dict:
+    # Callers get their own dict and list; the book records are shared
+    return {**page, 'books': list(page['books'])}
+
+
+class SearchCache:
+    """LRU cache with a TTL and single-flight misses, for search_catalog_page() results."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()  # key -> (stored at, page)
+        self._flights: Dict[Tuple, _Flight] = {}
+
+    def clear(self):
+        """Drop every cached page, e.g. after the database was replaced."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, search: Hashable, version: Hashable, compute: Callable[[], Dict]) -> Dict:
+        """
+        The cached page for `search` at catalog `version`, or compute() run
+        once for this and any identical concurrent calls.
+
+        Args:
+            search: The normalized search, e.g. (criteria, mode, limit, offset)
+            version: What the results depend on besides the search, such as
+                database.get_catalog_version()
+            compute: Runs the search; its exceptions reach every waiting caller
+
+        Returns:
+            dict: A copy of the page (books, total, total_is_estimate)
+        """
+        key = (search, get_db_path(), version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    record_cache_access('search', True)
+                    return _copy(entry[1])
+                del self._entries[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        record_cache_access('search', not leader)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.page)
+
+        try:
+            flight.page = compute()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and len(flight.page['books']) <= MAX_CACHED_BOOKS:
+                    self._entries[key] = (time.monotonic(), flight.page)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return _copy(flight.page)
+
+
+# Used by library_service.search_catalog_page()
+SEARCH_CACHE = SearchCache()
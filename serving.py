@@ -0,0 +1,419 @@
+"""
+Production serving for the Library Management System
+A pre-fork WSGI server: the master process builds the app once, opens the
+listening socket and forks worker processes. Each worker serves requests from a
+fixed-size thread pool. A worker only accepts connections while one of its
+threads is free, and connections idle between keep-alive requests wait in a
+selector rather than holding a thread. SIGTERM or SIGINT shuts everything down gracefully:
+workers stop accepting, finish in-flight requests and exit; the master waits for
+them (up to the graceful timeout) and restarts any worker that dies unexpectedly.
+Workers that keep dying (e.g. crashing on startup) are restarted at most
+MAX_RESTARTS times per RESTART_WINDOW seconds; after that the server exits with
+status 1.
+"""
+
+import os
+import queue
+import random
+import selectors
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict
+from wsgiref.handlers import SimpleHandler
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import LimitedStream
+
+import database
+from services.events import AVAILABILITY_EVENTS
+from monitoring.metrics import REGISTRY, publish_metrics, share_metrics
+
+MAX_RESTARTS = 5
+RESTART_WINDOW = 30.0
+# Pause before each restart, so a crashing worker is not re-forked in a tight loop
+RESTART_DELAY = 0.5
+
+
+class _ResponseWriter(SimpleHandler):
+    """
+    wsgiref response writer that keeps HTTP/1.1 connections reusable: responses
+    without a Content-Length (streamed pages, event streams) are sent chunked.
+    """
+
+    http_version = "1.1"
+    os_environ = {}
+    chunked = False
+
+    def __init__(self, stdin, stdout, environ, request_handler):
+        super().__init__(stdin, stdout, sys.stderr, environ, multithread=True, multiprocess=True)
+        self.request_handler = request_handler
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        if 'Content-Length' not in self.headers and self._body_allowed():
+            if self.request_handler.request_version == "HTTP/1.1":
+                self.headers['Transfer-Encoding'] = 'chunked'
+                self.chunked = True
+            else:
+                # HTTP/1.0 clients read the body until the connection closes
+                self.request_handler.close_connection = True
+        if self.request_handler.close_connection:
+            self.headers['Connection'] = 'close'
+
+    def _body_allowed(self) -> bool:
+        code = int(self.status.split(None, 1)[0])
+        return self.environ['REQUEST_METHOD'] != 'HEAD' and code >= 200 and code not in (204, 304)
+
+    def write(self, data):
+        if not self.headers_sent and self.status:
+            # Headers decide whether the body is chunked, so they go out first
+            self.bytes_sent = 0
+            self.send_headers()
+        if self.chunked and data:
+            data = b"%x\r\n%s\r\n" % (len(data), data)
+        super().write(data)
+
+    def finish_content(self):
+        if self.chunked:
+            self._write(b"0\r\n\r\n")
+            self._flush()
+        else:
+            super().finish_content()
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1 handler that keeps connections open between requests.
+
+    Werkzeug's own handler closes every connection because it cannot tell where an
+    unread request body ends. Here the body is read through a stream limited to
+    Content-Length and drained after the response, so the next request line is
+    always where the handler expects it. Chunked uploads still close the
+    connection.
+
+    Each call serves the request that made the connection readable, plus any
+    pipelined requests already buffered; the server then keeps the idle
+    connection without a thread (see ThreadPoolWSGIServer). `timeout` bounds
+    the wait for the rest of a partly received request.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+
+    def handle(self):
+        try:
+            self.close_connection = True
+            self.handle_one_request()
+            while not self.close_connection and self._request_buffered():
+                self.handle_one_request()
+        except (ConnectionError, socket.timeout) as error:
+            # As in WSGIRequestHandler.handle(): a dropped client is not an error
+            self.close_connection = True
+            self.connection_dropped(error)
+
+    def _request_buffered(self) -> bool:
+        """Whether the next request has already been read into rfile (without blocking)."""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def run_wsgi(self):
+        if self.headers.get("Expect", "").lower().strip() == "100-continue":
+            self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        environ = self.make_environ()
+        chunked = environ.get("wsgi.input_terminated", False)
+        if chunked:
+            self.close_connection = True
+            body = environ["wsgi.input"]
+        else:
+            try:
+                length = max(0, int(self.headers.get("Content-Length") or 0))
+            except ValueError:
+                self.send_error(400, "Bad Content-Length")
+                return
+            body = LimitedStream(self.rfile, length)
+            environ["wsgi.input"] = body
+
+        _ResponseWriter(body, self.wfile, environ, self).run(self.server.app)
+        if not chunked and not self.close_connection:
+            body.exhaust()
+
+    def log_request(self, *args, **kwargs):
+        # Access logs are left to the proxy in front; per-request metrics cover the rest
+        pass
+
+
+class ThreadPoolWSGIServer(BaseWSGIServer):
+    """
+    Werkzeug server with a fixed thread pool, where threads are only spent on
+    connections that have a request to serve.
+
+    The serving loop waits for a free thread before it looks for work, so a
+    saturated worker stops accepting and leaves new connections to the other
+    workers on the shared socket. Accepted and keep-alive connections wait in a
+    selector until a request arrives, and are closed after `keepalive` idle
+    seconds; handing one to the pool takes a free thread.
+    """
+
+    multithread = True
+    daemon_threads = True
+
+    def __init__(self, app, fd: int, threads: int, handler, keepalive: float = 5.0):
+        super().__init__("0.0.0.0", 0, app, handler=handler, fd=fd)
+        self.keepalive = keepalive
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+        self._free_threads = threading.Semaphore(threads)
+        self._returned = queue.SimpleQueue()  # keep-alive connections handed back by pool threads
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ, None)
+        selector.register(self._wake_reader, selectors.EVENT_READ, "wake")
+        self.socket.setblocking(False)
+        try:
+            while not self._stopping.is_set():
+                # Only look for work (including new connections) while a thread can take it
+                if not self._free_threads.acquire(timeout=poll_interval):
+                    self._close_idle(selector)
+                    continue
+                self._park_returned(selector)
+                dispatched = False
+                for key, _ in selector.select(poll_interval):
+                    if key.data is None:
+                        self._accept(selector)
+                    elif key.data == "wake":
+                        self._wake_reader.recv(4096)
+                    elif dispatched and not self._free_threads.acquire(blocking=False):
+                        break
+                    else:
+                        selector.unregister(key.fileobj)
+                        self.executor.submit(self._process_request_in_thread, key.fileobj, key.data[0])
+                        dispatched = True
+                if not dispatched:
+                    self._free_threads.release()
+                self._close_idle(selector)
+        finally:
+            for key in list(selector.get_map().values()):
+                if isinstance(key.data, tuple):
+                    self.shutdown_request(key.fileobj)
+            selector.close()
+            self.server_close()
+            self._stopped.set()
+
+    def shutdown(self):
+        self._stopping.set()
+        self._wake_writer.send(b"x")
+        self._stopped.wait()
+
+    def _accept(self, selector):
+        try:
+            request, client_address = self.socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return  # another worker took it
+        request.setblocking(True)
+        selector.register(request, selectors.EVENT_READ, (client_address, time.monotonic() + self.keepalive))
+
+    def _park_returned(self, selector):
+        while True:
+            try:
+                request, client_address = self._returned.get_nowait()
+            except queue.Empty:
+                return
+            selector.register(request, selectors.EVENT_READ, (client_address, time.monotonic() + self.keepalive))
+
+    def _close_idle(self, selector):
+        now = time.monotonic()
+        for key in list(selector.get_map().values()):
+            if isinstance(key.data, tuple) and key.data[1] <= now:
+                selector.unregister(key.fileobj)
+                self.shutdown_request(key.fileobj)
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def _process_request_in_thread(self, request, client_address):
+        handler = None
+        try:
+            handler = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if handler is not None and not handler.close_connection and not self._stopping.is_set():
+                # Back to the serving loop to wait for the next request without a thread
+                self._returned.put((request, client_address))
+                self._wake_writer.send(b"x")
+            else:
+                self.shutdown_request(request)
+            self._free_threads.release()
+
+    def drain(self):
+        """Wait for requests already handed to the pool to finish."""
+        self.executor.shutdown(wait=True)
+        while not self._returned.empty():
+            self.shutdown_request(self._returned.get_nowait()[0])
+
+
+def create_listener(host: str, port: int, backlog: int) -> socket.socket:
+    listener = socket.create_server((host, port), backlog=backlog)
+    listener.set_inheritable(True)
+    return listener
+
+def post_fork(metrics_dir: str):
+    """
+    Reset per-process state in a freshly forked worker.
+
+    SQLite connections are opened per call by database.get_db_connection(), so no
+    connection crosses the fork. Metrics recorded by the master during startup are
+    cleared, and the worker publishes its own to metrics_dir, where /metrics (in
+    any worker) adds up all workers.
+    """
+    random.seed()
+    REGISTRY.reset()
+    share_metrics(metrics_dir)
+
+def run_worker(app, listener: socket.socket, threads: int, keepalive: float):
+    """Serve requests in this process until SIGTERM or SIGINT."""
+    handler = type("WorkerRequestHandler", (KeepAliveRequestHandler,), {'timeout': keepalive})
+    server = ThreadPoolWSGIServer(app, listener.fileno(), threads, handler, keepalive)
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    server.serve_forever()
+    # End open event streams so their threads finish instead of waiting out the timeout
+    AVAILABILITY_EVENTS.disconnect_all()
+    server.drain()
+    publish_metrics()
+
+def serve(app, host: str = "0.0.0.0", port: int = 5000, workers: int = 2, threads: int = 8,
+          backlog: int = 2048, keepalive: float = 5.0, graceful_timeout: float = 30.0) -> int:
+    """
+    Run `app` on a pre-fork server until the master receives SIGTERM or SIGINT.
+    An in-memory database cannot be shared with forked workers, so it is served
+    by a single worker running in this process.
+
+    Args:
+        app: WSGI application, created once before forking
+        host, port: Address to listen on
+        workers: Number of worker processes
+        threads: Request threads per worker, the cap on requests served at once per
+            worker; idle keep-alive connections do not take a thread
+        backlog: Listen queue length for the shared socket
+        keepalive: Seconds an idle keep-alive connection is held open
+        graceful_timeout: Seconds to wait for workers to finish before killing them
+
+    Returns:
+        int: Exit status; 1 if workers died too often to keep restarting them
+    """
+    listener = create_listener(host, port, backlog)
+
+    if database.is_memory_database():
+        # An in-memory database lives in this process only and SQLite connections
+        # must not be used across fork(), so serve from the master itself
+        print(f"Serving in-memory database on http://{host}:{port} with 1 worker x {threads} threads", file=sys.stderr)
+        run_worker(app, listener, threads, keepalive)
+        listener.close()
+        return 0
+
+    database.enable_wal()
+    # Per-worker metrics files, kept for the life of the server so totals never go backwards
+    metrics_dir = tempfile.mkdtemp(prefix="library-metrics-")
+    children: Dict[int, int] = {}
+    restarts: Deque[float] = deque()  # times of recent restarts
+    stopping = False
+    gave_up = False
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                post_fork(metrics_dir)
+                run_worker(app, listener, threads, keepalive)
+            except Exception:
+                exit_code = 1
+                traceback.print_exc()
+            finally:
+                os._exit(exit_code)
+        children[pid] = slot
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"Serving on http://{host}:{port} with {workers} workers x {threads} threads", file=sys.stderr)
+
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in children:
+            slot = children.pop(pid)
+            now = time.monotonic()
+            while restarts and now - restarts[0] > RESTART_WINDOW:
+                restarts.popleft()
+            if len(restarts) >= MAX_RESTARTS:
+                print(f"Worker {pid} exited with status {status}; {MAX_RESTARTS} restarts in "
+                      f"{RESTART_WINDOW:.0f}s, shutting down", file=sys.stderr)
+                gave_up = True
+                break
+            restarts.append(now)
+            print(f"Worker {pid} exited with status {status}; restarting", file=sys.stderr)
+            time.sleep(RESTART_DELAY)
+            spawn(slot)
+            continue
+        time.sleep(0.2)
+
+    listener.close()
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.time() + graceful_timeout
+    while children and time.time() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.pop(pid, None)
+        else:
+            time.sleep(0.1)
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    return 1 if gave_up else 0
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+
+import pytest
+
+import database
+from app import create_app
+from database import insert_book, update_book_availability
+
+@pytest.fixture
+def client():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app.test_client()
+
+    os.remove("test_library.db")
+
+def _sync(client, since=0, limit=500):
+    """Page through the feed like a kiosk would; return (books by id, final cursor, pages)."""
+    books, pages = {}, 0
+    while True:
+        page = client.get(f'/api/catalog/changes?since={since}&limit={limit}').get_json()
+        pages += 1
+        for change in page['changes']:
+            books[change['book_id']] = change['book']
+        since = page['next_since']
+        if not page['has_more']:
+            return books, since, pages
+
+def test_sync_from_zero_returns_the_whole_catalog(client):
+    books, _, _ = _sync(client)
+
+    assert sorted(book['title'] for book in books.values()) == ['1984', 'The Great Gatsby', 'To Kill a Mockingbird']
+
+def test_paging_resumes_from_the_cursor(client):
+    for n in range(7):
+        insert_book(f"Book {n}", "Author", f"isbn-{n}", 1, 1)
+
+    books, _, pages = _sync(client, limit=3)
+
+    assert len(books) == 10
+    assert pages == 4
+
+def test_only_changed_books_after_the_cursor(client):
+    _, cursor, _ = _sync(client)
+
+    insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    update_book_availability(1, -1)
+    update_book_availability(1, -1)
+
+    page = client.get(f'/api/catalog/changes?since={cursor}').get_json()
+
+    assert [(change['operation'], change['book_id']) for change in page['changes']] == [('insert', 4), ('update', 1)]
+    assert page['changes'][1]['book']['available_copies'] == 1
+    assert page['has_more'] is False
+
+def test_caught_up_client_gets_an_empty_page(client):
+    _, cursor, _ = _sync(client)
+
+    page = client.get(f'/api/catalog/changes?since={cursor}').get_json()
+
+    assert page == {'changes': [], 'next_since': cursor, 'has_more': False}
+
+def test_deleted_books_are_reported(client):
+    _, cursor, _ = _sync(client)
+    conn = sqlite3.connect("test_library.db")
+    conn.execute('DELETE FROM books WHERE id = 2')
+    conn.commit()
+    conn.close()
+
+    [change] = client.get(f'/api/catalog/changes?since={cursor}').get_json()['changes']
+
+    assert change['operation'] == 'delete'
+    assert change['book_id'] == 2
+    assert change['book'] is None
+
+def test_log_keeps_one_row_per_book(client):
+    for _ in range(5):
+        update_book_availability(1, 0)
+
+    conn = sqlite3.connect("test_library.db")
+    assert conn.execute('SELECT COUNT(*) FROM catalog_changes').fetchone()[0] == 3
+
+def test_existing_books_are_backfilled_on_upgrade(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    monkeypatch.setenv("LIBRARY_DB_PATH", path)
+    conn = sqlite3.connect(path)
+    for statement in database.MIGRATIONS[0]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('T', 'A', '1', 1, 1)")
+    conn.execute('PRAGMA user_version = 1')
+    conn.commit()
+    conn.close()
+
+    database.init_database()
+
+    assert [change['book']['title'] for change in database.get_catalog_changes(0, 10)] == ['T']
+
+@pytest.mark.parametrize("query", ['since=abc', 'since=-1', 'limit=0', 'limit=100000'])
+def test_invalid_parameters(client, query):
+    response = client.get(f'/api/catalog/changes?{query}')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from benchmarks.catalog_snapshot import measure_snapshot
+from benchmarks.dataset import generate_dataset
+from services.catalog_snapshot import CATALOG_SNAPSHOT, CatalogSnapshot
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, search_books_in_catalog
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+    generate_dataset("test_library.db", books=300, loans=100, seed=3, as_of=datetime(2026, 1, 15))
+
+    yield app
+
+    CATALOG_SNAPSHOT.disable()
+    os.remove("test_library.db")
+
+def _execute(sql, parameters=()):
+    conn = sqlite3.connect("test_library.db")
+    conn.execute(sql, parameters)
+    conn.commit()
+    conn.close()
+
+@pytest.mark.parametrize("search_type, term", [
+    ('title', 'the'), ('title', 'a'), ('title', 'zzzz'), ('title', ''),
+    ('author', 'smith'), ('author', 'e'), ('isbn', '9780451524935'), ('isbn', '978'),
+])
+def test_snapshot_matches_database_search(app, search_type, term):
+    expected = search_books_in_catalog(term, search_type)
+    CATALOG_SNAPSHOT.enable()
+
+    assert search_books_in_catalog(term, search_type) == expected
+
+def test_availability_change_does_not_rebuild_columns(app):
+    snapshot = CatalogSnapshot(max_age=float('inf'))
+    snapshot.refresh()
+    columns = snapshot._columns
+
+    _execute('UPDATE books SET available_copies = 0 WHERE id = 1')
+
+    assert snapshot.refresh() == 1
+    assert snapshot._columns is columns
+    assert snapshot.search([('title', 'great gatsby')])[0][0].available_copies == 0
+
+def test_added_renamed_and_deleted_books(app):
+    snapshot = CatalogSnapshot(max_age=float('inf'))
+    snapshot.refresh()
+
+    _execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+             "VALUES ('Aardvark Tales', 'Ann Author', '9990000000001', 1, 1)")
+    _execute("UPDATE books SET title = 'Nineteen Eighty-Four' WHERE id = 3")
+    _execute('DELETE FROM books WHERE id = 2')
+    snapshot.refresh()
+
+    assert [book.title for book in snapshot.search([('title', 'aardvark')])[0]] == ['Aardvark Tales']
+    assert snapshot.search([('title', '1984')]) == ([], 0)
+    assert snapshot.search([('title', 'nineteen eighty')])[0][0].id == 3
+    assert snapshot.search([('isbn', '9780061120084')]) == ([], 0)
+    assert snapshot.search([('author', 'harper lee')]) == ([], 0)
+
+def test_writes_in_this_process_are_seen_immediately(app):
+    CATALOG_SNAPSHOT.enable(max_age=3600)
+    search_books_in_catalog('gatsby', 'title')
+
+    add_book_to_catalog('Dune', 'Frank Herbert', '9780441172719', 2)
+    borrow_book_by_patron('123456', 1)
+
+    assert [book['title'] for book in search_books_in_catalog('dune', 'title')] == ['Dune']
+    assert search_books_in_catalog('gatsby', 'title')[0]['available_copies'] == 2
+
+def test_other_writers_are_seen_after_max_age(app):
+    CATALOG_SNAPSHOT.enable(max_age=3600)
+    search_books_in_catalog('gatsby', 'title')
+    _execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+             "VALUES ('Dune', 'Frank Herbert', '9780441172719', 2, 2)")
+
+    assert search_books_in_catalog('dune', 'title') == []
+    CATALOG_SNAPSHOT.max_age = 0
+    assert len(search_books_in_catalog('dune', 'title')) == 1
+
+def test_search_page_uses_snapshot(app):
+    CATALOG_SNAPSHOT.enable()
+
+    page = app.test_client().get('/search?q=gatsby&type=title').data.decode()
+
+    assert "The Great Gatsby" in page
+
+def test_benchmark_reports_memory_and_refresh_cost(tmp_path):
+    report = measure_snapshot(books=500, repeat=2, workdir=str(tmp_path))
+
+    assert report['memory']['total'] > report['memory']['columns'] > 0
+    assert set(report['refresh_ms']) == {'build', 'unchanged', 'availability_100', 'renamed_100'}
+    assert all(stats['snapshot_ms'] >= 0 for stats in report['search'].values())
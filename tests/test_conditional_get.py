@@ -0,0 +1,137 @@
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from werkzeug.http import http_date
+
+import routes.conditional as conditional
+from app import create_app
+from database import get_catalog_version, get_db_connection, insert_book, update_book_availability
+from monitoring.metrics import REGISTRY
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+
+@pytest.fixture
+def client():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+    app.config['SQL_ENFORCE_QUERY_BUDGET'] = True
+    REGISTRY.reset()
+
+    yield app.test_client()
+
+    os.remove("test_library.db")
+
+def _catalog_changed_at(when: datetime):
+    # A write to the books table at a chosen time (UTC)
+    conn = get_db_connection()
+    conn.execute('UPDATE catalog_version SET version = version + 1, updated_at = ?',
+                 (when.isoformat(timespec='microseconds'),))
+    conn.commit()
+    conn.close()
+
+@pytest.mark.parametrize("path", ['/catalog', '/search?q=great&type=title', '/api/search?q=great&type=title'])
+def test_matching_etag_gets_304_without_querying_books(client, path):
+    first = client.get(path)
+    second = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.data == b''
+    # Only the catalog version is read
+    assert second.headers['X-Query-Count'] == '1'
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_book_insert_changes_the_etag(client):
+    etag = client.get('/catalog').headers['ETag']
+    insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+
+    response = client.get('/catalog', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert b"Dune" in response.data
+    assert response.headers['ETag'] != etag
+
+def test_availability_change_bumps_the_version():
+    create_app(test_mode=True)
+    version, _ = get_catalog_version()
+
+    update_book_availability(1, -1)
+
+    assert get_catalog_version()[0] == version + 1
+    os.remove("test_library.db")
+
+def test_if_modified_since(client):
+    _catalog_changed_at(datetime(2026, 1, 15, 10, 0, 0, 250000))
+    last_modified = client.get('/catalog').headers['Last-Modified']
+
+    assert client.get('/catalog', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/catalog', headers={'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'}).status_code == 200
+
+def test_two_changes_in_one_second(client, monkeypatch):
+    second = datetime(2026, 1, 15, 10, 0, 0)
+    clock = SimpleNamespace(now=second.replace(microsecond=500000))
+    monkeypatch.setattr(conditional, 'time', SimpleNamespace(
+        time=lambda: clock.now.replace(tzinfo=timezone.utc).timestamp()))
+
+    _catalog_changed_at(second.replace(microsecond=200000))
+    assert 'Last-Modified' not in client.get('/catalog').headers
+    insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    _catalog_changed_at(second.replace(microsecond=800000))
+    clock.now = second.replace(microsecond=900000)
+
+    response = client.get('/catalog', headers={'If-Modified-Since': http_date(second)})
+    assert response.status_code == 200
+    assert b"Dune" in response.data
+
+    clock.now = datetime(2026, 1, 15, 10, 0, 1)
+    last_modified = client.get('/catalog').headers['Last-Modified']
+    assert last_modified == http_date(second)
+    assert client.get('/catalog', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+def test_urls_have_their_own_etags(client):
+    title = client.get('/search?q=great&type=title').headers['ETag']
+    author = client.get('/search?q=great&type=author').headers['ETag']
+
+    assert title != author
+
+def test_pending_flash_messages_are_rendered(client):
+    etag = client.get('/catalog').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Book added.')]
+
+    response = client.get('/catalog', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert b"Book added." in response.data
+    assert 'ETag' not in response.headers
+
+def test_errors_are_not_cached(client):
+    response = client.get('/api/search')
+
+    assert response.status_code == 400
+    assert 'ETag' not in response.headers
+
+def test_hits_and_misses_are_counted(client):
+    etag = client.get('/catalog').headers['ETag']
+    client.get('/catalog', headers={'If-None-Match': etag})
+
+    text = REGISTRY.expose()
+    assert 'library_cache_requests_total{cache="http_conditional",result="hit"} 1' in text
+    assert 'library_cache_requests_total{cache="http_conditional",result="miss"} 1' in text
+
+@pytest.mark.parametrize("path", ['/search?q=dune&type=title', '/api/search?q=dune&type=title',
+                                  '/search?q=dune&type=title&mode=fuzzy', '/api/suggest?q=du&type=title'])
+def test_snapshot_answers_match_their_etag(client, path):
+    CATALOG_SNAPSHOT.enable(max_age=3600)
+    try:
+        etag = client.get(path).headers['ETag']
+        # Another worker adds a book; this process's snapshot has not seen it
+        insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+
+        response = client.get(path, headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert b"Dune" in response.data
+    finally:
+        CATALOG_SNAPSHOT.disable()
@@ -0,0 +1,82 @@
+import pytest
+import sqlite3
+from datetime import datetime
+
+from benchmarks.dataset import generate_dataset
+
+AS_OF = datetime(2026, 1, 15)
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "bench.db")
+    summary = generate_dataset(path, books=500, loans=10000, patrons=300, seed=3, as_of=AS_OF)
+    conn = sqlite3.connect(path)
+
+    yield summary, conn
+
+    conn.close()
+
+def test_counts_match_request(dataset):
+    summary, conn = dataset
+
+    assert conn.execute('SELECT COUNT(*) FROM books').fetchone()[0] == 500
+    assert conn.execute('SELECT COUNT(*) FROM borrow_records').fetchone()[0] == 10000
+    assert summary['active_loans'] == conn.execute(
+        'SELECT COUNT(*) FROM borrow_records WHERE return_date IS NULL').fetchone()[0]
+
+def test_patrons_never_exceed_borrow_limit(dataset):
+    summary, conn = dataset
+
+    per_patron = [row[0] for row in conn.execute('''
+        SELECT COUNT(*) FROM borrow_records WHERE return_date IS NULL GROUP BY patron_id
+    ''')]
+
+    assert max(per_patron) == 5
+    assert summary['patrons_at_limit'] == per_patron.count(5) > 0
+
+def test_availability_matches_active_loans(dataset):
+    _, conn = dataset
+
+    mismatches = conn.execute('''
+        SELECT COUNT(*) FROM books b
+        WHERE b.available_copies < 0 OR b.available_copies != b.total_copies - (
+            SELECT COUNT(*) FROM borrow_records br WHERE br.book_id = b.id AND br.return_date IS NULL)
+    ''').fetchone()[0]
+
+    assert mismatches == 0
+
+def test_some_active_loans_are_overdue(dataset):
+    summary, conn = dataset
+
+    overdue = conn.execute('''
+        SELECT COUNT(*) FROM borrow_records WHERE return_date IS NULL AND due_date < ?
+    ''', (AS_OF.isoformat(),)).fetchone()[0]
+
+    assert overdue == summary['overdue_loans'] > 0
+
+def test_popularity_is_skewed(dataset):
+    _, conn = dataset
+
+    loans_per_book = [row[0] for row in conn.execute('''
+        SELECT COUNT(*) AS c FROM borrow_records GROUP BY book_id ORDER BY c DESC
+    ''')]
+
+    # The top 1% of titles take a far larger share than 1% of loans
+    assert sum(loans_per_book[:5]) > 0.1 * 10000
+
+def test_same_seed_gives_same_rows(tmp_path):
+    first = str(tmp_path / "first.db")
+    second = str(tmp_path / "second.db")
+    generate_dataset(first, books=50, loans=500, seed=11, as_of=AS_OF)
+    generate_dataset(second, books=50, loans=500, seed=11, as_of=AS_OF)
+
+    query = 'SELECT * FROM borrow_records ORDER BY id'
+    assert sqlite3.connect(first).execute(query).fetchall() == sqlite3.connect(second).execute(query).fetchall()
+
+def test_appends_after_existing_books(tmp_path):
+    path = str(tmp_path / "bench.db")
+    generate_dataset(path, books=20, loans=100, seed=1, as_of=AS_OF)
+    generate_dataset(path, books=20, loans=100, seed=2, as_of=AS_OF)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT COUNT(*), COUNT(DISTINCT isbn), MAX(id) FROM books').fetchone() == (40, 40, 40)
@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+from app import create_app
+from monitoring.metrics import EVENT_SUBSCRIBERS_DROPPED
+import services.library_service as library_service
+from services.events import AVAILABILITY_EVENTS, EventBroker
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+def test_every_subscriber_gets_the_event():
+    broker = EventBroker('test')
+    first, second = broker.subscribe(), broker.subscribe()
+
+    assert broker.publish({'n': 1}) == 2
+    assert first.get(timeout=0) == {'n': 1}
+    assert second.get(timeout=0) == {'n': 1}
+
+def test_get_times_out_without_events():
+    assert EventBroker('test').subscribe().get(timeout=0.01) is None
+
+def test_slow_subscriber_is_dropped_and_freed():
+    EVENT_SUBSCRIBERS_DROPPED.reset()
+    broker = EventBroker('test', max_pending=2)
+    slow, fast = broker.subscribe(), broker.subscribe()
+
+    for n in range(2):
+        broker.publish({'n': n})
+        fast.get(timeout=0)
+    delivered = broker.publish({'n': 2})
+
+    assert delivered == 1
+    assert slow.dropped
+    assert slow.get(timeout=0) is None
+    assert fast.get(timeout=0) == {'n': 2}
+    assert EVENT_SUBSCRIBERS_DROPPED.value(stream='test') == 1
+
+def test_unsubscribed_clients_get_nothing():
+    broker = EventBroker('test')
+    subscription = broker.subscribe()
+    broker.unsubscribe(subscription)
+
+    assert broker.publish({'n': 1}) == 0
+    assert not broker.has_subscribers()
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+    app.config['SSE_HEARTBEAT_SECONDS'] = 0.05
+
+    yield app
+
+    os.remove("test_library.db")
+
+def _next_message(chunks) -> str:
+    chunk = next(chunks)
+    return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+def test_stream_sends_borrow_and_return(app):
+    response = app.test_client().get('/api/stream/availability', buffered=False)
+    chunks = iter(response.response)
+
+    assert response.mimetype == 'text/event-stream'
+    assert _next_message(chunks).startswith("retry:")
+
+    borrow_book_by_patron("654321", 1)
+    message = _next_message(chunks)
+    assert message.startswith("event: availability\n")
+    assert json.loads(message.split("data: ", 1)[1]) == {'book_id': 1, 'available_copies': 2, 'total_copies': 3}
+
+    return_book_by_patron("654321", 1)
+    assert '"available_copies": 3' in _next_message(chunks)
+
+    response.close()
+    assert not AVAILABILITY_EVENTS.has_subscribers()
+
+def test_idle_stream_gets_heartbeats(app):
+    response = app.test_client().get('/api/stream/availability', buffered=False)
+    chunks = iter(response.response)
+    _next_message(chunks)
+
+    assert _next_message(chunks) == ": heartbeat\n\n"
+    response.close()
+
+def test_no_lookup_when_nobody_listens(app, mocker):
+    get_book = mocker.spy(library_service, 'get_book_by_id')
+
+    borrow_book_by_patron("654321", 1)
+
+    # Only the availability check inside borrow_book_by_patron
+    assert get_book.call_count == 1
+
+def test_disconnect_all_ends_every_subscription():
+    broker = EventBroker('test')
+    subscription = broker.subscribe()
+    broker.publish({'n': 1})
+
+    broker.disconnect_all()
+
+    assert subscription.dropped
+    assert subscription.get(timeout=1) is None
+    assert not broker.has_subscribers()
+
+def test_unread_stream_leaves_no_subscriber(app):
+    client = app.test_client()
+
+    client.head('/api/stream/availability').close()
+    client.get('/api/stream/availability', buffered=False).close()
+
+    assert not AVAILABILITY_EVENTS.has_subscribers()
+    assert AVAILABILITY_EVENTS.open_stream(1)
+    AVAILABILITY_EVENTS.close_stream()
+
+def test_streams_beyond_the_cap_get_503(app):
+    app.config['SSE_MAX_STREAMS'] = 2
+    client = app.test_client()
+    open_streams = [client.get('/api/stream/availability', buffered=False) for _ in range(2)]
+
+    response = client.get('/api/stream/availability')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+    open_streams.pop().close()
+    reopened = client.get('/api/stream/availability', buffered=False)
+    assert reopened.status_code == 200
+    for stream in open_streams + [reopened]:
+        stream.close()
@@ -0,0 +1,139 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from benchmarks.dataset import generate_dataset
+from services.export_service import export_table, validate_export_request, write_export
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_HEADERS = {'X-Export-Token': 'secret'}
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+    app.config['EXPORT_TOKEN'] = 'secret'
+    generate_dataset("test_library.db", books=200, loans=3000, patrons=50, seed=4, as_of=datetime(2026, 1, 15))
+
+    yield app
+
+    os.remove("test_library.db")
+
+def _ndjson(data: bytes):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+def test_books_ndjson_has_every_book(app):
+    rows = _ndjson(b"".join(export_table('books', 'ndjson')))
+
+    assert len(rows) == 203
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+    assert set(rows[0]) == {'id', 'title', 'author', 'isbn', 'total_copies', 'available_copies'}
+
+def test_borrow_records_csv(app):
+    data = b"".join(export_table('borrow_records', 'csv', batch_size=100)).decode()
+    rows = list(csv.DictReader(io.StringIO(data)))
+
+    assert len(rows) == 3001
+    assert [row['borrow_date'] for row in rows] == sorted(row['borrow_date'] for row in rows)
+
+def test_patron_and_date_filters_match_sql(app):
+    conn = sqlite3.connect("test_library.db")
+    patron = conn.execute('SELECT patron_id FROM borrow_records LIMIT 1').fetchone()[0]
+    expected = conn.execute('''
+        SELECT COUNT(*) FROM borrow_records
+        WHERE patron_id = ? AND borrow_date >= '2025-01-01' AND borrow_date < '2025-07-01'
+    ''', (patron,)).fetchone()[0]
+
+    rows = _ndjson(b"".join(export_table('borrow_records', 'ndjson', patron_id=patron,
+                                         since='2025-01-01', until='2025-07-01')))
+
+    assert len(rows) == expected > 0
+    assert {row['patron_id'] for row in rows} == {patron}
+    assert all('2025-01-01' <= row['borrow_date'] < '2025-07-01' for row in rows)
+
+def test_gzip_round_trip(app):
+    plain = b"".join(export_table('books', 'csv'))
+    compressed = b"".join(export_table('books', 'csv', compress=True))
+
+    assert gzip.decompress(compressed) == plain
+
+def test_export_memory_does_not_grow_with_rows(app):
+    generate_dataset("test_library.db", books=100, loans=60000, patrons=2000, seed=5, as_of=datetime(2026, 1, 15))
+
+    class Discard:
+        written = 0
+        def write(self, chunk):
+            self.written += len(chunk)
+
+    sink = Discard()
+    tracemalloc.start()
+    ok, _ = write_export(sink, 'borrow_records', 'ndjson')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert ok
+    assert sink.written > 5_000_000
+    assert peak < sink.written / 10
+
+@pytest.mark.parametrize("arguments, message", [
+    (('loans', 'ndjson'), "Unknown table"),
+    (('books', 'xml'), "Unknown format"),
+    (('books', 'csv', '123456'), "only apply to borrow_records"),
+    (('borrow_records', 'csv', '12'), "Invalid patron ID"),
+    (('borrow_records', 'csv', None, 'yesterday'), "ISO format"),
+])
+def test_invalid_requests(arguments, message):
+    assert message in validate_export_request(*arguments)
+
+def test_endpoint_streams_a_download(app):
+    response = app.test_client().get('/api/export/borrow_records?format=ndjson&gzip=1&since=2025-06-01',
+                                     headers=TOKEN_HEADERS)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert 'borrow_records.ndjson.gz' in response.headers['Content-Disposition']
+    rows = _ndjson(gzip.decompress(response.data))
+    assert rows and all(row['borrow_date'] >= '2025-06-01' for row in rows)
+
+def test_endpoint_rejects_bad_filters(app):
+    response = app.test_client().get('/api/export/books?patron_id=123456', headers=TOKEN_HEADERS)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_endpoint_requires_configured_token(app):
+    client = app.test_client()
+
+    assert client.get('/api/export/books').status_code == 403
+    assert client.get('/api/export/books', headers={'X-Export-Token': 'wrong'}).status_code == 403
+    assert client.get('/api/export/books', headers=TOKEN_HEADERS).status_code == 200
+
+def test_endpoint_is_closed_without_a_token(app, monkeypatch):
+    monkeypatch.delenv("LIBRARY_EXPORT_TOKEN", raising=False)
+    del app.config['EXPORT_TOKEN']
+    client = app.test_client()
+
+    assert client.get('/api/export/borrow_records?patron_id=123456').status_code == 403
+    assert client.get('/api/export/borrow_records', headers={'X-Export-Token': ''}).status_code == 403
+
+def test_cli_writes_a_file(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cli.db")
+    generate_dataset(db_path, books=20, loans=100, seed=1)
+    output = str(tmp_path / "books.csv")
+
+    result = subprocess.run([sys.executable, "-m", "services.export_service", "books", "--format", "csv", "-o", output],
+                            cwd=ROOT, env={**os.environ, "LIBRARY_DB_PATH": db_path}, capture_output=True, text=True)
+
+    assert result.returncode == 0
+    with open(output) as f:
+        assert len(list(csv.DictReader(f))) == 20
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from app import create_app
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+from services.fuzzy_match import TrigramIndex, edit_distance, max_typos
+from services.library_service import FUZZY_RESULT_LIMIT, add_book_to_catalog, search_books_in_catalog
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    CATALOG_SNAPSHOT.reset()
+    os.remove("test_library.db")
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("gatsby", "gatsby", 0), ("gatsbby", "gatsby", 1), ("smiht", "smith", 1),
+    ("kitten", "sitting", 3), ("orwel", "orwell", 1),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 3) == distance
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance("tolkien", "austen", 1) == 2
+    assert max_typos("it") == 0 and max_typos("orwel") == 1 and max_typos("fitzgerlad") == 2
+
+def _ranked(index, query):
+    scores = index.scores(query)
+    return sorted(scores, key=lambda book_id: (-scores[book_id], book_id))
+
+def test_index_ranks_closer_words_first():
+    index = TrigramIndex()
+    index.add(1, "The Great Gatsby")
+    index.add(2, "The Great Gatsbys")
+    index.add(3, "Great Expectations")
+
+    assert _ranked(index, "gatsby") == [1, 2]
+    assert _ranked(index, "graet") == [1, 2, 3]
+
+    index.remove(1, "The Great Gatsby")
+    assert _ranked(index, "gatsby") == [2]
+
+@pytest.mark.parametrize("term, search_type, title", [
+    ("Gatsbby", "title", "The Great Gatsby"),
+    ("Orwel", "author", "1984"),
+    ("to kil a mockingbrd", "title", "To Kill a Mockingbird"),
+    ("harper leee", "author", "To Kill a Mockingbird"),
+])
+def test_typos_are_found(app, term, search_type, title):
+    assert [book['title'] for book in search_books_in_catalog(term, search_type, mode="fuzzy")] == [title]
+
+def test_substring_mode_is_unchanged(app):
+    assert search_books_in_catalog("Orwel", "author") == search_books_in_catalog("Orwel", "author", "substring")
+    assert search_books_in_catalog("Gatsbby", "title") == []
+
+def test_results_are_ranked_and_limited(app):
+    for n in range(FUZZY_RESULT_LIMIT + 5):
+        add_book_to_catalog(f'Dune Messiah Part {n}', 'Frank Herbert', f'{9780000000000 + n}', 1)
+    add_book_to_catalog('Dune', 'Frank Herbert', '9780441172719', 1)
+
+    results = search_books_in_catalog("dunne", "title", mode="fuzzy")
+
+    assert len(results) == FUZZY_RESULT_LIMIT
+    assert results[0]['title'] == 'Dune'
+
+def test_isbn_stays_exact_and_unknown_mode_matches_nothing(app):
+    assert len(search_books_in_catalog("9780451524935", "isbn", mode="fuzzy")) == 1
+    assert search_books_in_catalog("9780451524936", "isbn", mode="fuzzy") == []
+    assert search_books_in_catalog("gatsby", "title", mode="regex") == []
+
+def test_api_and_page_accept_fuzzy_mode(app):
+    client = app.test_client()
+
+    data = client.get('/api/search?q=gatsbby&type=title&mode=fuzzy').get_json()
+    assert data['mode'] == 'fuzzy' and data['count'] == 1
+
+    page = client.get('/search?q=orwel&type=author&mode=fuzzy').data.decode()
+    assert "1984" in page
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from services.library_service import get_payment_gateway
+from services.payment_service import PaymentGateway
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the payment integration needs
+PAYMENT_STACK = ('requests', 'urllib3', 'charset_normalizer', 'idna', 'services.payment_service')
+
+# Cumulative import time of the app module, in microseconds. Generous enough for a
+# slow CI machine; a heavy new top-level dependency should still trip it.
+IMPORT_BUDGET_US = 1_500_000
+
+def _import_times(module: str) -> dict:
+    """Run `python -X importtime -c "import <module>"` and map module name to cumulative microseconds."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self [us] | cumulative | module" (module is indented by depth)
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_blueprints_do_not_import_the_payment_stack():
+    loaded = _import_times("app")
+
+    assert not [module for module in PAYMENT_STACK if module in loaded]
+
+def test_app_import_fits_the_budget():
+    assert _import_times("app")["app"] < IMPORT_BUDGET_US
+
+def test_factory_loads_the_gateway_on_demand():
+    assert isinstance(get_payment_gateway(), PaymentGateway)
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+import database
+from app import create_app
+from services.library_service import lookup_books_by_isbn, normalize_isbn
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    os.remove("test_library.db")
+
+@pytest.mark.parametrize("isbn, expected", [
+    ('9780743273565', '9780743273565'),
+    (' 978-0-7432-7356-5 ', '9780743273565'),
+    ('0-7432-7356-7', '9780743273565'),
+    ('080442957X', '9780804429573'),
+    ('97807432735', None),
+    ('978074327356A', None),
+    ('', None),
+])
+def test_normalize_isbn(isbn, expected):
+    assert normalize_isbn(isbn) == expected
+
+def test_found_missing_and_invalid(app):
+    result = lookup_books_by_isbn(['978-0-7432-7356-5', '0451524934', '9780441172719', 'not an isbn',
+                                   '9780743273565', '9780441172719'])
+
+    assert list(result['found']) == ['9780743273565', '9780451524935']
+    assert result['found']['9780451524935']['title'] == '1984'
+    assert result['missing'] == ['9780441172719']
+    assert result['invalid'] == ['not an isbn']
+
+def test_large_batches_are_chunked(app, monkeypatch):
+    monkeypatch.setattr(database, 'ISBN_LOOKUP_CHUNK_SIZE', 2)
+    isbns = ['9780743273565', '9780061120084', '9780451524935'] + [f'97800000000{n:02d}' for n in range(5)]
+
+    result = lookup_books_by_isbn(isbns)
+
+    assert list(result['found']) == isbns[:3]
+    assert result['missing'] == isbns[3:]
+
+def test_lookup_api(app):
+    response = app.test_client().post('/api/books/lookup', json={'isbns': ['9780061120084', '9780441172719', 'x']})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['found']['9780061120084']['title'] == 'To Kill a Mockingbird'
+    assert data['missing'] == ['9780441172719']
+    assert data['invalid'] == ['x']
+
+@pytest.mark.parametrize("body", [None, [], {'isbns': '9780061120084'}, {'isbns': [9780061120084]},
+                                  {'isbns': ['9780061120084'] * 1001}])
+def test_lookup_api_rejects_bad_requests(app, body):
+    response = app.test_client().post('/api/books/lookup', json=body)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,49 @@
+import pytest
+import os
+import random
+
+from benchmarks.loadtest import build_request, parse_mix, run_load, start_server, summarize, wait_until_ready
+
+def test_parse_mix():
+    assert parse_mix("catalog=3, search=1") == {'catalog': 3, 'search': 1}
+
+    with pytest.raises(ValueError, match="Unknown route"):
+        parse_mix("checkout=1")
+
+def test_build_request_for_each_route():
+    rng = random.Random(1)
+
+    method, path, body, headers = build_request('borrow', rng, max_book_id=3, patrons=10)
+    assert (method, path) == ('POST', '/borrow')
+    assert 'patron_id=00000' in body and headers['Content-Type'] == 'application/x-www-form-urlencoded'
+
+    method, path, _, _ = build_request('api_late_fee', rng, max_book_id=3, patrons=10)
+    assert method == 'GET' and path.startswith('/api/late_fee/')
+
+def test_summarize_reports_percentiles_and_errors():
+    samples = [('catalog', float(ms), ms != 100) for ms in range(1, 101)] + [('search', 5.0, True)]
+
+    report = summarize(samples, elapsed=2.0)
+
+    assert report['catalog']['requests'] == 100
+    assert report['catalog']['throughput_rps'] == 50.0
+    assert report['catalog']['p50_ms'] == 51.0
+    assert report['catalog']['p99_ms'] == 99.0
+    assert report['catalog']['error_rate'] == 0.01
+    assert report['total']['requests'] == 101
+
+def test_short_run_against_the_production_server():
+    base_url, workers, max_book_id, patrons = start_server(workers=2)
+    try:
+        wait_until_ready(base_url)
+        report = run_load(base_url, {'catalog': 1, 'api_search': 1, 'borrow': 1}, client_procs=1, clients=2,
+                          duration=0.5, max_book_id=max_book_id, patrons=patrons)
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+        os.remove("test_library.db")
+
+    assert report['total']['requests'] > 0
+    assert report['total']['errors'] == 0
+    assert set(report) <= {'catalog', 'api_search', 'borrow', 'total'}
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+import database
+from app import create_app
+
+@pytest.fixture
+def memory_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LIBRARY_DB_PATH", database.MEMORY_DB)
+    database.init_database()
+
+    yield
+
+    database.close_memory_database()
+
+def test_connections_share_one_database(memory_db):
+    database.insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+
+    assert database.get_book_by_isbn("9780441172719")["title"] == "Dune"
+    assert os.listdir(".") == []
+
+def test_data_outlives_every_request_connection(memory_db):
+    database.insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    conn = database.get_db_connection()
+    conn.close()
+
+    assert len(database.get_all_books()) == 1
+
+def test_closing_the_keeper_discards_the_data(memory_db):
+    database.insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+
+    database.close_memory_database()
+    database.init_database()
+
+    assert database.get_all_books() == []
+
+def test_threads_see_each_others_writes(memory_db):
+    def add(n):
+        database.insert_book(f"Book {n}", "Author", f"isbn-{n}", 1, 1)
+
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(database.get_all_books()) == 4
+
+def test_app_in_test_mode_runs_on_a_fresh_memory_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LIBRARY_DB_PATH", database.MEMORY_DB)
+    app = create_app(test_mode=True, db_path=database.MEMORY_DB)
+    database.insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+
+    app = create_app(test_mode=True, db_path=database.MEMORY_DB)
+    response = app.test_client().get("/catalog")
+
+    assert b"The Great Gatsby" in response.data
+    assert b"Dune" not in response.data
+    assert os.listdir(".") == []
+    database.close_memory_database()
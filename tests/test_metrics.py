@@ -0,0 +1,105 @@
+import pytest
+import os
+from unittest.mock import Mock
+
+from app import create_app
+from monitoring.metrics import (
+    Counter, Histogram, Metric, Registry, REGISTRY, HTTP_REQUESTS, SQLITE_QUERY_DURATION,
+    PAYMENT_GATEWAY_DURATION, record_cache_access
+)
+from services.library_service import refund_late_fee_payment
+from services.payment_service import PaymentGateway
+
+@pytest.fixture
+def client():
+    app = create_app(test_mode=True)
+    REGISTRY.reset()
+
+    yield app.test_client()
+
+    REGISTRY.reset()
+    os.remove("test_library.db")
+
+def test_histogram_exposition_is_cumulative():
+    registry = Registry()
+    histogram = Histogram("demo_seconds", "Demo histogram.", ('route',), registry=registry, buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, route="a")
+    histogram.observe(0.5, route="a")
+    histogram.observe(5, route="a")
+
+    text = registry.expose()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{route="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="a"} 3' in text
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = Counter("demo_total", "Demo counter.", ('path',), registry=registry)
+
+    counter.inc(path='say "hi"\n')
+
+    assert 'demo_total{path="say \\"hi\\"\\n"} 1' in registry.expose()
+
+def test_incomplete_metric_fails_when_created():
+    class Gauge(Metric):
+        def reset(self):
+            pass
+
+    with pytest.raises(TypeError, match="collect"):
+        Gauge("library_test_gauge", "Gauge without collect().", registry=Registry())
+
+def test_snapshots_from_several_processes_are_summed():
+    registry = Registry()
+    counter = Counter("demo_total", "Demo counter.", ('path',), registry=registry)
+    histogram = Histogram("demo_seconds", "Demo histogram.", registry=registry, buckets=(0.1, 1.0))
+    counter.inc(path="a")
+    histogram.observe(0.05)
+    worker = registry.snapshot()
+    counter.inc(2, path="b")
+    histogram.observe(0.5)
+
+    text = registry.merged([worker, registry.snapshot()]).expose()
+
+    assert 'demo_total{path="a"} 2' in text
+    assert 'demo_total{path="b"} 2' in text
+    assert 'demo_seconds_bucket{le="0.1"} 2' in text
+    assert 'demo_seconds_count 3' in text
+
+def test_requests_are_counted_per_endpoint_and_status(client):
+    client.get('/catalog')
+    client.get('/catalog')
+    client.get('/api/search')
+
+    assert HTTP_REQUESTS.value(method='GET', endpoint='catalog.catalog', status='200') == 2
+    assert HTTP_REQUESTS.value(method='GET', endpoint='api.search_books_api', status='400') == 1
+
+def test_metrics_endpoint_exports_all_families(client):
+    client.get('/catalog')
+    record_cache_access('demo', True)
+    record_cache_access('demo', False)
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'library_http_request_duration_seconds_bucket{method="GET",endpoint="catalog.catalog",status="200",le=' in text
+    assert 'library_sqlite_query_duration_seconds_count{operation="SELECT"}' in text
+    assert 'library_cache_hit_ratio{cache="demo"} 0.5' in text
+
+def test_database_queries_are_timed(client):
+    client.get('/catalog')
+
+    assert SQLITE_QUERY_DURATION.count(operation='SELECT') >= 1
+
+def test_payment_gateway_latency_is_recorded():
+    PAYMENT_GATEWAY_DURATION.reset()
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.refund_payment.return_value = (True, "Refund successful")
+
+    refund_late_fee_payment("txn_123", 5.00, mock_gateway)
+
+    assert PAYMENT_GATEWAY_DURATION.count(operation='refund_payment') == 1
@@ -0,0 +1,68 @@
+import pytest
+import os
+import pstats
+
+from app import create_app
+
+TOKEN = "let-me-profile"
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(test_mode=True)
+    app.config['PROFILE_DIR'] = str(tmp_path / "profiles")
+    app.config['PROFILE_TOKEN'] = TOKEN
+
+    yield app
+
+    os.remove("test_library.db")
+
+def test_requests_are_not_profiled_by_default(app):
+    app.test_client().get('/search?q=the&type=title')
+
+    assert not os.path.exists(app.config['PROFILE_DIR'])
+
+def test_admin_header_writes_a_tagged_profile(app):
+    app.test_client().get('/search?q=the&type=title', headers={'X-Profile': TOKEN})
+
+    [name] = os.listdir(app.config['PROFILE_DIR'])
+    assert "-search.search_books-" in name
+    assert name.endswith("ms.pstats")
+
+    stats = pstats.Stats(os.path.join(app.config['PROFILE_DIR'], name))
+    assert any("search_catalog_page" in function for _, _, function in stats.stats)
+
+def test_wrong_token_is_ignored(app):
+    app.test_client().get('/catalog', headers={'X-Profile': 'guess'})
+
+    assert not os.path.exists(app.config['PROFILE_DIR'])
+
+def test_sampling_rate_profiles_without_header(app):
+    app.config['PROFILE_SAMPLE_RATE'] = 1.0
+
+    app.test_client().get('/catalog')
+
+    assert len(os.listdir(app.config['PROFILE_DIR'])) == 1
+
+def test_old_profiles_are_pruned(app):
+    app.config['PROFILE_KEEP'] = 2
+    client = app.test_client()
+
+    for _ in range(4):
+        client.get('/catalog', headers={'X-Profile': TOKEN})
+
+    assert len(os.listdir(app.config['PROFILE_DIR'])) == 2
+
+def test_profile_listing_requires_token(app):
+    client = app.test_client()
+    client.get('/return', headers={'X-Profile': TOKEN})
+
+    assert client.get('/debug/profiles').status_code == 404
+
+    response = client.get('/debug/profiles', headers={'X-Profile': TOKEN})
+    [profile] = response.get_json()['profiles']
+    assert profile['endpoint'] == 'borrowing.return_book'
+    assert profile['duration_ms'] > 0
+
+    download = client.get(f"/debug/profiles/{profile['file']}", headers={'X-Profile': TOKEN})
+    assert download.status_code == 200
+    assert len(download.data) == profile['size']
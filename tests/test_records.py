@@ -0,0 +1,67 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from benchmarks.records import measure_records
+from database import (get_all_books, get_book_by_isbn, get_patron_borrowed_books, get_patron_borrowing_info,
+                      insert_borrow_record, iter_borrow_records)
+from records import Book, BorrowedBook, BorrowRecord
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    os.remove("test_library.db")
+
+def test_record_reads_like_a_dict():
+    book = Book(1, 'Dune', 'Frank Herbert', '9780441172719', 2, 1)
+
+    assert book['title'] == book.title == 'Dune'
+    assert book.get('isbn') == '9780441172719'
+    assert book.get('missing', '') == ''
+    assert 'author' in book and 'missing' not in book
+    assert dict(book) == book.to_dict()
+    assert book == {'id': 1, 'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '9780441172719',
+                    'total_copies': 2, 'available_copies': 1}
+    with pytest.raises(KeyError):
+        book['missing']
+
+def test_record_has_no_instance_dict():
+    book = Book(1, 'Dune', 'Frank Herbert', '9780441172719', 2, 1)
+
+    assert not hasattr(book, '__dict__')
+    with pytest.raises(AttributeError):
+        book.publisher = 'Chilton'
+
+def test_helpers_return_records(app):
+    book = get_book_by_isbn('9780743273565')
+    insert_borrow_record('654321', book.id, datetime.now() - timedelta(days=20), datetime.now() - timedelta(days=6))
+
+    assert all(isinstance(row, Book) for row in get_all_books())
+    assert all(isinstance(row, BorrowRecord) for row in iter_borrow_records('654321'))
+
+    borrowed, = get_patron_borrowed_books('654321')
+    assert isinstance(borrowed, BorrowedBook)
+    assert borrowed.title == book.title and borrowed.is_overdue is True
+
+    info = get_patron_borrowing_info('654321')
+    assert info['current_borrowed_books'][0]['book_id'] == book.id
+    assert info['borrowing_history'][0]['return_date'] is None
+
+def test_api_output_is_unchanged(app):
+    results = app.test_client().get('/api/search?q=gatsby&type=title').get_json()['results']
+
+    assert results == [{'id': 1, 'title': 'The Great Gatsby', 'author': 'F. Scott Fitzgerald',
+                        'isbn': '9780743273565', 'total_copies': 3, 'available_copies': 3}]
+
+def test_benchmark_reports_both_variants(tmp_path):
+    report = measure_records(rows=200, repeat=1, workdir=str(tmp_path))
+
+    for table in ('books', 'borrow_records'):
+        assert report[table]['dict']['rows'] == report[table]['record']['rows'] == 200
+        assert report[table]['record']['memory_mb'] < report[table]['dict']['memory_mb']
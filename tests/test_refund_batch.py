@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from unittest.mock import Mock
+
+from services.payment_service import PaymentGateway
+from services.refund_service import (
+    load_refund_items, load_refund_journal, process_refund_batch, validate_refund_items
+)
+
+def test_batch_refunds_every_item():
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.refund_payment.return_value = (True, "Refund successful")
+
+    items = [("txn_1", 5.00), ("txn_2", 10.00), ("txn_3", 1.50)]
+    success, message, results = process_refund_batch(items, mock_gateway, concurrency=2)
+
+    assert success is True
+    assert "3 refunded" in message
+    assert [result['transaction_id'] for result in results] == ["txn_1", "txn_2", "txn_3"]
+    assert all(result['status'] == 'refunded' for result in results)
+    assert mock_gateway.refund_payment.call_count == 3
+
+def test_batch_rejected_before_any_refund_when_an_item_is_invalid():
+    mock_gateway = Mock(spec=PaymentGateway)
+
+    items = [("txn_1", 5.00), ("bad_txn", 5.00), ("txn_3", 20.00), ("txn_1", 2.00)]
+    success, message, results = process_refund_batch(items, mock_gateway)
+
+    assert success is False
+    assert "3 of 4" in message
+    assert all(result['status'] == 'invalid' for result in results)
+    mock_gateway.refund_payment.assert_not_called()
+
+def test_validate_reports_duplicates_and_bad_amounts():
+    errors = validate_refund_items([("txn_1", 5.0), ("txn_1", 5.0), ("txn_2", "abc")])
+
+    assert [error['index'] for error in errors] == [1, 2]
+    assert "Duplicate" in errors[0]['message']
+    assert "number" in errors[1]['message']
+
+def test_concurrency_is_bounded():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_refund(transaction_id, amount):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return True, "Refund successful"
+
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.refund_payment.side_effect = slow_refund
+
+    items = [(f"txn_{i}", 1.00) for i in range(20)]
+    success, _, _ = process_refund_batch(items, mock_gateway, concurrency=3)
+
+    assert success is True
+    assert 1 < peak <= 3
+
+def test_failed_refunds_are_reported_per_item():
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.refund_payment.side_effect = lambda txn, amount: (txn != "txn_2", "Gateway said no" if txn == "txn_2" else "ok")
+
+    success, message, results = process_refund_batch([("txn_1", 1.0), ("txn_2", 1.0)], mock_gateway)
+
+    assert success is False
+    assert "1 failed" in message
+    assert results[1]['status'] == 'failed'
+    assert "Refund failed: Gateway said no" in results[1]['message']
+
+def test_resume_skips_items_refunded_in_journal(tmp_path):
+    journal_path = str(tmp_path / "refunds.journal")
+    items = [("txn_1", 1.0), ("txn_2", 2.0), ("txn_3", 3.0)]
+
+    first_gateway = Mock(spec=PaymentGateway)
+    first_gateway.refund_payment.side_effect = lambda txn, amount: (txn != "txn_3", "result")
+    process_refund_batch(items, first_gateway, journal_path=journal_path)
+
+    assert load_refund_journal(journal_path)["txn_3"]['status'] == 'failed'
+
+    second_gateway = Mock(spec=PaymentGateway)
+    second_gateway.refund_payment.return_value = (True, "Refund successful")
+    success, _, results = process_refund_batch(items, second_gateway, journal_path=journal_path)
+
+    assert success is True
+    assert [result['status'] for result in results] == ['skipped', 'skipped', 'refunded']
+    second_gateway.refund_payment.assert_called_once_with("txn_3", 3.0)
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    journal_path = tmp_path / "refunds.journal"
+    journal_path.write_text(json.dumps({'transaction_id': 'txn_1', 'status': 'refunded'}) + '\n{"transaction_id": "tx')
+
+    assert list(load_refund_journal(str(journal_path))) == ['txn_1']
+
+def test_load_items_from_csv(tmp_path):
+    path = tmp_path / "refunds.csv"
+    path.write_text("transaction_id,amount\ntxn_1,5.00\ntxn_2,oops\n\n")
+
+    assert load_refund_items(str(path)) == [("txn_1", 5.0), ("txn_2", "oops")]
+
+def test_non_finite_amounts_are_rejected(tmp_path):
+    csv_path = tmp_path / "refunds.csv"
+    csv_path.write_text("txn_1,nan\ntxn_2,inf\ntxn_3,2.5\n")
+    json_path = tmp_path / "refunds.json"
+    json_path.write_text('[["txn_4", NaN], {"transaction_id": "txn_5", "amount": -Infinity}]')
+
+    assert load_refund_items(str(csv_path)) == [("txn_1", "nan"), ("txn_2", "inf"), ("txn_3", 2.5)]
+    assert load_refund_items(str(json_path)) == [("txn_4", "NaN"), ("txn_5", "-Infinity")]
+    errors = validate_refund_items([("txn_1", float('nan')), ("txn_2", float('inf'))])
+    assert [error['index'] for error in errors] == [0, 1]
+
+def test_start_is_journaled_before_the_gateway_call(tmp_path):
+    journal_path = str(tmp_path / "refunds.journal")
+    seen = []
+
+    def refund(transaction_id, amount):
+        seen.append(load_refund_journal(journal_path)[transaction_id]['status'])
+        return True, "Refund successful"
+
+    gateway = Mock(spec=PaymentGateway)
+    gateway.refund_payment.side_effect = refund
+    process_refund_batch([("txn_1", 1.0)], gateway, journal_path=journal_path)
+
+    assert seen == ['started']
+    assert load_refund_journal(journal_path)["txn_1"]['status'] == 'refunded'
+
+def test_resume_reports_started_items_instead_of_resending(tmp_path):
+    journal_path = tmp_path / "refunds.journal"
+    # The run died after the gateway call for txn_2 but before its outcome was written
+    journal_path.write_text(
+        json.dumps({'transaction_id': 'txn_1', 'amount': 1.0, 'status': 'refunded'}) + '\n' +
+        json.dumps({'transaction_id': 'txn_2', 'amount': 2.0, 'status': 'started'}) + '\n')
+    gateway = Mock(spec=PaymentGateway)
+    gateway.refund_payment.return_value = (True, "Refund successful")
+
+    success, message, results = process_refund_batch(
+        [("txn_1", 1.0), ("txn_2", 2.0), ("txn_3", 3.0)], gateway, journal_path=str(journal_path))
+
+    assert success is False
+    assert "1 need manual reconciliation" in message
+    assert [result['status'] for result in results] == ['skipped', 'unreconciled', 'refunded']
+    gateway.refund_payment.assert_called_once_with("txn_3", 3.0)
+
+def test_resume_rejects_changed_amounts(tmp_path):
+    journal_path = tmp_path / "refunds.journal"
+    journal_path.write_text(json.dumps({'transaction_id': 'txn_1', 'amount': 1.0, 'status': 'failed'}) + '\n')
+    gateway = Mock(spec=PaymentGateway)
+
+    success, message, results = process_refund_batch([("txn_1", 1.5), ("txn_2", 2.0)], gateway,
+                                                     journal_path=str(journal_path))
+
+    assert success is False
+    assert results[0]['status'] == 'invalid' and "journal" in results[0]['message']
+    gateway.refund_payment.assert_not_called()
@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+import services.library_service as library_service
+from app import create_app
+from services.search_cache import MAX_CACHED_BOOKS, SearchCache
+from services.library_service import add_book_to_catalog, search_catalog_page
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    os.remove("test_library.db")
+
+def _page(*titles):
+    return {'books': list(titles), 'total': len(titles), 'total_is_estimate': False}
+
+@pytest.fixture
+def database_searches(monkeypatch):
+    calls = []
+    search_books = library_service.search_books
+
+    def counting_search_books(*args):
+        calls.append(args)
+        return search_books(*args)
+
+    monkeypatch.setattr(library_service, 'search_books', counting_search_books)
+    return calls
+
+def test_repeated_search_is_served_from_cache(app, database_searches):
+    first = search_catalog_page('Gatsby ', 'title', limit=10)
+    second = search_catalog_page('gatsby', 'title', limit=10)
+
+    assert second == first and [book['title'] for book in second['books']] == ['The Great Gatsby']
+    assert len(database_searches) == 1
+
+def test_catalog_change_is_seen_immediately(app, database_searches):
+    assert search_catalog_page('dune', 'title')['books'] == []
+
+    add_book_to_catalog('Dune', 'Frank Herbert', '9780441172719', 2)
+
+    assert [book['title'] for book in search_catalog_page('dune', 'title')['books']] == ['Dune']
+    assert len(database_searches) == 2
+
+def test_callers_get_their_own_copy(app):
+    search_catalog_page('gatsby', 'title')['books'].clear()
+
+    assert len(search_catalog_page('gatsby', 'title')['books']) == 1
+
+def test_least_recently_used_page_is_evicted():
+    cache = SearchCache(max_entries=2)
+    cache.get_or_compute('a', 1, lambda: _page('A'))
+    cache.get_or_compute('b', 1, lambda: _page('B'))
+    cache.get_or_compute('a', 1, lambda: _page('A'))
+    cache.get_or_compute('c', 1, lambda: _page('C'))
+
+    assert cache.get_or_compute('a', 1, lambda: _page('new A'))['books'] == ['A']
+    assert cache.get_or_compute('b', 1, lambda: _page('new B'))['books'] == ['new B']
+
+def test_expired_and_large_pages_are_recomputed():
+    cache = SearchCache(ttl=0)
+    cache.get_or_compute('a', 1, lambda: _page('A'))
+    assert cache.get_or_compute('a', 1, lambda: _page('new A'))['books'] == ['new A']
+
+    cache = SearchCache()
+    cache.get_or_compute('all', 1, lambda: _page(*range(MAX_CACHED_BOOKS + 1)))
+    assert len(cache) == 0
+
+def test_concurrent_identical_searches_share_one_computation():
+    cache = SearchCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return _page('A')
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('a', 1, compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not cache._flights:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [_page('A')] * 8
+
+def test_failure_reaches_waiting_callers_and_is_not_cached():
+    cache = SearchCache()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("database is locked")
+
+    errors = []
+
+    def search():
+        try:
+            cache.get_or_compute('a', 1, failing)
+        except RuntimeError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 4
+    assert cache.get_or_compute('a', 1, lambda: _page('A'))['books'] == ['A']
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+import services.library_service as library_service
+from app import create_app
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+from services.library_service import add_book_to_catalog, parse_search_query, search_catalog_page
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    add_book_to_catalog('Mockingbird Lane', 'Ann Author', '9990000000001', 1)
+    add_book_to_catalog('Mockingbird', 'Ann Author', '9990000000002', 1)
+    add_book_to_catalog('A Mockingbird Story', 'Ann Author', '9990000000003', 1)
+    add_book_to_catalog('Another Mockingbird', 'Ann Author', '9990000000004', 1)
+
+    yield app
+
+    CATALOG_SNAPSHOT.disable()
+    os.remove("test_library.db")
+
+def _titles(page):
+    return [book['title'] for book in page['books']]
+
+RANKED = ['Mockingbird', 'Mockingbird Lane', 'A Mockingbird Story', 'Another Mockingbird', 'To Kill a Mockingbird']
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_exact_then_prefix_then_substring(app, snapshot):
+    if snapshot:
+        CATALOG_SNAPSHOT.enable()
+
+    page = search_catalog_page('MOCKINGBIRD', 'title')
+
+    assert _titles(page) == RANKED
+    assert page['total'] == 5 and not page['total_is_estimate']
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_limit_and_offset(app, snapshot):
+    if snapshot:
+        CATALOG_SNAPSHOT.enable()
+
+    assert _titles(search_catalog_page('mockingbird', 'title', limit=2)) == RANKED[:2]
+    assert _titles(search_catalog_page('mockingbird', 'title', limit=2, offset=2)) == RANKED[2:4]
+    last = search_catalog_page('mockingbird', 'title', limit=2, offset=4)
+    assert _titles(last) == RANKED[4:] and last['total'] == 5
+    assert search_catalog_page('mockingbird', 'title', limit=2, offset=10)['total'] == 5
+
+def test_total_is_estimated_from_a_sample_on_large_catalogs(app, monkeypatch):
+    monkeypatch.setattr(library_service, 'EXACT_COUNT_MAX_BOOKS', 4)
+
+    page = search_catalog_page('mockingbird', 'title', limit=1)
+
+    # 2 of the first 4 books match, so about half of the 9 books do
+    assert _titles(page) == ['Mockingbird']
+    assert page['total'] == 4 and page['total_is_estimate']
+
+def test_total_is_exact_on_small_catalogs(app):
+    page = search_catalog_page('mockingbird', 'title', limit=1)
+
+    assert page['total'] == 5 and not page['total_is_estimate']
+
+def test_api_pages_results(app):
+    response = app.test_client().get('/api/search?q=mockingbird&type=title&limit=2&offset=1')
+    data = response.get_json()
+
+    assert [book['title'] for book in data['results']] == RANKED[1:3]
+    assert (data['count'], data['total'], data['limit'], data['offset']) == (2, 5, 2, 1)
+    assert data['total_is_estimate'] is False
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=201", "limit=x", "offset=-1"])
+def test_api_rejects_invalid_paging(app, query):
+    response = app.test_client().get(f'/api/search?q=mockingbird&{query}')
+
+    assert response.status_code == 400
+
+def test_search_page_links_to_the_next_page(app):
+    page = app.test_client().get('/search?q=mockingbird&type=title&limit=2').data.decode()
+
+    assert "Showing 1–2 of 5" in page
+    assert "offset=2" in page
+    assert "Previous" not in page
+
+def test_parse_search_query():
+    assert parse_search_query(' Gatsby ', 'title') == [('title', 'gatsby')]
+    assert parse_search_query('author:Lee title:mock', 'all') == [('title', 'mock'), ('author', 'lee')]
+    assert parse_search_query('bird Author:"Harper  Lee" isbn:', 'all') == [('all', 'bird'), ('author', 'harper  lee')]
+    assert parse_search_query('Star Wars: A New Hope', 'title') == [('title', 'star wars: a new hope')]
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_all_fields_in_one_ranked_search(app, snapshot):
+    add_book_to_catalog('Leeward Shore', 'Ann Author', '9990000000005', 1)
+    add_book_to_catalog('Sea Stories', 'Lee Child', '9990000000006', 1)
+    add_book_to_catalog('Lee Child Biography', 'Lee Child', '9990000000007', 1)
+    if snapshot:
+        CATALOG_SNAPSHOT.enable()
+
+    # Title prefixes, then author prefixes, then other author substrings; each book once
+    page = search_catalog_page('lee', 'all')
+    assert _titles(page) == ['Lee Child Biography', 'Leeward Shore', 'Sea Stories', 'To Kill a Mockingbird']
+    assert page['total'] == 4
+    assert _titles(search_catalog_page('9990000000006', 'all')) == ['Sea Stories']
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_field_qualified_search(app, snapshot):
+    if snapshot:
+        CATALOG_SNAPSHOT.enable()
+
+    assert _titles(search_catalog_page('author:lee title:mock', 'all')) == ['To Kill a Mockingbird']
+    assert _titles(search_catalog_page('mockingbird author:"ann author"', 'title')) == RANKED[:4]
+    assert _titles(search_catalog_page('isbn:9780451524935', 'title')) == ['1984']
+
+def test_fuzzy_search_across_fields(app):
+    assert _titles(search_catalog_page('orwel', 'all', mode='fuzzy')) == ['1984']
+    assert _titles(search_catalog_page('author:harpr mockingbrd', 'title', mode='fuzzy')) == ['To Kill a Mockingbird']
+
+def test_api_searches_all_fields(app):
+    data = app.test_client().get('/api/search?q=author:lee%20title:mock&type=all').get_json()
+
+    assert data['search_type'] == 'all'
+    assert [book['title'] for book in data['results']] == ['To Kill a Mockingbird']
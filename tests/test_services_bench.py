@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.services_bench import BENCHMARKS, StubPaymentGateway, compare_to_baseline, run_suite
+
+def _document(ops_per_sec, p50_us, p99_us):
+    return {'results': {'1000': {'search_books_in_catalog': {
+        'ops_per_sec': ops_per_sec, 'p50_us': p50_us, 'p99_us': p99_us, 'iterations': 10, 'peak_alloc_bytes': 0
+    }}}}
+
+def test_suite_reports_every_service_function(tmp_path):
+    document = run_suite([50], loans_per_book=4, min_time=0.0, max_iterations=3, data_dir=str(tmp_path))
+
+    results = document['results']['50']
+    assert set(results) == set(BENCHMARKS)
+    for result in results.values():
+        assert result['iterations'] >= 1
+        assert result['ops_per_sec'] > 0
+        assert result['p99_us'] >= result['p50_us'] > 0
+
+def test_dataset_is_generated_once_and_reused(tmp_path):
+    run_suite([30], only=['search_books_in_catalog'], min_time=0.0, max_iterations=1, data_dir=str(tmp_path))
+    run_suite([30], only=['search_books_in_catalog'], min_time=0.0, max_iterations=1, data_dir=str(tmp_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["books30_loans150_seed0.db"]
+
+def test_no_regression_within_tolerance():
+    assert compare_to_baseline(_document(95, 105, 150), _document(100, 100, 100), tolerance=0.25) == []
+
+@pytest.mark.parametrize("current, expected", [
+    (_document(50, 100, 100), "ops/s"),
+    (_document(100, 200, 100), "p50"),
+    (_document(100, 100, 200), "p99"),
+])
+def test_regressions_are_reported(current, expected):
+    [regression] = compare_to_baseline(current, _document(100, 100, 100), tolerance=0.25)
+
+    assert "search_books_in_catalog @ 1000 books" in regression
+    assert expected in regression
+
+def test_missing_explicit_baseline_fails(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-m", "benchmarks.services_bench", "--sizes", "10",
+                             "--baseline", str(tmp_path / "baseline.json"), "--output", str(tmp_path / "latest.json")],
+                            cwd=root, capture_output=True, text=True)
+
+    assert result.returncode == 2
+    assert "does not exist" in result.stderr
+    assert not (tmp_path / "latest.json").exists()
+
+def test_stub_gateway_succeeds_immediately():
+    success, transaction_id, _ = StubPaymentGateway().process_payment("123456", 3.5)
+
+    assert success is True
+    assert transaction_id.startswith("txn_")
+
+def test_uncached_search_benchmark_misses_the_cache(tmp_path, monkeypatch):
+    import services.library_service as library_service
+    calls = []
+    search_page = library_service._search_page
+    monkeypatch.setattr(library_service, '_search_page', lambda *args: calls.append(args) or search_page(*args))
+
+    document = run_suite([30], only=['search_books_in_catalog'], min_time=60.0, max_iterations=8,
+                         data_dir=str(tmp_path))
+
+    # Three warmup calls, eight timed and five for the allocation peak, all computed
+    assert document['results']['30']['search_books_in_catalog']['iterations'] == 8
+    assert len(calls) == 16
@@ -0,0 +1,131 @@
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def server(tmp_path):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, APP, "--test", "--serve", "--workers", "2", "--threads", "2", "--port", str(port)],
+        cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 15
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.time() > deadline or process.poll() is not None:
+                process.kill()
+                pytest.fail("server did not start")
+            time.sleep(0.05)
+
+    yield process, port
+
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+def test_serves_requests_over_keep_alive(server):
+    _, port = server
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+
+    for path in ("/catalog", "/api/search?q=gatsby&type=title"):
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200
+        assert not response.will_close
+
+    conn.close()
+
+def test_unread_request_body_does_not_break_the_next_request(server):
+    _, port = server
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+
+    # /catalog never reads the body; it must be drained before the next request line
+    conn.request("GET", "/catalog", body="x" * 5000, headers={"Content-Length": "5000"})
+    conn.getresponse().read()
+    conn.request("GET", "/api/search?q=gatsby&type=title")
+    response = conn.getresponse()
+
+    assert response.status == 200
+    assert b"Gatsby" in response.read()
+    conn.close()
+
+def test_sigterm_shuts_down_cleanly(server):
+    process, port = server
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/catalog")
+    assert conn.getresponse().status == 200
+    conn.close()
+
+    process.send_signal(signal.SIGTERM)
+
+    assert process.wait(timeout=10) == 0
+
+def test_idle_keep_alive_connections_do_not_hold_threads(server):
+    _, port = server
+    idle = []
+    for _ in range(6):  # more than the 2 workers x 2 threads
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/api/search?q=gatsby&type=title")
+        conn.getresponse().read()
+        idle.append(conn)
+
+    start = time.monotonic()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/api/search?q=gatsby&type=title")
+    assert conn.getresponse().status == 200
+    assert time.monotonic() - start < 1
+
+    # The idle connections are still usable
+    for conn in idle:
+        conn.request("GET", "/api/search?q=gatsby&type=title")
+        assert conn.getresponse().status == 200
+        conn.close()
+
+def test_metrics_add_up_all_workers(server):
+    _, port = server
+    for _ in range(10):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/api/search?q=gatsby&type=title")
+        conn.getresponse().read()
+        conn.close()
+    time.sleep(1.5)  # workers publish their metrics every second
+
+    for _ in range(4):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode()
+        conn.close()
+        assert ('library_http_requests_total{method="GET",endpoint="api.search_books_api",status="200"} 10'
+                in text)
+
+def test_workers_crashing_on_startup_stop_the_server(tmp_path):
+    # No request threads: every worker fails as it starts
+    process = subprocess.Popen(
+        [sys.executable, APP, "--test", "--serve", "--workers", "2", "--threads", "0", "--port", str(_free_port())],
+        cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        _, stderr = process.communicate(timeout=30)
+    finally:
+        process.kill()
+
+    assert process.returncode == 1
+    assert stderr.count("restarting") == 5
+    assert "shutting down" in stderr
@@ -0,0 +1,63 @@
+import pytest
+import logging
+import os
+
+from app import create_app
+from database import BOOK_COLUMNS, get_all_books
+from monitoring import sql_trace
+from monitoring.sql_trace import QueryBudgetExceeded, normalize_sql
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    os.remove("test_library.db")
+
+def test_normalize_sql_strips_literals_and_whitespace():
+    sql = """
+        SELECT * FROM books
+        WHERE title = 'It''s' AND id IN (?, ?, ?) AND total_copies > 3
+    """
+
+    assert normalize_sql(sql) == "SELECT * FROM books WHERE title = ? AND id IN (?+) AND total_copies > ?"
+
+def test_query_count_headers_in_enforced_mode(app):
+    app.config['SQL_ENFORCE_QUERY_BUDGET'] = True
+
+    response = app.test_client().get('/catalog')
+
+    # Catalog version (for the ETag) + the books query
+    assert response.headers['X-Query-Count'] == '2'
+    assert float(response.headers['X-Query-Time-Ms']) >= 0
+
+def test_no_headers_when_not_enforced(app):
+    response = app.test_client().get('/catalog')
+
+    assert 'X-Query-Count' not in response.headers
+
+def test_request_over_budget_fails_in_dev_mode(app):
+    app.config['SQL_ENFORCE_QUERY_BUDGET'] = True
+    app.config['SQL_QUERY_BUDGET'] = 2
+
+    with pytest.raises(QueryBudgetExceeded, match="POST /borrow issued"):
+        app.test_client().post('/borrow', data={'patron_id': '654321', 'book_id': '1'})
+
+def test_statements_are_attached_to_the_request(app):
+    with app.test_request_context('/catalog'):
+        get_all_books()
+        get_all_books()
+
+        count, seconds = sql_trace.request_query_summary()
+        assert count == 2
+        assert sql_trace.most_repeated_statements(1) == [(f"SELECT {BOOK_COLUMNS} FROM books ORDER BY title, id", 2)]
+
+def test_slow_queries_are_logged(app, monkeypatch, caplog):
+    monkeypatch.setattr(sql_trace, 'slow_query_seconds', 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="library.sql"):
+        app.test_client().get('/catalog')
+
+    assert any("Slow query" in record.message and "FROM books" in record.message for record in caplog.records)
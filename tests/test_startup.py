@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+import database
+from app import create_app
+from benchmarks.startup import measure_startup
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "startup.db")
+    monkeypatch.setenv("LIBRARY_DB_PATH", path)
+    return path
+
+def test_cold_database_is_migrated_to_current_version(db_path):
+    assert database.init_database() is True
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == database.SCHEMA_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'books', 'borrow_records'} <= tables
+
+def test_warm_database_only_reads_the_version(db_path, monkeypatch):
+    database.init_database()
+    statements = []
+    monkeypatch.setattr(database, "record_statement", lambda sql, duration: statements.append(sql))
+
+    assert database.init_database() is False
+    assert statements == ['PRAGMA user_version']
+
+def test_database_created_before_versioning_keeps_its_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    for statement in database.MIGRATIONS[0]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('T', 'A', '1', 1, 1)")
+    conn.commit()
+    conn.close()
+
+    database.init_database()
+
+    assert database.get_book_by_isbn('1')['title'] == 'T'
+
+def test_create_app_does_not_seed_outside_test_mode(db_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    create_app()
+
+    assert database.get_all_books() == []
+
+def test_seeding_only_fills_an_empty_database(db_path):
+    database.init_database()
+
+    assert database.add_sample_data() is True
+    assert database.add_sample_data() is False
+    assert len(database.get_all_books()) == 3
+
+def test_startup_benchmark_reports_both_scenarios(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = measure_startup(repeat=2, workdir=str(tmp_path))
+
+    for scenario in ('cold', 'warm'):
+        assert report[scenario]['runs'] == 2
+        assert report[scenario]['max_ms'] >= report[scenario]['median_ms'] > 0
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tracemalloc
+
+import pytest
+
+from app import create_app
+from benchmarks.dataset import generate_dataset
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    os.remove("test_library.db")
+
+def _chunks(response):
+    return (chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in response.response)
+
+def test_large_catalog_streams_in_flat_memory(app):
+    generate_dataset("test_library.db", books=20000, loans=100, seed=1)
+    client = app.test_client()
+
+    tracemalloc.start()
+    response = client.get('/catalog', buffered=False)
+    chunks = _chunks(response)
+    first = next(chunks)
+    total, rows = len(first), first.count("<tr>")
+    for chunk in chunks:
+        total += len(chunk)
+        rows += chunk.count("<tr>")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.close()
+
+    assert "<table>" in first
+    # Header row + sample books + generated books
+    assert rows == 1 + 3 + 20000
+    # The page is well over 10 MB; only a few batches are held at once
+    assert total > 10_000_000
+    assert peak < total / 4
+
+def test_search_results_stream(app):
+    response = app.test_client().get('/search?q=the&type=title')
+    page = response.data.decode()
+
+    assert response.status_code == 200
+    assert "The Great Gatsby" in page
+    assert page.count("<table>") == page.count("</table>") == 1
+
+def test_no_results_message(app):
+    page = app.test_client().get('/search?q=zzzz&type=title').data.decode()
+
+    assert "No results found" in page
+    assert "<table>" not in page
+
+def test_empty_catalog_message(app):
+    conn = sqlite3.connect("test_library.db")
+    conn.execute('DELETE FROM borrow_records')
+    conn.execute('DELETE FROM books')
+    conn.commit()
+    conn.close()
+
+    page = app.test_client().get('/catalog').data.decode()
+
+    assert "No books in catalog" in page
+    assert "<table>" not in page
+
+def test_flash_message_is_shown_once(app):
+    client = app.test_client()
+    client.post('/add_book', data={'title': 'Dune', 'author': 'Frank Herbert',
+                                   'isbn': '9780441172719', 'total_copies': '2'})
+
+    first = client.get('/catalog').data.decode()
+    second = client.get('/catalog').data.decode()
+
+    assert "successfully added" in first
+    assert "successfully added" not in second
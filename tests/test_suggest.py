@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from app import create_app
+from services.catalog_snapshot import CATALOG_SNAPSHOT
+from services.library_service import add_book_to_catalog, suggest_completions
+
+@pytest.fixture
+def app():
+    app = create_app(test_mode=True)
+    app.config['TESTING'] = True
+
+    yield app
+
+    CATALOG_SNAPSHOT.reset()
+    os.remove("test_library.db")
+
+def test_title_completions(app):
+    response = app.test_client().get('/api/suggest?q=the%20GR&type=title')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'query': 'the GR', 'type': 'title', 'suggestions': ['The Great Gatsby']}
+
+def test_author_completions_are_distinct_and_sorted(app):
+    add_book_to_catalog('Tender Is the Night', 'F. Scott Fitzgerald', '9780684801544', 1)
+    add_book_to_catalog('Animal Farm', 'George Orwell', '9780451526342', 1)
+    add_book_to_catalog('Frankenstein', 'Mary Shelley', '9780486282114', 1)
+
+    assert suggest_completions('f', 'author') == ['F. Scott Fitzgerald']
+    assert suggest_completions('  ', 'author') == []
+    assert suggest_completions('', 'title', 1) == []
+    assert suggest_completions('a', 'title') == ['Animal Farm']
+
+def test_trailing_space_ends_the_word(app):
+    add_book_to_catalog('Theory of Everything', 'S. Hawking', '9781893224698', 1)
+
+    assert suggest_completions('the', 'title') == ['The Great Gatsby', 'Theory of Everything']
+    assert suggest_completions('the ', 'title') == ['The Great Gatsby']
+
+def test_added_books_are_suggested_immediately(app):
+    client = app.test_client()
+    assert client.get('/api/suggest?q=du&type=title').get_json()['suggestions'] == []
+
+    add_book_to_catalog('Dune', 'Frank Herbert', '9780441172719', 2)
+
+    assert client.get('/api/suggest?q=du&type=title').get_json()['suggestions'] == ['Dune']
+
+def test_limit(app):
+    for n in range(5):
+        add_book_to_catalog(f'Volume {n}', 'Anon', f'978000000000{n}', 1)
+
+    response = app.test_client().get('/api/suggest?q=vol&type=title&limit=3')
+
+    assert response.get_json()['suggestions'] == ['Volume 0', 'Volume 1', 'Volume 2']
+
+@pytest.mark.parametrize("query", ["q=", "q=a&type=isbn", "q=a&limit=0", "q=a&limit=x", "q=a&limit=51"])
+def test_invalid_requests(app, query):
+    response = app.test_client().get(f'/api/suggest?{query}')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
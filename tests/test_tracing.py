@@ -0,0 +1,96 @@
+import pytest
+import json
+import os
+from unittest.mock import Mock
+
+from app import create_app
+from monitoring import tracing
+from monitoring.tracing import CLIENT, SERVER, STATUS_ERROR, InMemorySpanExporter, JsonlSpanExporter, traced
+from services.library_service import refund_late_fee_payment
+from services.payment_service import PaymentGateway
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    tracing.set_exporter(exporter)
+
+    yield exporter
+
+    tracing.set_exporter(None)
+
+@pytest.fixture
+def client(exporter):
+    app = create_app(test_mode=True)
+
+    yield app.test_client()
+
+    os.remove("test_library.db")
+
+def test_borrow_request_produces_one_nested_trace(client, exporter):
+    exporter.traces.clear()
+
+    client.post('/borrow', data={'patron_id': '654321', 'book_id': '1'})
+
+    [trace] = exporter.traces
+    spans = {span.name: span for span in trace}
+    root = spans['POST borrowing.borrow_book']
+    service = spans['library_service.borrow_book_by_patron']
+    lookup = spans['database.get_book_by_id']
+
+    assert root.kind == SERVER
+    assert root.parent_span_id == ""
+    assert root.attributes['http.status_code'] == 302
+    assert service.parent_span_id == root.span_id
+    assert lookup.parent_span_id == service.span_id
+    assert lookup.kind == CLIENT
+    assert lookup.attributes['db.system'] == 'sqlite'
+    assert len({span.trace_id for span in trace}) == 1
+
+def test_payment_gateway_calls_get_client_spans(exporter):
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.refund_payment.return_value = (True, "Refund successful")
+
+    refund_late_fee_payment("txn_123", 5.00, mock_gateway)
+
+    [trace] = exporter.traces
+    names = [span.name for span in trace]
+    assert names == ["payment_gateway.refund_payment", "library_service.refund_late_fee_payment"]
+
+def test_exceptions_mark_the_span_as_error(exporter):
+    @traced("explode")
+    def explode():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        explode()
+
+    [[span]] = exporter.traces
+    assert span.status_code == STATUS_ERROR
+    assert span.status_message == "RuntimeError: boom"
+
+def test_nothing_is_recorded_when_tracing_is_off():
+    calls = []
+
+    @traced("quiet")
+    def quiet():
+        calls.append(tracing.current_span())
+
+    quiet()
+
+    assert calls == [None]
+
+def test_jsonl_export_uses_otlp_shape(tmp_path, exporter):
+    path = tmp_path / "traces.jsonl"
+    tracing.set_exporter(JsonlSpanExporter(str(path)))
+
+    with tracing.start_span("outer", attributes={'count': 3}):
+        with tracing.start_span("inner"):
+            pass
+
+    [line] = path.read_text().splitlines()
+    spans = json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans']
+    inner, outer = spans
+    assert inner['parentSpanId'] == outer['spanId']
+    assert len(outer['traceId']) == 32 and len(outer['spanId']) == 16
+    assert int(outer['endTimeUnixNano']) >= int(inner['endTimeUnixNano'])
+    assert outer['attributes'] == [{'key': 'count', 'value': {'intValue': '3'}}]